@@ -1,13 +1,29 @@
+import hashlib
+from urllib.parse import urlencode
+
 from django.contrib import admin
+from django.core.cache import caches
+from django.http import HttpResponse, StreamingHttpResponse
 from django.template.response import TemplateResponse
 from django.urls import re_path
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.utils.translation import get_language
 
+from trackstats import app_settings
 from trackstats.admin.forms import GraphByDateAndObjectForm, GraphByDateForm
+from trackstats.export import iter_csv, iter_ndjson
 from trackstats.models import (
+    DimensionValue,
+    DistributionByDate,
+    DistributionByDateAndObject,
     Domain,
+    Event,
     Metric,
     StatisticByDate,
+    StatisticByDateAndDimension,
     StatisticByDateAndObject,
+    TrackerCheckpoint,
 )
 
 
@@ -23,6 +39,33 @@ class MetricAdmin(admin.ModelAdmin):
     list_filter = ("domain",)
 
 
+@admin.register(DimensionValue)
+class DimensionValueAdmin(admin.ModelAdmin):
+    search_fields = ("value",)
+
+
+@admin.register(Event)
+class EventAdmin(admin.ModelAdmin):
+    list_display = ("timestamp", "metric", "object_type", "object_id", "amount")
+    list_filter = ("metric__domain", "metric")
+    date_hierarchy = "timestamp"
+
+
+@admin.register(TrackerCheckpoint)
+class TrackerCheckpointAdmin(admin.ModelAdmin):
+    list_display = (
+        "metric",
+        "period",
+        "source",
+        "object_type",
+        "high_water_mark",
+        "status",
+        "finished_at",
+    )
+    list_filter = ("status", "period", "metric__domain")
+    search_fields = ("key", "source")
+
+
 class StatisticGraphMixin(object):
     graph_slug = None
     graph_form_class = None
@@ -34,36 +77,114 @@ class StatisticGraphMixin(object):
         ]
         return custom_urls + urls
 
+    def get_graph_etag(self, request, form):
+        """Identifies the graph rendered for the (valid) form, which only
+        changes when the statistics of the metric graphed do (see
+        ``Metric.changed_at``). The page is user specific as well.
+        """
+        changed_at = form.cleaned_data["metric"].changed_at
+        key = "|".join(
+            [
+                self.model._meta.label_lower,
+                urlencode(sorted(request.GET.items())),
+                changed_at.isoformat() if changed_at else "",
+                str(request.user.pk),
+                get_language() or "",
+            ]
+        )
+        return hashlib.sha1(key.encode()).hexdigest()
+
     def graph(self, request):
         context = dict(self.admin_site.each_context(request))
         if "to_date" in request.GET:
             form = self.graph_form_class(request.GET)
             if form.is_valid():
-                stats = []
-                for stat in form.get_statistics():
-                    stats.append(
-                        dict(
-                            js_date="new Date({}, {}, {})".format(
-                                stat.date.year, stat.date.month - 1, stat.date.day
-                            ),
-                            value=stat.value,
-                        )
-                    )
-                context["statistics"] = stats
+                return self.graph_cached(request, form, context)
         else:
             stat = StatisticByDate.objects.last()
             initial = {}
             if stat:
                 initial["metric"] = stat.metric
             form = self.graph_form_class(initial=initial)
+        return self.render_graph(request, form, context)
+
+    def graph_cached(self, request, form, context):
+        """Renders the graph, unless the client (conditional GET) or the
+        cache (``TRACKSTATS_GRAPH_CACHE``) has it already.
+        """
+        etag = self.get_graph_etag(request, form)
+        changed_at = form.cleaned_data["metric"].changed_at
+        last_modified = changed_at and int(changed_at.timestamp())
+        response = get_conditional_response(
+            request, etag=quote_etag(etag), last_modified=last_modified
+        )
+        if response is None:
+            cache = None
+            content = None
+            if app_settings.GRAPH_CACHE:
+                cache = caches[app_settings.GRAPH_CACHE]
+                content = cache.get("trackstats:graph:" + etag)
+            if content is None:
+                response = self.render_graph(request, form, context).render()
+                if cache is not None:
+                    cache.set(
+                        "trackstats:graph:" + etag,
+                        response.content,
+                        app_settings.GRAPH_CACHE_TIMEOUT,
+                    )
+            else:
+                response = HttpResponse(content)
+        response["ETag"] = quote_etag(etag)
+        if last_modified:
+            response["Last-Modified"] = http_date(last_modified)
+        # Browsers are to revalidate, which is cheap.
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def render_graph(self, request, form, context):
+        if form.is_bound and form.is_valid():
+            stats = []
+            for stat in form.get_statistics():
+                stats.append(
+                    dict(
+                        js_date="new Date({}, {}, {})".format(
+                            stat.date.year, stat.date.month - 1, stat.date.day
+                        ),
+                        value=stat.value,
+                    )
+                )
+            context["statistics"] = stats
         context["form"] = form
         return TemplateResponse(
             request, "trackstats/admin/{}/graph.html".format(self.graph_slug), context
         )
 
 
+class StatisticExportMixin(object):
+    actions = ["export_csv", "export_ndjson"]
+
+    def export_response(self, queryset, content, content_type, extension):
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response["Content-Disposition"] = 'attachment; filename="{}.{}"'.format(
+            queryset.model._meta.model_name, extension
+        )
+        return response
+
+    @admin.action(description="Export selected statistics as CSV")
+    def export_csv(self, request, queryset):
+        return self.export_response(
+            queryset, iter_csv(queryset), "text/csv; charset=utf-8", "csv"
+        )
+
+    @admin.action(description="Export selected statistics as NDJSON")
+    def export_ndjson(self, request, queryset):
+        return self.export_response(
+            queryset, iter_ndjson(queryset), "application/x-ndjson", "ndjson"
+        )
+
+
 @admin.register(StatisticByDate)
-class StatisticByDateAdmin(StatisticGraphMixin, admin.ModelAdmin):
+class StatisticByDateAdmin(StatisticExportMixin, StatisticGraphMixin, admin.ModelAdmin):
     change_list_template = "trackstats/admin/by_date/change_list.html"
     graph_slug = "by_date"
     graph_form_class = GraphByDateForm
@@ -75,7 +196,9 @@ class StatisticByDateAdmin(StatisticGraphMixin, admin.ModelAdmin):
 
 
 @admin.register(StatisticByDateAndObject)
-class StatisticByDateAndObjectAdmin(StatisticGraphMixin, admin.ModelAdmin):
+class StatisticByDateAndObjectAdmin(
+    StatisticExportMixin, StatisticGraphMixin, admin.ModelAdmin
+):
     change_list_template = "trackstats/admin/by_date_and_object/change_list.html"
     graph_slug = "by_date_and_object"
     graph_form_class = GraphByDateAndObjectForm
@@ -85,6 +208,32 @@ class StatisticByDateAndObjectAdmin(StatisticGraphMixin, admin.ModelAdmin):
     list_filter = ("date", "period", "metric__domain", "metric")
 
 
+@admin.register(StatisticByDateAndDimension)
+class StatisticByDateAndDimensionAdmin(StatisticExportMixin, admin.ModelAdmin):
+    ordering = ("-date",)
+    list_display = ("date", "metric", "dimension", "value")
+    list_select_related = ("metric", "dimension")
+    date_hierarchy = "date"
+    list_filter = ("date", "period", "metric__domain", "metric")
+    raw_id_fields = ("dimension",)
+
+
+@admin.register(DistributionByDate)
+class DistributionByDateAdmin(admin.ModelAdmin):
+    ordering = ("-date",)
+    list_display = ("date", "metric", "period")
+    date_hierarchy = "date"
+    list_filter = ("date", "period", "metric__domain", "metric")
+
+
+@admin.register(DistributionByDateAndObject)
+class DistributionByDateAndObjectAdmin(admin.ModelAdmin):
+    ordering = ("-date",)
+    list_display = ("date", "metric", "object_type", "object_id", "period")
+    date_hierarchy = "date"
+    list_filter = ("date", "period", "metric__domain", "metric")
+
+
 #            stat = StatisticByDate.objects.last()
 #            initial = {}
 #            if stat:
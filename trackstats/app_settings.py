@@ -0,0 +1,55 @@
+class AppSettings(object):
+    def __init__(self, prefix):
+        self.prefix = prefix
+
+    def _setting(self, name, dflt):
+        from django.conf import settings
+
+        return getattr(settings, self.prefix + name, dflt)
+
+    @property
+    def DATABASE(self):
+        """The database alias the ``TrackStatsRouter`` routes the trackstats
+        models to.
+        """
+        return self._setting("DATABASE", None)
+
+    @property
+    def TRACK_LATEST(self):
+        """Whether to maintain the latest value of each series of statistics
+        (in ``LatestStatisticByDate`` and ``LatestStatisticByDateAndObject``)
+        as statistics are recorded, for use by ``latest()``.
+        """
+        return self._setting("TRACK_LATEST", False)
+
+    @property
+    def GRAPH_CACHE(self):
+        """The alias of the cache to keep the rendered admin graphs in, if
+        any. Entries are keyed by the change stamp of the metric graphed,
+        so need not be invalidated.
+        """
+        return self._setting("GRAPH_CACHE", None)
+
+    @property
+    def GRAPH_CACHE_TIMEOUT(self):
+        return self._setting("GRAPH_CACHE_TIMEOUT", 60 * 60 * 24)
+
+    @property
+    def TRACKER_RUN_HANDLERS(self):
+        """Dotted paths to callables that are passed the ``TrackerRun`` of
+        each tracker run, e.g. to forward the metrics to StatsD or
+        Prometheus.
+        """
+        return self._setting("TRACKER_RUN_HANDLERS", [])
+
+    @property
+    def STATSD_PREFIX(self):
+        return self._setting("STATSD_PREFIX", "trackstats")
+
+
+_app_settings = AppSettings("TRACKSTATS_")
+
+
+def __getattr__(name):
+    # See https://peps.python.org/pep-0562/
+    return getattr(_app_settings, name)
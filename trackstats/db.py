@@ -0,0 +1,86 @@
+from io import StringIO
+
+from django.db import connections
+from django.db.models.expressions import Col
+from django.db.models.sql.datastructures import BaseTable
+
+
+def is_postgresql(using):
+    return connections[using].vendor == "postgresql"
+
+
+def _copy_value(value):
+    if value is None:
+        return "\\N"
+    return str(value)
+
+
+def copy_rows(cursor, table, columns, rows):
+    """Loads rows into a table using PostgreSQL's ``COPY ... FROM STDIN``.
+
+    The values are expected to be of simple types (numbers, dates),
+    which require no escaping in COPY's text format. Supports both
+    psycopg2 and psycopg (3).
+    """
+    quote_name = cursor.db.ops.quote_name
+    sql = "COPY {} ({}) FROM STDIN".format(
+        quote_name(table), ", ".join(quote_name(column) for column in columns)
+    )
+    if hasattr(cursor.cursor, "copy_expert"):
+        data = StringIO()
+        for row in rows:
+            data.write("\t".join(_copy_value(value) for value in row))
+            data.write("\n")
+        data.seek(0)
+        cursor.cursor.copy_expert(sql, data)
+    else:
+        with cursor.cursor.copy(sql) as copy:
+            for row in rows:
+                copy.write_row(row)
+
+
+class DerivedTable(BaseTable):
+    """Selects from (the SQL of) ``query`` instead of the table itself,
+    aliased as the table. Its columns are to be named after those of the
+    table.
+    """
+
+    def __init__(self, table_name, alias, query):
+        super(DerivedTable, self).__init__(table_name, alias)
+        self.query = query
+
+    def as_sql(self, compiler, connection):
+        sql, params = self.query.get_compiler(connection=connection).as_sql()
+        return "({}) {}".format(
+            sql, compiler.quote_name_unless_alias(self.table_alias)
+        ), tuple(params)
+
+    def relabeled_clone(self, change_map):
+        return self.__class__(
+            self.table_name,
+            change_map.get(self.table_alias, self.table_alias),
+            self.query,
+        )
+
+
+def select_from(qs, **annotations):
+    """Returns a queryset of the model of ``qs``, selecting from (the rows
+    of) ``qs`` annotated with ``annotations``, e.g. window functions. As
+    ``qs`` is a derived table, filters added to the queryset returned
+    apply to the rows annotated, not to the rows the annotations read.
+    """
+    opts = qs.model._meta
+    inner = qs.order_by().values(
+        *[field.attname for field in opts.concrete_fields], **annotations
+    )
+    ret = qs.model._default_manager.using(qs.db).all()
+    alias = ret.query.get_initial_alias()
+    ret.query.alias_map[alias] = DerivedTable(opts.db_table, alias, inner.query)
+    columns = {}
+    for name, expression in inner.query.annotations.items():
+        # Refers to the column selected by the derived table.
+        target = expression.output_field.clone()
+        target.set_attributes_from_name(name)
+        target.model = qs.model
+        columns[name] = Col(alias, target)
+    return ret.annotate(**columns)
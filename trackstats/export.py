@@ -0,0 +1,144 @@
+import csv
+import json
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .models import ByDimensionMixin, ByObjectMixin
+
+
+EXPORT_FORMATS = ("csv", "ndjson", "parquet")
+
+DEFAULT_CHUNK_SIZE = 2000
+DEFAULT_ROW_GROUP_SIZE = 100000
+
+
+def is_by_object(model):
+    return issubclass(model, ByObjectMixin)
+
+
+def is_by_dimension(model):
+    return issubclass(model, ByDimensionMixin)
+
+
+def get_export_columns(model):
+    """The columns of an export. Domains and metrics are keyed by their
+    reference IDs (natural keys), objects by "app_label.model" and ID.
+    """
+    columns = ["domain", "metric", "date", "period", "value"]
+    if is_by_object(model):
+        columns += ["object_type", "object_id"]
+    if is_by_dimension(model):
+        columns += ["dimension"]
+    return columns
+
+
+def iter_rows(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yields export rows (tuples, see ``get_export_columns()``).
+
+    Rows are streamed from the database in chunks, without instantiating
+    any models, so that memory usage stays constant regardless of the
+    number of statistics exported.
+    """
+    fields = ["metric__domain__ref", "metric__ref", "date", "period", "value"]
+    by_object = is_by_object(queryset.model)
+    if by_object:
+        fields += ["object_type__app_label", "object_type__model", "object_id"]
+    if is_by_dimension(queryset.model):
+        fields += ["dimension__value"]
+    rows = queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+    for row in rows:
+        if by_object:
+            row = row[:5] + ("{}.{}".format(row[5], row[6]),) + row[7:]
+        yield row
+
+
+class Echo(object):
+    """A pseudo-buffer: ``write()`` returns what is written instead of
+    buffering it, so that ``csv.writer`` can be used in a generator.
+    """
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    writer = csv.writer(Echo())
+    yield writer.writerow(get_export_columns(queryset.model))
+    for row in iter_rows(queryset, chunk_size=chunk_size):
+        yield writer.writerow(row)
+
+
+def iter_ndjson(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    columns = get_export_columns(queryset.model)
+    for row in iter_rows(queryset, chunk_size=chunk_size):
+        record = dict(zip(columns, row))
+        record["date"] = record["date"].isoformat()
+        yield json.dumps(record) + "\n"
+
+
+def export_csv(queryset, stream, chunk_size=DEFAULT_CHUNK_SIZE):
+    for line in iter_csv(queryset, chunk_size=chunk_size):
+        stream.write(line)
+
+
+def export_ndjson(queryset, stream, chunk_size=DEFAULT_CHUNK_SIZE):
+    for line in iter_ndjson(queryset, chunk_size=chunk_size):
+        stream.write(line)
+
+
+def export_parquet(
+    queryset,
+    stream,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    row_group_size=DEFAULT_ROW_GROUP_SIZE,
+):
+    """Writes a columnar Parquet file, one row group at a time. Requires
+    pyarrow.
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImproperlyConfigured("Exporting to Parquet requires pyarrow")
+    columns = get_export_columns(queryset.model)
+    types = {
+        "domain": pyarrow.string(),
+        "metric": pyarrow.string(),
+        "date": pyarrow.date32(),
+        "period": pyarrow.int32(),
+        "value": pyarrow.int64(),
+        "object_type": pyarrow.string(),
+        "object_id": pyarrow.int64(),
+        "dimension": pyarrow.string(),
+    }
+    schema = pyarrow.schema([(column, types[column]) for column in columns])
+
+    def write_row_group(writer, rows):
+        arrays = [
+            pyarrow.array([row[i] for row in rows], type=types[column])
+            for i, column in enumerate(columns)
+        ]
+        writer.write_table(pyarrow.Table.from_arrays(arrays, schema=schema))
+
+    with pyarrow.parquet.ParquetWriter(stream, schema) as writer:
+        rows = []
+        for row in iter_rows(queryset, chunk_size=chunk_size):
+            rows.append(row)
+            if len(rows) >= row_group_size:
+                write_row_group(writer, rows)
+                rows = []
+        if rows:
+            write_row_group(writer, rows)
+
+
+def export(queryset, format, stream, **kwargs):
+    if format == "csv":
+        kwargs.pop("row_group_size", None)
+        export_csv(queryset, stream, **kwargs)
+    elif format == "ndjson":
+        kwargs.pop("row_group_size", None)
+        export_ndjson(queryset, stream, **kwargs)
+    elif format == "parquet":
+        export_parquet(queryset, stream, **kwargs)
+    else:
+        raise NotImplementedError
@@ -0,0 +1,289 @@
+import csv
+import json
+import time
+from datetime import date
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connections, router, transaction
+
+from .db import copy_rows, is_postgresql
+from .export import is_by_dimension, is_by_object
+from .models import PERIOD_CHOICES, DimensionValue, Metric, Period
+
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+DEFAULT_BATCH_SIZE = 10000
+
+# Only this many rejected rows are kept around for reporting purposes.
+MAX_REJECTED = 1000
+
+
+class ImportResult(object):
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.rejected = 0
+        self.rejected_rows = []
+        self.duration = 0
+
+    @property
+    def loaded(self):
+        return self.created + self.updated + self.unchanged
+
+    @property
+    def rows_per_second(self):
+        if not self.duration:
+            return 0
+        return (self.loaded + self.rejected) / self.duration
+
+    def reject(self, line, reason):
+        self.rejected += 1
+        if len(self.rejected_rows) < MAX_REJECTED:
+            self.rejected_rows.append((line, reason))
+
+
+class RejectedRow(ValueError):
+    pass
+
+
+def read_csv(stream):
+    return csv.DictReader(stream)
+
+
+def read_ndjson(stream):
+    for line in stream:
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # Passed on as is, to be rejected.
+                yield line
+
+
+def parse_period(value):
+    periods = dict(PERIOD_CHOICES)
+    try:
+        period = int(value)
+    except (TypeError, ValueError):
+        period = getattr(Period, str(value).upper(), None)
+    if period not in periods:
+        raise RejectedRow("Unknown period {!r}".format(value))
+    return period
+
+
+def parse_date(value):
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise RejectedRow("Invalid date {!r}".format(value))
+
+
+def parse_int(value, name, null=False):
+    if value in (None, "") and null:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise RejectedRow("Invalid {} {!r}".format(name, value))
+
+
+class RowParser(object):
+    """Turns import rows (keyed by natural keys, see
+    ``trackstats.export.get_export_columns()``) into ``bulk_record()``
+    keyword arguments.
+
+    All domains, metrics and content types are resolved once, using an
+    in-memory map, instead of once per row.
+    """
+
+    def __init__(self, model, using):
+        self.by_object = is_by_object(model)
+        self.by_dimension = is_by_dimension(model)
+        self.metrics = {
+            (metric.domain.ref, metric.ref): metric
+            for metric in Metric.objects.using(using).select_related("domain")
+        }
+        self.content_types = {
+            "{}.{}".format(ct.app_label, ct.model): ct
+            for ct in ContentType.objects.db_manager(using).all()
+        }
+
+    def parse(self, row):
+        if not isinstance(row, dict):
+            raise RejectedRow("Malformed row")
+        metric = self.metrics.get((row.get("domain"), row.get("metric")))
+        if metric is None:
+            raise RejectedRow(
+                "Unknown metric {!r} in domain {!r}".format(
+                    row.get("metric"), row.get("domain")
+                )
+            )
+        kwargs = {
+            "metric": metric,
+            "date": parse_date(row.get("date")),
+            "period": parse_period(row.get("period")),
+            "value": parse_int(row.get("value"), "value", null=True),
+        }
+        if self.by_object:
+            object_type = self.content_types.get(row.get("object_type"))
+            if object_type is None:
+                raise RejectedRow(
+                    "Unknown object type {!r}".format(row.get("object_type"))
+                )
+            kwargs["object_type"] = object_type
+            kwargs["object_id"] = parse_int(row.get("object_id"), "object ID")
+        if self.by_dimension:
+            if row.get("dimension") is None:
+                raise RejectedRow("Missing dimension")
+            kwargs["dimension"] = row["dimension"]
+        return kwargs
+
+
+def iter_records(rows, parser, result):
+    for line, row in enumerate(rows, 1):
+        try:
+            yield parser.parse(row)
+        except RejectedRow as e:
+            result.reject(line, str(e))
+
+
+def iter_batches(iterable, batch_size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def copy_batch(model, batch, using, result):
+    """Loads a batch of statistics by means of ``COPY`` into a staging
+    table, which is then merged into the statistics table using a single
+    ``INSERT ... ON CONFLICT DO UPDATE``, skipping unchanged values.
+    """
+    by_object = is_by_object(model)
+    by_dimension = is_by_dimension(model)
+    columns = ["metric_id", "period", "date", "value"]
+    types = ["bigint", "integer", "date", "bigint"]
+    if by_object:
+        columns += ["object_type_id", "object_id"]
+        types += ["integer", "bigint"]
+    if by_dimension:
+        columns += ["dimension_id"]
+        types += ["bigint"]
+        dimensions = DimensionValue.objects.db_manager(using).intern(
+            kwargs["dimension"] for kwargs in batch
+        )
+        batch = [
+            dict(
+                kwargs,
+                dimension=dimensions[DimensionValue.to_value(kwargs["dimension"])],
+            )
+            for kwargs in batch
+        ]
+    rows = []
+    keys = set()
+    for kwargs in batch:
+        row = [kwargs["metric"].pk, kwargs["period"], kwargs["date"], kwargs["value"]]
+        if by_object:
+            row += [kwargs["object_type"].pk, kwargs["object_id"]]
+        if by_dimension:
+            row += [kwargs["dimension"].pk]
+        rows.append(row)
+        keys.add(model.objects.get_record_key(kwargs))
+    key = [
+        model._meta.get_field(name).column for name in model._meta.unique_together[0]
+    ]
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    staging = "trackstats_import_staging"
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE TEMPORARY TABLE {} (seq bigserial, {})".format(
+                staging,
+                ", ".join(
+                    "{} {}".format(qn(column), type)
+                    for column, type in zip(columns, types)
+                ),
+            )
+        )
+        copy_rows(cursor, staging, columns, rows)
+        # DISTINCT ON: a row may appear more than once, the last one wins.
+        cursor.execute(
+            """
+            WITH upserted AS (
+                INSERT INTO {table} ({columns})
+                SELECT DISTINCT ON ({key}) {columns}
+                FROM {staging}
+                ORDER BY {key}, seq DESC
+                ON CONFLICT ({key}) DO UPDATE SET value = EXCLUDED.value
+                WHERE {table}.value IS DISTINCT FROM EXCLUDED.value
+                RETURNING (xmax = 0) AS created
+            )
+            SELECT
+                COUNT(*) FILTER (WHERE created),
+                COUNT(*) FILTER (WHERE NOT created)
+            FROM upserted
+            """.format(
+                table=table,
+                staging=staging,
+                columns=", ".join(qn(column) for column in columns),
+                key=", ".join(qn(column) for column in key),
+            )
+        )
+        created, updated = cursor.fetchone()
+        cursor.execute("DROP TABLE {}".format(staging))
+        model.objects.using(using).update_latest(model(**kwargs) for kwargs in batch)
+        if created or updated:
+            model.objects.using(using).touch(kwargs["metric"].pk for kwargs in batch)
+    result.created += created
+    result.updated += updated
+    result.unchanged += len(keys) - created - updated
+
+
+def import_statistics(
+    model,
+    stream,
+    format="csv",
+    batch_size=DEFAULT_BATCH_SIZE,
+    using=None,
+    use_copy=True,
+):
+    """Bulk loads statistics, as exported by ``trackstats.export``, into
+    ``model``. Rows that cannot be imported are rejected and reported in
+    the returned ``ImportResult``.
+
+    On PostgreSQL, batches are loaded using ``COPY`` (unless ``use_copy``
+    is false). Elsewhere, ``bulk_record()`` is used.
+    """
+    if using is None:
+        using = router.db_for_write(model)
+    if format == "csv":
+        rows = read_csv(stream)
+    elif format == "ndjson":
+        rows = read_ndjson(stream)
+    else:
+        raise NotImplementedError
+    result = ImportResult()
+    start = time.monotonic()
+    records = iter_records(rows, RowParser(model, using), result)
+    for batch in iter_batches(records, batch_size):
+        if use_copy and is_postgresql(using):
+            copy_batch(model, batch, using, result)
+        else:
+            counts = model.objects.using(using).bulk_record(
+                batch, batch_size=batch_size
+            )
+            result.created += counts["created"]
+            result.updated += counts["updated"]
+            result.unchanged += counts["unchanged"]
+    result.duration = time.monotonic() - start
+    return result
@@ -0,0 +1,193 @@
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+from django.utils.module_loading import import_string
+
+from . import app_settings
+from .signals import tracker_run_finished
+
+
+logger = logging.getLogger("trackstats.trackers")
+
+
+class QueryCounter(object):
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class TrackerRun(object):
+    """Collects the metrics of a single tracker run: the duration and
+    number of SQL queries per phase (e.g. "start_date", "aggregate",
+    "write"), the number of rows read and written, and the date range
+    covered.
+    """
+
+    def __init__(self, tracker, using=()):
+        self.tracker = tracker
+        self.using = set(using)
+        self.phases = {}
+        self.rows_read = 0
+        self.rows_written = 0
+        # Recomputed, but left untouched as the value did not change.
+        self.rows_unchanged = 0
+        self.from_date = None
+        self.to_date = None
+        self.duration = 0
+        self.error = None
+
+    @property
+    def name(self):
+        return str(self.tracker)
+
+    @property
+    def queries(self):
+        return sum(phase["queries"] for phase in self.phases.values())
+
+    @contextmanager
+    def phase(self, name):
+        counter = QueryCounter()
+        stats = self.phases.setdefault(name, {"duration": 0, "queries": 0})
+        start = time.monotonic()
+        try:
+            with ExitStack() as stack:
+                for alias in self.using:
+                    stack.enter_context(connections[alias].execute_wrapper(counter))
+                yield
+        finally:
+            stats["duration"] += time.monotonic() - start
+            stats["queries"] += counter.count
+
+    def __enter__(self):
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.duration = time.monotonic() - self.start
+        self.error = exc_value
+        self.report()
+
+    def as_dict(self):
+        return {
+            "tracker": self.name,
+            "duration": self.duration,
+            "queries": self.queries,
+            "phases": self.phases,
+            "rows_read": self.rows_read,
+            "rows_written": self.rows_written,
+            "rows_unchanged": self.rows_unchanged,
+            "from_date": self.from_date and self.from_date.isoformat(),
+            "to_date": self.to_date and self.to_date.isoformat(),
+            "error": self.error and repr(self.error),
+        }
+
+    def get_log_level(self):
+        from .trackers import TrackerLocked
+
+        if isinstance(self.error, TrackerLocked):
+            # Expected when runs overlap, the other run tracks.
+            return logging.WARNING
+        return logging.ERROR if self.error else logging.INFO
+
+    def report(self):
+        data = self.as_dict()
+        logger.log(
+            self.get_log_level(),
+            "Tracked %s from %s to %s in %.3fs (%d queries,"
+            " %d rows read, %d rows written, %d unchanged)",
+            self.name,
+            data["from_date"],
+            data["to_date"],
+            self.duration,
+            self.queries,
+            self.rows_read,
+            self.rows_written,
+            self.rows_unchanged,
+            extra={"trackstats": data},
+        )
+        tracker_run_finished.send(
+            sender=self.tracker.__class__, tracker=self.tracker, run=self
+        )
+        for path in app_settings.TRACKER_RUN_HANDLERS:
+            import_string(path)(self)
+
+
+def _metric_name(run):
+    metric = getattr(run.tracker, "metric", None)
+    if metric is None:
+        return run.tracker.__class__.__name__
+    return "{}.{}".format(metric.domain.ref, metric.ref)
+
+
+def statsd_handler(run):
+    """Sends the run metrics to StatsD. Requires the ``statsd`` package.
+    Enable by adding ``"trackstats.instrumentation.statsd_handler"`` to
+    ``TRACKSTATS_TRACKER_RUN_HANDLERS``.
+    """
+    from statsd.defaults.django import statsd
+
+    prefix = "{}.{}".format(app_settings.STATSD_PREFIX, _metric_name(run))
+    with statsd.pipeline() as pipe:
+        pipe.timing(prefix + ".duration", run.duration * 1000)
+        for name, phase in run.phases.items():
+            pipe.timing(prefix + "." + name + ".duration", phase["duration"] * 1000)
+        pipe.incr(prefix + ".queries", run.queries)
+        pipe.incr(prefix + ".rows_read", run.rows_read)
+        pipe.incr(prefix + ".rows_written", run.rows_written)
+        pipe.incr(prefix + ".rows_unchanged", run.rows_unchanged)
+        if run.error:
+            pipe.incr(prefix + ".errors")
+
+
+_prometheus_metrics = None
+
+
+def prometheus_handler(run):
+    """Exposes the run metrics to Prometheus. Requires the
+    ``prometheus_client`` package. Enable by adding
+    ``"trackstats.instrumentation.prometheus_handler"`` to
+    ``TRACKSTATS_TRACKER_RUN_HANDLERS``.
+    """
+    global _prometheus_metrics
+    from prometheus_client import Counter, Histogram
+
+    if _prometheus_metrics is None:
+        _prometheus_metrics = {
+            "duration": Histogram(
+                "trackstats_tracker_phase_seconds",
+                "Duration of tracker run phases",
+                ["metric", "phase"],
+            ),
+            "queries": Counter(
+                "trackstats_tracker_queries", "SQL queries issued", ["metric"]
+            ),
+            "rows_read": Counter(
+                "trackstats_tracker_rows_read", "Aggregated rows read", ["metric"]
+            ),
+            "rows_written": Counter(
+                "trackstats_tracker_rows_written", "Statistics written", ["metric"]
+            ),
+            "rows_unchanged": Counter(
+                "trackstats_tracker_rows_unchanged",
+                "Statistics recomputed, but unchanged",
+                ["metric"],
+            ),
+            "errors": Counter(
+                "trackstats_tracker_errors", "Failed tracker runs", ["metric"]
+            ),
+        }
+    metric = _metric_name(run)
+    _prometheus_metrics["duration"].labels(metric, "total").observe(run.duration)
+    for name, phase in run.phases.items():
+        _prometheus_metrics["duration"].labels(metric, name).observe(phase["duration"])
+    _prometheus_metrics["queries"].labels(metric).inc(run.queries)
+    _prometheus_metrics["rows_read"].labels(metric).inc(run.rows_read)
+    _prometheus_metrics["rows_written"].labels(metric).inc(run.rows_written)
+    _prometheus_metrics["rows_unchanged"].labels(metric).inc(run.rows_unchanged)
+    if run.error:
+        _prometheus_metrics["errors"].labels(metric).inc()
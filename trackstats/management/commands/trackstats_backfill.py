@@ -0,0 +1,55 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from trackstats.management.utils import parse_date
+from trackstats.registry import registry
+from trackstats.trackers import TrackerLocked
+
+
+class Command(BaseCommand):
+    help = "Tracks the days for which statistics are missing"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "trackers", nargs="*", help="Registered tracker names (default: all)"
+        )
+        parser.add_argument(
+            "--from-date", type=parse_date, required=True, help="YYYY-MM-DD"
+        )
+        parser.add_argument(
+            "--to-date", type=parse_date, help="YYYY-MM-DD (default: today)"
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the missing days, without tracking them",
+        )
+
+    def handle(self, **options):
+        registry.autodiscover()
+        names = options["trackers"] or registry.names()
+        unknown = set(names) - set(registry.names())
+        if unknown:
+            raise CommandError(
+                "Unknown tracker(s): {}".format(", ".join(sorted(unknown)))
+            )
+        from_date = options["from_date"]
+        to_date = options["to_date"] or date.today()
+        for name in names:
+            tracker, qs = registry.get(name)
+            try:
+                if options["dry_run"]:
+                    gaps = tracker.get_gaps(from_date, to_date)
+                else:
+                    gaps = tracker.backfill(qs, from_date, to_date)
+            except TrackerLocked:
+                self.stderr.write("{}: already running, skipped".format(name))
+                continue
+            except NotImplementedError as e:
+                self.stderr.write("{}: {}, skipped".format(name, e))
+                continue
+            for first, last in gaps:
+                self.stdout.write(
+                    "{}: {} - {}".format(name, first.isoformat(), last.isoformat())
+                )
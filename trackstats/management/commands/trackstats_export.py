@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from trackstats.export import (
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_ROW_GROUP_SIZE,
+    EXPORT_FORMATS,
+    export,
+)
+from trackstats.management.utils import add_statistic_arguments, get_statistics
+
+
+class Command(BaseCommand):
+    help = "Streams statistics to CSV, NDJSON or Parquet"
+
+    def add_arguments(self, parser):
+        add_statistic_arguments(parser)
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+        parser.add_argument(
+            "-o", "--output", help="Output file (default: standard output)"
+        )
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument(
+            "--row-group-size",
+            type=int,
+            default=DEFAULT_ROW_GROUP_SIZE,
+            help="Rows per Parquet row group",
+        )
+
+    def handle(self, **options):
+        fmt = options["format"]
+        qs = get_statistics(options)
+        kwargs = {"chunk_size": options["chunk_size"]}
+        if fmt == "parquet":
+            if not options["output"]:
+                raise CommandError("Parquet exports require --output")
+            kwargs["row_group_size"] = options["row_group_size"]
+            with open(options["output"], "wb") as f:
+                export(qs, fmt, f, **kwargs)
+        elif options["output"]:
+            with open(options["output"], "w", newline="", encoding="utf-8") as f:
+                export(qs, fmt, f, **kwargs)
+        else:
+            export(qs, fmt, self.stdout, **kwargs)
@@ -0,0 +1,63 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from trackstats.imports import (
+    DEFAULT_BATCH_SIZE,
+    IMPORT_FORMATS,
+    import_statistics,
+)
+from trackstats.management.utils import STATISTIC_MODELS
+
+
+class Command(BaseCommand):
+    help = "Bulk loads statistics from CSV or NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("file", help="Input file, as written by trackstats_export")
+        parser.add_argument(
+            "--model",
+            choices=sorted(STATISTIC_MODELS),
+            default="by_date",
+            help="The statistics model to load into",
+        )
+        parser.add_argument(
+            "--format",
+            choices=IMPORT_FORMATS,
+            help="Input format (default: derived from the file extension)",
+        )
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument(
+            "--no-copy",
+            action="store_false",
+            dest="use_copy",
+            help="Do not use COPY on PostgreSQL",
+        )
+
+    def handle(self, **options):
+        fmt = options["format"]
+        if not fmt:
+            ext = os.path.splitext(options["file"])[1].lstrip(".").lower()
+            fmt = ext if ext in IMPORT_FORMATS else "csv"
+        with open(options["file"], newline="", encoding="utf-8") as f:
+            result = import_statistics(
+                STATISTIC_MODELS[options["model"]],
+                f,
+                format=fmt,
+                batch_size=options["batch_size"],
+                use_copy=options["use_copy"],
+            )
+        for line, reason in result.rejected_rows:
+            self.stderr.write("Rejected row {}: {}".format(line, reason))
+        self.stdout.write(
+            "Loaded {} statistics ({} created, {} updated, {} unchanged),"
+            " rejected {}, in {:.1f}s ({:.0f} rows/s)".format(
+                result.loaded,
+                result.created,
+                result.updated,
+                result.unchanged,
+                result.rejected,
+                result.duration,
+                result.rows_per_second,
+            )
+        )
@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from trackstats.management.utils import parse_date, parse_period
+from trackstats.registry import registry
+from trackstats.scheduler import schedule
+
+
+class Command(BaseCommand):
+    help = "Runs the registered trackers, in the order of their dependencies"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "trackers", nargs="*", help="Registered tracker names (default: all)"
+        )
+        parser.add_argument(
+            "--from-date",
+            type=parse_date,
+            help="Re-track the window starting at this date (YYYY-MM-DD)",
+        )
+        parser.add_argument(
+            "--to-date",
+            type=parse_date,
+            help="The end of the window to re-track (default: today)",
+        )
+        parser.add_argument(
+            "--refresh-period",
+            type=parse_period,
+            action="append",
+            default=[],
+            help="Refresh the statistics of this period as well, e.g. lifetime",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Run up to this many independent trackers in parallel",
+        )
+
+    def handle(self, **options):
+        registry.autodiscover()
+        names = options["trackers"] or registry.names()
+        unknown = set(names) - set(registry.names())
+        if unknown:
+            raise CommandError(
+                "Unknown tracker(s): {}".format(", ".join(sorted(unknown)))
+            )
+        if options["to_date"] and not options["from_date"]:
+            raise CommandError("--to-date requires --from-date")
+        if options["refresh_period"] and not options["from_date"]:
+            raise CommandError("--refresh-period requires --from-date")
+        result = schedule(
+            names,
+            from_date=options["from_date"],
+            to_date=options["to_date"],
+            refresh_periods=options["refresh_period"],
+            max_workers=options["workers"],
+        )
+        for name, run in result.runs.items():
+            self.stdout.write(
+                "{}: {} rows written, {} unchanged".format(
+                    name, run.rows_written, run.rows_unchanged
+                )
+            )
+        for name, error in result.unsupported.items():
+            self.stderr.write("{}: {}, skipped".format(name, error))
+        for name in result.locked:
+            self.stderr.write("{}: already running, skipped".format(name))
+        for name in result.skipped:
+            self.stderr.write("{}: inputs not tracked, skipped".format(name))
+        for name, error in result.failed.items():
+            self.stderr.write("{}: failed: {!r}".format(name, error))
+        if result.failed:
+            raise CommandError(
+                "Failed tracker(s): {}".format(", ".join(sorted(result.failed)))
+            )
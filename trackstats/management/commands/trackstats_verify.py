@@ -0,0 +1,82 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from trackstats.management.utils import parse_date
+from trackstats.registry import registry
+from trackstats.trackers import TrackerLocked
+from trackstats.verify import WINDOWS, verify
+
+
+class Command(BaseCommand):
+    help = "Verifies that the daily statistics match their source"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "trackers", nargs="*", help="Registered tracker names (default: all)"
+        )
+        parser.add_argument(
+            "--from-date", type=parse_date, help="YYYY-MM-DD (default: the beginning)"
+        )
+        parser.add_argument(
+            "--to-date", type=parse_date, help="YYYY-MM-DD (default: yesterday)"
+        )
+        parser.add_argument(
+            "--window",
+            choices=sorted(WINDOWS),
+            default="month",
+            help="The windows to compare fingerprints of",
+        )
+        parser.add_argument(
+            "--retrack",
+            action="store_true",
+            help="Re-track the days of which the statistics are off",
+        )
+
+    def handle(self, **options):
+        registry.autodiscover()
+        names = options["trackers"] or registry.names()
+        unknown = set(names) - set(registry.names())
+        if unknown:
+            raise CommandError(
+                "Unknown tracker(s): {}".format(", ".join(sorted(unknown)))
+            )
+        failed = []
+        for name in names:
+            tracker, qs = registry.get(name)
+            try:
+                result = verify(
+                    tracker,
+                    qs,
+                    from_date=options["from_date"],
+                    to_date=options["to_date"],
+                    window=options["window"],
+                    retrack=options["retrack"],
+                )
+            except TrackerLocked:
+                self.stderr.write("{}: already running, skipped".format(name))
+                continue
+            except NotImplementedError as e:
+                self.stderr.write("{}: {}, skipped".format(name, e))
+                continue
+            except Exception as e:
+                # Verify the others all the same.
+                self.stderr.write("{}: failed: {!r}".format(name, e))
+                failed.append(name)
+                continue
+            for discrepancy in result.discrepancies:
+                self.stdout.write("{}: {}".format(name, discrepancy))
+            for first, last in result.retracked:
+                self.stdout.write(
+                    "{}: re-tracked {} - {}".format(
+                        name, first.isoformat(), last.isoformat()
+                    )
+                )
+            self.stdout.write(
+                "{}: {} discrepancies in {} of {} windows".format(
+                    name,
+                    len(result.discrepancies),
+                    len(result.mismatches),
+                    result.windows,
+                )
+            )
+        if failed:
+            raise CommandError("Failed tracker(s): {}".format(", ".join(failed)))
@@ -0,0 +1,65 @@
+from datetime import date
+
+from django.core.management.base import CommandError
+
+from trackstats.models import (
+    Period,
+    StatisticByDate,
+    StatisticByDateAndDimension,
+    StatisticByDateAndObject,
+)
+
+
+STATISTIC_MODELS = {
+    "by_date": StatisticByDate,
+    "by_date_and_object": StatisticByDateAndObject,
+    "by_date_and_dimension": StatisticByDateAndDimension,
+}
+
+PERIODS = {
+    name.lower(): value for name, value in vars(Period).items() if name.isupper()
+}
+
+
+def parse_period(value):
+    try:
+        return PERIODS[value.lower()]
+    except KeyError:
+        raise CommandError(
+            "Unknown period {!r}, choose from: {}".format(value, ", ".join(PERIODS))
+        )
+
+
+def parse_date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError("Invalid date {!r}, use YYYY-MM-DD".format(value))
+
+
+def add_statistic_arguments(parser):
+    parser.add_argument(
+        "--model",
+        choices=sorted(STATISTIC_MODELS),
+        default="by_date",
+        help="The statistics model to operate on",
+    )
+    parser.add_argument("--domain", action="append", help="Domain reference ID")
+    parser.add_argument("--metric", action="append", help="Metric reference ID")
+    parser.add_argument("--period", type=parse_period, help="E.g. day, lifetime")
+    parser.add_argument("--from-date", type=parse_date, help="YYYY-MM-DD")
+    parser.add_argument("--to-date", type=parse_date, help="YYYY-MM-DD")
+
+
+def get_statistics(options):
+    model = STATISTIC_MODELS[options["model"]]
+    qs = model.objects.narrow(
+        period=options["period"],
+        from_date=options["from_date"],
+        to_date=options["to_date"],
+    )
+    if options["domain"]:
+        qs = qs.filter(metric__domain__ref__in=options["domain"])
+    if options["metric"]:
+        qs = qs.filter(metric__ref__in=options["metric"])
+    return qs
@@ -0,0 +1,89 @@
+# Generated by Django 4.1.13 on 2026-10-19 16:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("trackstats", "0004_alter_default_auto_field"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrackerCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        help_text="Identifies the tracker", max_length=255, unique=True
+                    ),
+                ),
+                (
+                    "period",
+                    models.IntegerField(
+                        choices=[
+                            (86400, "Day"),
+                            (604800, "Week"),
+                            (2419200, "28 days"),
+                            (2592000, "Month"),
+                            (0, "Lifetime"),
+                        ]
+                    ),
+                ),
+                ("object_id", models.PositiveIntegerField(blank=True, null=True)),
+                (
+                    "source",
+                    models.CharField(help_text="The source tracked", max_length=100),
+                ),
+                (
+                    "high_water_mark",
+                    models.DateField(
+                        help_text="Statistics are complete up to including this date",
+                        null=True,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("running", "Running"),
+                            ("completed", "Completed"),
+                            ("failed", "Failed"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("started_at", models.DateTimeField(null=True)),
+                ("finished_at", models.DateTimeField(null=True)),
+                (
+                    "metric",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="trackstats.metric",
+                    ),
+                ),
+                (
+                    "object_type",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="contenttypes.contenttype",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 4.1.13 on 2026-10-19 16:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trackstats", "0005_trackercheckpoint"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DimensionValue",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("value", models.CharField(max_length=255, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="StatisticByDateAndDimension",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("value", models.BigIntegerField(null=True)),
+                (
+                    "period",
+                    models.IntegerField(
+                        choices=[
+                            (86400, "Day"),
+                            (604800, "Week"),
+                            (2419200, "28 days"),
+                            (2592000, "Month"),
+                            (0, "Lifetime"),
+                        ]
+                    ),
+                ),
+                ("date", models.DateField(db_index=True)),
+                (
+                    "dimension",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        to="trackstats.dimensionvalue",
+                    ),
+                ),
+                (
+                    "metric",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        to="trackstats.metric",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Statistic by date and dimension",
+                "verbose_name_plural": "Statistics by date and dimension",
+                "unique_together": {("date", "metric", "dimension", "period")},
+            },
+        ),
+    ]
@@ -0,0 +1,115 @@
+# Generated by Django 4.1.13 on 2026-10-19 16:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("trackstats", "0006_statisticbydateanddimension"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DistributionByDateAndObject",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("object_id", models.PositiveIntegerField()),
+                ("date", models.DateField(db_index=True)),
+                (
+                    "value",
+                    models.JSONField(
+                        help_text="A mergeable histogram, see trackstats.sketches.Histogram"
+                    ),
+                ),
+                (
+                    "period",
+                    models.IntegerField(
+                        choices=[
+                            (86400, "Day"),
+                            (604800, "Week"),
+                            (2419200, "28 days"),
+                            (2592000, "Month"),
+                            (0, "Lifetime"),
+                        ]
+                    ),
+                ),
+                (
+                    "metric",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        to="trackstats.metric",
+                    ),
+                ),
+                (
+                    "object_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        to="contenttypes.contenttype",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Distribution by date and object",
+                "verbose_name_plural": "Distributions by date and object",
+                "unique_together": {
+                    ("date", "metric", "object_type", "object_id", "period")
+                },
+            },
+        ),
+        migrations.CreateModel(
+            name="DistributionByDate",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(db_index=True)),
+                (
+                    "value",
+                    models.JSONField(
+                        help_text="A mergeable histogram, see trackstats.sketches.Histogram"
+                    ),
+                ),
+                (
+                    "period",
+                    models.IntegerField(
+                        choices=[
+                            (86400, "Day"),
+                            (604800, "Week"),
+                            (2419200, "28 days"),
+                            (2592000, "Month"),
+                            (0, "Lifetime"),
+                        ]
+                    ),
+                ),
+                (
+                    "metric",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        to="trackstats.metric",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Distribution by date",
+                "verbose_name_plural": "Distributions by date",
+                "unique_together": {("date", "metric", "period")},
+            },
+        ),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 4.1.13 on 2026-10-19 16:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("trackstats", "0007_distributions"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LatestStatisticByDateAndObject",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("value", models.BigIntegerField(null=True)),
+                (
+                    "period",
+                    models.IntegerField(
+                        choices=[
+                            (86400, "Day"),
+                            (604800, "Week"),
+                            (2419200, "28 days"),
+                            (2592000, "Month"),
+                            (0, "Lifetime"),
+                        ]
+                    ),
+                ),
+                ("object_id", models.PositiveIntegerField()),
+                ("date", models.DateField()),
+                (
+                    "metric",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        to="trackstats.metric",
+                    ),
+                ),
+                (
+                    "object_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        to="contenttypes.contenttype",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Latest statistic by date and object",
+                "verbose_name_plural": "Latest statistics by date and object",
+                "unique_together": {("metric", "object_type", "object_id", "period")},
+            },
+        ),
+        migrations.CreateModel(
+            name="LatestStatisticByDate",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("value", models.BigIntegerField(null=True)),
+                (
+                    "period",
+                    models.IntegerField(
+                        choices=[
+                            (86400, "Day"),
+                            (604800, "Week"),
+                            (2419200, "28 days"),
+                            (2592000, "Month"),
+                            (0, "Lifetime"),
+                        ]
+                    ),
+                ),
+                ("date", models.DateField()),
+                (
+                    "metric",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        to="trackstats.metric",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Latest statistic by date",
+                "verbose_name_plural": "Latest statistics by date",
+                "unique_together": {("metric", "period")},
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.1.13 on 2026-10-19 16:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("trackstats", "0008_latest_statistics"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="trackercheckpoint",
+            name="last_event_id",
+            field=models.BigIntegerField(
+                help_text="The last event aggregated, when tracking events", null=True
+            ),
+        ),
+        migrations.CreateModel(
+            name="Event",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("timestamp", models.DateTimeField(default=django.utils.timezone.now)),
+                ("object_id", models.PositiveIntegerField(blank=True, null=True)),
+                ("amount", models.BigIntegerField(blank=True, null=True)),
+                (
+                    "metric",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        to="trackstats.metric",
+                    ),
+                ),
+                (
+                    "object_type",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        to="contenttypes.contenttype",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["metric", "id"], name="trackstats__metric__a65868_idx"
+            ),
+        ),
+    ]
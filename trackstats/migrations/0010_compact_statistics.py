@@ -0,0 +1,71 @@
+# Generated by Django 4.1.13 on 2026-10-19 17:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+import trackstats.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("trackstats", "0009_event"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CompactStatisticByDateAndObject",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("object_id", models.PositiveIntegerField()),
+                (
+                    "month",
+                    models.DateField(
+                        db_index=True, help_text="The first day of the month"
+                    ),
+                ),
+                ("values", trackstats.models.DailyValuesField(default=list)),
+                (
+                    "period",
+                    models.IntegerField(
+                        choices=[
+                            (86400, "Day"),
+                            (604800, "Week"),
+                            (2419200, "28 days"),
+                            (2592000, "Month"),
+                            (0, "Lifetime"),
+                        ]
+                    ),
+                ),
+                (
+                    "metric",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        to="trackstats.metric",
+                    ),
+                ),
+                (
+                    "object_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        to="contenttypes.contenttype",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Compact statistic by date and object",
+                "verbose_name_plural": "Compact statistics by date and object",
+                "unique_together": {
+                    ("month", "metric", "object_type", "object_id", "period")
+                },
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.1.13 on 2026-10-19 17:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trackstats", "0010_compact_statistics"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="metric",
+            name="changed_at",
+            field=models.DateTimeField(
+                editable=False,
+                help_text="When statistics of this metric were last written",
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.1.13 on 2026-10-19 17:33
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trackstats", "0011_metric_changed_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="logged_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now,
+                editable=False,
+                help_text="When the event was stored, as opposed to when it occurred",
+            ),
+        ),
+    ]
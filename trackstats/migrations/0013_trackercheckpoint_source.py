@@ -0,0 +1,18 @@
+# Generated by Django 4.1.13 on 2026-10-19 17:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trackstats", "0012_event_logged_at"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="trackercheckpoint",
+            name="source",
+            field=models.CharField(help_text="The source tracked", max_length=200),
+        ),
+    ]
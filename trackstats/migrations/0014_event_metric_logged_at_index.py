@@ -0,0 +1,19 @@
+# Generated by Django 4.1.13 on 2026-10-19 17:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trackstats", "0013_trackercheckpoint_source"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["metric", "logged_at"], name="trackstats__metric__93b777_idx"
+            ),
+        ),
+    ]
@@ -1,10 +1,37 @@
-from datetime import date
-
+import json
+import threading
+import zlib
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import date, timedelta
+from itertools import islice
+
+from django.apps import apps
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
-from django.db import models
+from django.db import IntegrityError, connections, models, router, transaction
+from django.db.models.functions import Abs, Cast, Lag, NullIf
+from django.db.models.query import ModelIterable
+from django.utils import timezone
 from django.utils.functional import SimpleLazyObject, empty
 
+from . import app_settings
+from .db import copy_rows, is_postgresql, select_from
+from .sketches import Histogram
+
+
+def date_ranges(dates):
+    """Groups the given (sorted) dates into ranges of consecutive dates,
+    returned as a list of ``(first, last)`` tuples.
+    """
+    ranges = []
+    for day in dates:
+        if ranges and ranges[-1][1] + timedelta(days=1) == day:
+            ranges[-1] = (ranges[-1][0], day)
+        elif not ranges or ranges[-1][1] < day:
+            ranges.append((day, day))
+    return ranges
+
 
 class Period(object):
     DAY = 86400  # seconds
@@ -101,6 +128,11 @@ class Metric(models.Model):
         max_length=100, blank=True, help_text="Short descriptive name"
     )
     description = models.TextField(blank=True, help_text="Description")
+    changed_at = models.DateTimeField(
+        null=True,
+        editable=False,
+        help_text="When statistics of this metric were last written",
+    )
 
     class Meta:
         unique_together = ("domain", "ref")
@@ -112,9 +144,54 @@ class Metric(models.Model):
         return [self.source, self.ref]
 
 
+# The metrics to mark as changed, per database, collected by this thread
+# within ``deferred_touch()``.
+_deferred_touches = threading.local()
+
+
+def _touch_on_commit(using, metric_ids):
+    def touch():
+        Metric.objects.using(using).filter(pk__in=metric_ids).update(
+            changed_at=timezone.now()
+        )
+
+    # Right away, unless in a transaction.
+    transaction.on_commit(touch, using=using)
+
+
+@contextmanager
+def deferred_touch():
+    """Marks the metrics of the statistics written within (see ``touch()``)
+    as changed once, on leaving, instead of on every write. Trackers do so
+    per run.
+    """
+    if getattr(_deferred_touches, "pending", None) is not None:
+        # Marked by the outermost one.
+        yield
+        return
+    _deferred_touches.pending = defaultdict(set)
+    try:
+        yield
+    finally:
+        pending = _deferred_touches.pending
+        _deferred_touches.pending = None
+        for using, metric_ids in pending.items():
+            _touch_on_commit(using, metric_ids)
+
+
 class AbstractStatisticQuerySet(models.QuerySet):
 
     order_field = None
+    # Whether to mark the metrics of the statistics updated (or deleted)
+    # as changed, see ``update()``.
+    _touch_matching = True
+    # The model keeping the latest value of each series, maintained if
+    # TRACKSTATS_TRACK_LATEST is enabled (see ``ByDateQuerySetMixin``).
+    latest_model = None
+    # Whether a window of statistics can be replaced (see ``replace()``),
+    # and searched for gaps, as trackers do when re-tracking (or
+    # backfilling) it.
+    supports_windows = True
 
     def narrow(self, metric=None, metrics=None, period=None):
         qs = self
@@ -123,16 +200,247 @@ class AbstractStatisticQuerySet(models.QuerySet):
             metrics = [metric]
         if metrics is not None:
             qs = qs.filter(metric__in=metrics)
-        if period:
+        if period is not None:
             qs = qs.filter(period=period)
         return qs
 
-    def record(self, metric, value, period, **kwargs):
-        instance, _ = self.update_or_create(
-            period=period, metric=metric, defaults={"value": value}, **kwargs
-        )
+    @property
+    def write_db(self):
+        """The database statistics are recorded in. Existing statistics are
+        read from there as well when recording, to not be misled by
+        replication lag.
+        """
+        return self._db or router.db_for_write(self.model, **self._hints)
+
+    def get_record_kwargs(self, metric, period, **kwargs):
+        """Translates the keyword arguments of ``record()`` into the field
+        values identifying a statistic.
+        """
+        kwargs.update(metric=metric, period=period)
+        return kwargs
+
+    def get_record_key(self, kwargs):
+        """The value of the unique key of a statistic, as a tuple."""
+        key = []
+        for name in self.model._meta.unique_together[0]:
+            value = kwargs[name]
+            if isinstance(value, models.Model):
+                value = value.pk
+            # E.g. dates computed by the database may come in as strings.
+            key.append(self.model._meta.get_field(name).to_python(value))
+        return tuple(key)
+
+    def get_record_value(self, value):
+        return value
+
+    def record(self, value, **kwargs):
+        value = self.get_record_value(value)
+        with transaction.atomic(using=self.write_db):
+            instance, created = self.get_or_create(
+                defaults={"value": value}, **self.get_record_kwargs(**kwargs)
+            )
+            # Avoid no-op updates, which still cost a write (e.g. a dead
+            # tuple on PostgreSQL).
+            changed = created
+            if not created and instance.value != value:
+                instance.value = value
+                instance.save(update_fields=["value"])
+                changed = True
+            if changed:
+                # Saving marked the metric as changed.
+                self.update_latest([instance])
         return instance
 
+    def bulk_record(self, records, batch_size=1000):
+        """Records many statistics at once. ``records`` is an iterable of
+        dicts, each containing the keyword arguments you would otherwise
+        pass to ``record()``.
+
+        Per batch, the existing statistics are fetched using a single
+        query, after which the new ones are inserted and the changed ones
+        are updated in bulk. Statistics whose value did not change are not
+        written at all. Returns the number of statistics created, updated
+        and left unchanged.
+        """
+        return self._bulk_write(records, batch_size, increment=False)
+
+    def bulk_increment(self, records, batch_size=1000):
+        """Like ``bulk_record()``, but adds the values to those of the
+        existing statistics, e.g. to aggregate incrementally.
+        """
+        return self._bulk_write(records, batch_size, increment=True)
+
+    def replace(self, records, batch_size=1000):
+        """Records the statistics, as ``bulk_record()`` does, and deletes
+        all other statistics of this (narrowed down) queryset, e.g. those
+        of the days or objects in a date range that no longer have data.
+        The number of statistics deleted is returned as well.
+        """
+        qs = self.using(self.write_db)
+        key_fields = [
+            self.model._meta.get_field(name)
+            for name in self.model._meta.unique_together[0]
+        ]
+        keys = set()
+        with transaction.atomic(using=qs.db):
+            result = qs.model._default_manager.using(qs.db)._bulk_write(
+                records, batch_size, increment=False, keys=keys
+            )
+            stale = [
+                row
+                for row in qs.values_list(
+                    "pk", *(field.attname for field in key_fields)
+                ).iterator()
+                if tuple(row[1:]) not in keys
+            ]
+            for i in range(0, len(stale), batch_size):
+                qs.filter(pk__in=[row[0] for row in stale[i : i + batch_size]]).delete()
+            deleted = [
+                dict(zip((field.attname for field in key_fields), row[1:]))
+                for row in stale
+            ]
+            qs.refresh_latest(deleted)
+        result["deleted"] = len(stale)
+        return result
+
+    def _bulk_write(self, records, batch_size, increment, keys=None):
+        result = {"created": 0, "updated": 0, "unchanged": 0}
+        batch = []
+        for kwargs in records:
+            batch.append(kwargs)
+            if len(batch) >= batch_size:
+                batch_keys = self._bulk_record(batch, result, increment)
+                if keys is not None:
+                    keys.update(batch_keys)
+                batch = []
+        if batch:
+            batch_keys = self._bulk_record(batch, result, increment)
+            if keys is not None:
+                keys.update(batch_keys)
+        return result
+
+    def _bulk_record(self, batch, result, increment=False):
+        key_fields = [
+            self.model._meta.get_field(name)
+            for name in self.model._meta.unique_together[0]
+        ]
+        records = {}
+        for kwargs in batch:
+            kwargs = dict(kwargs)
+            value = self.get_record_value(kwargs.pop("value"))
+            kwargs = self.get_record_kwargs(**kwargs)
+            key = self.get_record_key(kwargs)
+            if increment and key in records:
+                value += records[key][1]
+            # Last one wins, just like calling record() repeatedly would.
+            records[key] = (kwargs, value)
+        qs = self.using(self.write_db)
+        try:
+            qs._write_records(key_fields, records, result, increment)
+        except IntegrityError:
+            # A concurrent writer created some of the statistics in the
+            # meantime: start over, updating those instead.
+            qs._write_records(key_fields, records, result, increment)
+        return set(records)
+
+    def _write_records(self, key_fields, records, result, increment):
+        lookups = {}
+        for i, field in enumerate(key_fields):
+            lookups[field.attname + "__in"] = set(key[i] for key in records)
+        existing = {}
+        for instance in self.filter(**lookups):
+            key = tuple(getattr(instance, field.attname) for field in key_fields)
+            existing[key] = instance
+        to_create = []
+        to_update = []
+        unchanged = 0
+        for key, (kwargs, value) in records.items():
+            instance = existing.get(key)
+            if increment and instance is not None:
+                value += instance.value or 0
+            if instance is None:
+                to_create.append(self.model(value=value, **kwargs))
+            elif instance.value != value:
+                instance.value = value
+                to_update.append(instance)
+            else:
+                unchanged += 1
+        with transaction.atomic(using=self.db):
+            self.bulk_create(to_create)
+            # Updating marks the metrics as changed, see ``bulk_update()``.
+            self.bulk_update(to_update, ["value"])
+            self.update_latest(to_create + to_update)
+            self.touch(stat.metric_id for stat in to_create)
+        result["created"] += len(to_create)
+        result["updated"] += len(to_update)
+        result["unchanged"] += unchanged
+
+    def touch(self, metric_ids):
+        """Marks the statistics of the given metrics as changed (see
+        ``Metric.changed_at``), e.g. to invalidate cached graphs.
+
+        The metrics are marked once the transaction writing the statistics
+        (if any) commits, or when leaving ``deferred_touch()``, so that
+        concurrent writers do not wait on (the rows of) the metrics.
+        """
+        metric_ids = set(metric_ids)
+        if not metric_ids:
+            return
+        pending = getattr(_deferred_touches, "pending", None)
+        if pending is not None:
+            pending[self.db].update(metric_ids)
+        else:
+            _touch_on_commit(self.db, metric_ids)
+
+    def touch_matching(self):
+        """Marks the metrics of the statistics in this queryset as changed."""
+        qs = self.using(self.write_db)
+        self.touch(qs.order_by().values_list("metric", flat=True).distinct())
+
+    def _clone(self):
+        clone = super(AbstractStatisticQuerySet, self)._clone()
+        clone._touch_matching = self._touch_matching
+        return clone
+
+    # Statistics changed by other means than recording these, e.g. in the
+    # admin, mark their metrics as changed as well.
+
+    def update(self, **kwargs):
+        if self._touch_matching:
+            self.touch_matching()
+        return super(AbstractStatisticQuerySet, self).update(**kwargs)
+
+    def delete(self):
+        if self._touch_matching:
+            self.touch_matching()
+        return super(AbstractStatisticQuerySet, self).delete()
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        objs = list(objs)
+        # The metrics are known, no need to look these up per batch.
+        qs = self._chain()
+        qs._touch_matching = False
+        ret = super(AbstractStatisticQuerySet, qs).bulk_update(objs, fields, batch_size)
+        self.touch(obj.metric_id for obj in objs)
+        return ret
+
+    def get_latest_model(self):
+        if self.latest_model is None or not app_settings.TRACK_LATEST:
+            return None
+        return apps.get_model(self.latest_model)
+
+    def update_latest(self, statistics):
+        """Keeps the latest values (if any, see ``ByDateQuerySetMixin``) up
+        to date with the given statistics, just written.
+        """
+        pass
+
+    def refresh_latest(self, deleted):
+        """Recomputes the latest values (if any) of the series of the
+        given deleted statistics (dicts of field values).
+        """
+        pass
+
     def most_recent(self, **kwargs):
         return self.narrow(**kwargs).order_by("-" + self.order_field).first()
 
@@ -148,6 +456,18 @@ class AbstractStatistic(models.Model):
     class Meta:
         abstract = True
 
+    def save(self, *args, **kwargs):
+        super(AbstractStatistic, self).save(*args, **kwargs)
+        self.__class__._default_manager.using(self._state.db).touch([self.metric_id])
+
+    def delete(self, using=None, keep_parents=False):
+        using = using or router.db_for_write(self.__class__, instance=self)
+        ret = super(AbstractStatistic, self).delete(
+            using=using, keep_parents=keep_parents
+        )
+        self.__class__._default_manager.using(using).touch([self.metric_id])
+        return ret
+
 
 class ByObjectMixin(models.Model):
     object_type = models.ForeignKey(ContentType, on_delete=models.PROTECT)
@@ -158,13 +478,74 @@ class ByObjectMixin(models.Model):
         abstract = True
 
 
+class ObjectsIterable(ModelIterable):
+    """Yields statistics with their objects loaded in bulk: per chunk of
+    statistics (or all of them, unless streaming using ``iterator()``),
+    one query per object type.
+    """
+
+    def __iter__(self):
+        batch = []
+        for stat in super(ObjectsIterable, self).__iter__():
+            batch.append(stat)
+            if self.chunked_fetch and len(batch) >= self.chunk_size:
+                yield from self.load_objects(batch)
+                batch = []
+        yield from self.load_objects(batch)
+
+    def load_objects(self, batch):
+        db = self.queryset.db
+        object_ids = defaultdict(set)
+        for stat in batch:
+            object_ids[stat.object_type_id].add(stat.object_id)
+        objects = {}
+        for object_type_id, ids in object_ids.items():
+            ct = ContentType.objects.db_manager(db).get_for_id(object_type_id)
+            model = ct.model_class()
+            if model is None:
+                # A stale content type, of a model that no longer exists.
+                continue
+            # The objects need not live in the database of the statistics.
+            qs = model._base_manager.using(router.db_for_read(model))
+            if self.queryset._object_fields is not None:
+                qs = qs.only(*self.queryset._object_fields)
+            for pk, obj in qs.in_bulk(ids).items():
+                objects[(object_type_id, pk)] = obj
+        field = self.queryset.model._meta.get_field("object")
+        for stat in batch:
+            field.set_cached_value(
+                stat, objects.get((stat.object_type_id, stat.object_id))
+            )
+        return batch
+
+
 class ByObjectQuerySetMixin(object):
-    def record(self, **kwargs):
-        object = kwargs.pop("object")
-        ct = ContentType.objects.get_for_model(object)
-        return super(ByObjectQuerySetMixin, self).record(
-            object_id=object.pk, object_type=ct, **kwargs
-        )
+
+    _object_fields = None
+
+    def _clone(self):
+        clone = super(ByObjectQuerySetMixin, self)._clone()
+        clone._object_fields = self._object_fields
+        return clone
+
+    def with_objects(self, only=None):
+        """Loads the objects of the statistics in bulk, one query per object
+        type, instead of one per statistic when accessing ``object``.
+        Pass ``only`` to restrict the fields loaded.
+        """
+        qs = self._chain()
+        qs._iterable_class = ObjectsIterable
+        qs._object_fields = only
+        return qs
+
+    def get_record_kwargs(self, **kwargs):
+        if "object" in kwargs:
+            object = kwargs.pop("object")
+            kwargs["object_type"] = ContentType.objects.db_manager(
+                self.write_db
+            ).get_for_model(object)
+            kwargs["object_id"] = object.pk
+        return super(ByObjectQuerySetMixin, self).get_record_kwargs(**kwargs)
 
     def narrow(self, **kwargs):
         qs = self
@@ -181,13 +562,15 @@ class ByObjectQuerySetMixin(object):
                 qs = self.none()
             else:
                 # Assumption: all objects are of same type
-                ct = ContentType.objects.get_for_model(objects[0])
+                ct = ContentType.objects.db_manager(self.db).get_for_model(objects[0])
                 qs = qs.filter(object_type=ct, object_id__in=[s.pk for s in objects])
         elif isinstance(objects, models.QuerySet):
-            ct = ContentType.objects.get_for_model(objects.model)
-            qs = qs.filter(
-                object_type=ct, object_id__in=objects.values_list("id", flat=True)
-            )
+            ct = ContentType.objects.db_manager(self.db).get_for_model(objects.model)
+            object_ids = objects.values_list("id", flat=True)
+            if objects.db != qs.db:
+                # Subqueries cannot span databases.
+                object_ids = list(object_ids)
+            qs = qs.filter(object_type=ct, object_id__in=object_ids)
         elif objects is None:
             pass
         elif isinstance(objects, models.query.EmptyQuerySet):
@@ -196,6 +579,38 @@ class ByObjectQuerySetMixin(object):
             raise NotImplementedError
         return super(ByObjectQuerySetMixin, qs).narrow(**kwargs)
 
+    def most_recent_for_objects(self, metric, period, objects):
+        """The most recent statistic of each of the given objects (a list,
+        tuple, set or queryset, as for ``narrow()``), as a dict keyed by
+        object ID, using a single query.
+        """
+        latest_model = self.get_latest_model()
+        if latest_model is not None:
+            qs = latest_model._default_manager.using(self.db)
+            qs = qs.narrow(metric=metric, period=period, objects=objects)
+        elif is_postgresql(self.db):
+            qs = (
+                self.narrow(metric=metric, period=period, objects=objects)
+                .order_by("object_type", "object_id", "-" + self.order_field)
+                .distinct("object_type", "object_id")
+            )
+        else:
+            newest = (
+                self.model._default_manager.using(self.db)
+                .filter(
+                    metric=models.OuterRef("metric"),
+                    period=models.OuterRef("period"),
+                    object_type=models.OuterRef("object_type"),
+                    object_id=models.OuterRef("object_id"),
+                )
+                .order_by("-" + self.order_field)
+                .values("pk")[:1]
+            )
+            qs = self.narrow(metric=metric, period=period, objects=objects).filter(
+                pk=models.Subquery(newest)
+            )
+        return {stat.object_id: stat for stat in qs}
+
 
 class ByDateMixin(models.Model):
     date = models.DateField(db_index=True)
@@ -208,9 +623,9 @@ class ByDateQuerySetMixin(object):
 
     order_field = "date"
 
-    def record(self, **kwargs):
-        dt = kwargs.pop("date", date.today())
-        return super(ByDateQuerySetMixin, self).record(date=dt, **kwargs)
+    def get_record_kwargs(self, **kwargs):
+        kwargs.setdefault("date", date.today())
+        return super(ByDateQuerySetMixin, self).get_record_kwargs(**kwargs)
 
     def narrow(self, **kwargs):
         """Up-to including"""
@@ -226,15 +641,227 @@ class ByDateQuerySetMixin(object):
             qs = qs.filter(date=date)
         return super(ByDateQuerySetMixin, qs).narrow(**kwargs)
 
+    def get_series_fields(self):
+        """The fields identifying a series of statistics over time."""
+        return [name for name in self.model._meta.unique_together[0] if name != "date"]
+
+    def update_latest(self, statistics):
+        latest_model = self.get_latest_model()
+        if latest_model is None:
+            return
+        date_field = self.model._meta.get_field("date")
+        attnames = [
+            self.model._meta.get_field(name).attname
+            for name in self.get_series_fields()
+        ]
+        newest = {}
+        for stat in statistics:
+            key = tuple(getattr(stat, attname) for attname in attnames)
+            stat_date = date_field.to_python(stat.date)
+            if key not in newest or newest[key][0] <= stat_date:
+                newest[key] = (stat_date, stat.value)
+        if not newest:
+            return
+        latest_qs = latest_model._default_manager.using(self.write_db)
+        lookups = {
+            attname + "__in": set(key[i] for key in newest)
+            for i, attname in enumerate(attnames)
+        }
+        existing = {
+            tuple(getattr(latest, attname) for attname in attnames): latest
+            for latest in latest_qs.filter(**lookups)
+        }
+        to_create = []
+        to_update = []
+        for key, (stat_date, value) in newest.items():
+            latest = existing.get(key)
+            if latest is None:
+                to_create.append(
+                    latest_model(
+                        date=stat_date, value=value, **dict(zip(attnames, key))
+                    )
+                )
+            elif latest.date < stat_date or (
+                latest.date == stat_date and latest.value != value
+            ):
+                latest.date = stat_date
+                latest.value = value
+                to_update.append(latest)
+        latest_qs.bulk_create(to_create, batch_size=1000)
+        latest_qs.bulk_update(to_update, ["date", "value"], batch_size=1000)
+
+    def refresh_latest(self, deleted):
+        latest_model = self.get_latest_model()
+        if latest_model is None:
+            return
+        attnames = [
+            self.model._meta.get_field(name).attname
+            for name in self.get_series_fields()
+        ]
+        qs = self.model._default_manager.using(self.write_db)
+        newest = []
+        for key in set(
+            tuple(stat[attname] for attname in attnames) for stat in deleted
+        ):
+            series = dict(zip(attnames, key))
+            latest_model._default_manager.using(qs.db).filter(**series).delete()
+            stat = qs.filter(**series).order_by("-date").first()
+            if stat is not None:
+                newest.append(stat)
+        qs.update_latest(newest)
+
+    def rebuild_latest(self):
+        """(Re)populates the latest values from all statistics, e.g. after
+        enabling TRACKSTATS_TRACK_LATEST on existing statistics.
+        """
+        latest_model = self.get_latest_model()
+        assert latest_model, "TRACKSTATS_TRACK_LATEST is not enabled"
+        qs = self.model._default_manager.using(self.write_db)
+        series = self.get_series_fields()
+        newest = (
+            qs.filter(**{name: models.OuterRef(name) for name in series})
+            .order_by("-date")
+            .values("date")[:1]
+        )
+        with transaction.atomic(using=qs.db):
+            latest_model._default_manager.using(qs.db).all().delete()
+            self.using(qs.db).update_latest(
+                qs.filter(date=models.Subquery(newest)).iterator()
+            )
+
+    def latest(self, *fields, **kwargs):
+        """Without field names, returns the latest statistic (e.g. for a
+        metric, period and object) using a single point lookup, if
+        TRACKSTATS_TRACK_LATEST is enabled. The result has a ``date`` and a
+        ``value``, or is ``None`` if there are no statistics.
+
+        Passing field names falls back to Django's ``QuerySet.latest()``.
+        """
+        if fields or not kwargs:
+            return super(ByDateQuerySetMixin, self).latest(*fields)
+        latest_model = self.get_latest_model()
+        if latest_model is None:
+            return self.most_recent(**kwargs)
+        return latest_model._default_manager.using(self.db).narrow(**kwargs).first()
+
+    def find_gaps(self, from_date, to_date, **kwargs):
+        """The ranges of dates, from ``from_date`` up to including
+        ``to_date``, lacking statistics (narrowed down using ``kwargs``),
+        as a list of ``(first, last)`` tuples. The missing dates are found
+        using a single query, against a calendar generated by the database.
+        """
+        stats = self.narrow(**kwargs).order_by().values("date")
+        connection = connections[self.db]
+        sql, params = stats.query.get_compiler(connection=connection).as_sql()
+        if connection.vendor == "postgresql":
+            calendar = (
+                "SELECT d::date AS d FROM generate_series("
+                "%s::date, %s::date, interval '1 day') AS d"
+            )
+        elif connection.vendor == "sqlite":
+            calendar = (
+                "WITH RECURSIVE calendar(d) AS (SELECT date(%s) UNION ALL"
+                " SELECT date(d, '+1 day') FROM calendar WHERE d < date(%s))"
+                " SELECT d FROM calendar"
+            )
+        elif connection.vendor == "mysql":
+            calendar = (
+                "WITH RECURSIVE calendar(d) AS (SELECT CAST(%s AS DATE) UNION ALL"
+                " SELECT d + INTERVAL 1 DAY FROM calendar WHERE d < %s)"
+                " SELECT d FROM calendar"
+            )
+        else:
+            raise NotImplementedError
+        date_field = self.model._meta.get_field("date")
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT calendar.d FROM ({}) calendar"
+                " WHERE calendar.d NOT IN ({}) ORDER BY calendar.d".format(
+                    calendar, sql
+                ),
+                [
+                    connection.ops.adapt_datefield_value(from_date),
+                    connection.ops.adapt_datefield_value(to_date),
+                ]
+                + list(params),
+            )
+            dates = [date_field.to_python(row[0]) for row in cursor.fetchall()]
+        return date_ranges(dates)
+
+    def with_previous(self, offset=None):
+        """Annotates each statistic with the value of its series in the
+        previous period (``previous_value``), and the change compared to
+        that (``delta`` and ``relative_delta``, the latter being ``None``
+        if the previous value is zero).
+
+        The previous period is the date ``offset`` (a ``timedelta``)
+        earlier, e.g. ``timedelta(days=7)`` for week-over-week. Without an
+        offset, the preceding statistic of the series is used, by means of
+        a ``LAG()`` window over the statistics selected, i.e. narrowed down
+        before annotating. Filters added after annotating (e.g. on the date
+        range) do not change the previous values, the window being
+        computed in a subquery.
+        """
+        series = self.get_series_fields()
+        if offset is None and connections[self.db].features.supports_over_clause:
+            qs = select_from(
+                self,
+                previous_value=models.Window(
+                    Lag("value"),
+                    partition_by=[models.F(name) for name in series],
+                    order_by=models.F("date").asc(),
+                ),
+            )
+        else:
+            previous_qs = self.model._default_manager.using(self.db).filter(
+                **{name: models.OuterRef(name) for name in series}
+            )
+            if offset is None:
+                previous_qs = previous_qs.filter(
+                    date__lt=models.OuterRef("date")
+                ).order_by("-date")
+            else:
+                previous_qs = previous_qs.filter(
+                    date=Cast(models.OuterRef("date") - offset, models.DateField())
+                )
+            qs = self.annotate(
+                previous_value=models.Subquery(previous_qs.values("value")[:1])
+            )
+        return qs.annotate(
+            delta=models.F("value") - models.F("previous_value"),
+            relative_delta=(
+                Cast(
+                    models.F("value") - models.F("previous_value"), models.FloatField()
+                )
+                / Cast(NullIf(models.F("previous_value"), 0), models.FloatField())
+            ),
+        )
+
+    def movers(self, n, offset=timedelta(days=1), relative=False, **kwargs):
+        """The ``n`` statistics that changed the most (up or down) compared
+        to the date ``offset`` earlier, e.g. the objects whose comment count
+        grew or shrunk the most since last week::
+
+            StatisticByDateAndObject.objects.movers(
+                10, timedelta(days=7), metric=..., period=Period.LIFETIME,
+                date=date.today())
+        """
+        field = "relative_delta" if relative else "delta"
+        return (
+            self.narrow(**kwargs)
+            .with_previous(offset)
+            .order_by(Abs(field).desc(nulls_last=True))[:n]
+        )
+
 
 class StatisticByDateQuerySet(ByDateQuerySetMixin, AbstractStatisticQuerySet):
-    pass
+    latest_model = "trackstats.LatestStatisticByDate"
 
 
 class StatisticByDateAndObjectQuerySet(
     ByDateQuerySetMixin, ByObjectQuerySetMixin, AbstractStatisticQuerySet
 ):
-    pass
+    latest_model = "trackstats.LatestStatisticByDateAndObject"
 
 
 class StatisticByDate(ByDateMixin, AbstractStatistic):
@@ -259,3 +886,730 @@ class StatisticByDateAndObject(ByDateMixin, ByObjectMixin, AbstractStatistic):
 
     def __str__(self):
         return "{date}: {value}".format(date=self.date, value=self.value)
+
+
+class LatestStatisticByDateAndObjectQuerySet(
+    ByObjectQuerySetMixin, AbstractStatisticQuerySet
+):
+    pass
+
+
+class LatestStatisticByDate(AbstractStatistic):
+    """The most recent ``StatisticByDate`` per metric and period."""
+
+    objects = AbstractStatisticQuerySet.as_manager()
+
+    date = models.DateField()
+
+    class Meta:
+        unique_together = ["metric", "period"]
+        verbose_name = "Latest statistic by date"
+        verbose_name_plural = "Latest statistics by date"
+
+    def __str__(self):
+        return "{date}: {value}".format(date=self.date, value=self.value)
+
+
+class LatestStatisticByDateAndObject(ByObjectMixin, AbstractStatistic):
+    """The most recent ``StatisticByDateAndObject`` per metric, object and
+    period.
+    """
+
+    objects = LatestStatisticByDateAndObjectQuerySet.as_manager()
+
+    date = models.DateField()
+
+    class Meta:
+        unique_together = ["metric", "object_type", "object_id", "period"]
+        verbose_name = "Latest statistic by date and object"
+        verbose_name_plural = "Latest statistics by date and object"
+
+    def __str__(self):
+        return "{date}: {value}".format(date=self.date, value=self.value)
+
+
+class AbstractDistributionQuerySet(AbstractStatisticQuerySet):
+    def get_record_value(self, value):
+        if isinstance(value, Histogram):
+            value = value.to_dict()
+        return value
+
+    def merged(self, **kwargs):
+        """Merges the histograms of the narrowed distributions into one,
+        e.g. to get the distribution over a date range.
+        """
+        ret = None
+        for data in self.narrow(**kwargs).values_list("value", flat=True):
+            histogram = Histogram.from_dict(data)
+            ret = histogram if ret is None else ret.merge(histogram)
+        return ret
+
+    def quantiles(self, quantiles=(0.5, 0.95, 0.99), **kwargs):
+        """Estimates the given quantiles over all narrowed distributions,
+        returned as ``{quantile: value}``.
+        """
+        histogram = self.merged(**kwargs)
+        return {q: histogram.quantile(q) if histogram else None for q in quantiles}
+
+
+class AbstractDistribution(models.Model):
+    metric = models.ForeignKey(Metric, on_delete=models.PROTECT)
+    value = models.JSONField(
+        help_text="A mergeable histogram, see trackstats.sketches.Histogram"
+    )
+    period = models.IntegerField(choices=PERIOD_CHOICES)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def histogram(self):
+        return Histogram.from_dict(self.value)
+
+
+class DistributionByDateQuerySet(ByDateQuerySetMixin, AbstractDistributionQuerySet):
+    pass
+
+
+class DistributionByDateAndObjectQuerySet(
+    ByDateQuerySetMixin, ByObjectQuerySetMixin, AbstractDistributionQuerySet
+):
+    pass
+
+
+class DistributionByDate(ByDateMixin, AbstractDistribution):
+    objects = DistributionByDateQuerySet.as_manager()
+
+    class Meta:
+        unique_together = ["date", "metric", "period"]
+        verbose_name = "Distribution by date"
+        verbose_name_plural = "Distributions by date"
+
+    def __str__(self):
+        return "{date}: {count} values".format(
+            date=self.date, count=self.value["count"]
+        )
+
+
+class DistributionByDateAndObject(ByDateMixin, ByObjectMixin, AbstractDistribution):
+    objects = DistributionByDateAndObjectQuerySet.as_manager()
+
+    class Meta:
+        unique_together = ["date", "metric", "object_type", "object_id", "period"]
+        verbose_name = "Distribution by date and object"
+        verbose_name_plural = "Distributions by date and object"
+
+    def __str__(self):
+        return "{date}: {count} values".format(
+            date=self.date, count=self.value["count"]
+        )
+
+
+class DailyValuesField(models.Field):
+    """The values of the days of a month, as a list indexed by day (minus
+    one), ``None`` meaning no value. Stored as a ``bigint[]`` on
+    PostgreSQL, and as a JSON array elsewhere.
+    """
+
+    def db_type(self, connection):
+        if connection.vendor == "postgresql":
+            return "bigint[]"
+        return "text"
+
+    def from_db_value(self, value, expression, connection):
+        return self.to_python(value)
+
+    def to_python(self, value):
+        if isinstance(value, str):
+            value = json.loads(value)
+        return value
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if value is None or connection.vendor == "postgresql":
+            return value
+        return json.dumps(value)
+
+
+class ByMonthMixin(models.Model):
+    month = models.DateField(db_index=True, help_text="The first day of the month")
+    values = DailyValuesField(default=list)
+
+    class Meta:
+        abstract = True
+
+
+class ByMonthQuerySetMixin(object):
+    """Statistics by date, stored compactly: one row per month of a series,
+    holding the values of all of its days. The statistics are recorded and
+    narrowed down as usual, and read using ``series()``, which expands the
+    rows into (unsaved) instances of ``statistic_model``.
+    """
+
+    order_field = "month"
+    statistic_model = None
+    supports_windows = False
+    _date_range = (None, None)
+
+    def _clone(self):
+        clone = super(ByMonthQuerySetMixin, self)._clone()
+        clone._date_range = self._date_range
+        return clone
+
+    def get_record_kwargs(self, **kwargs):
+        kwargs.setdefault("date", date.today())
+        return super(ByMonthQuerySetMixin, self).get_record_kwargs(**kwargs)
+
+    def get_record_key(self, kwargs):
+        # The key of the row, followed by the date within it.
+        day = self.model._meta.get_field("month").to_python(kwargs["date"])
+        key = super(ByMonthQuerySetMixin, self).get_record_key(
+            dict(kwargs, month=day.replace(day=1))
+        )
+        return key + (day,)
+
+    def record(self, value, **kwargs):
+        """Records a single statistic, returned as an (unsaved) instance of
+        ``statistic_model``, as it has no row of its own.
+        """
+        kwargs = self.get_record_kwargs(**kwargs)
+        self.bulk_record([dict(kwargs, value=value)])
+        return apps.get_model(self.statistic_model)(
+            value=self.get_record_value(value), **kwargs
+        )
+
+    def replace(self, records, batch_size=1000):
+        raise NotImplementedError("Compact statistics cannot be replaced")
+
+    def _write_records(self, key_fields, records, result, increment):
+        if any(value is None for kwargs, value in records.values()):
+            # Stored as NULL, which is what a day without statistic is.
+            raise ValueError("Compact statistics cannot record a value of None")
+        months = defaultdict(dict)
+        for key, (kwargs, value) in records.items():
+            months[key[:-1]][key[-1]] = value
+        lookups = {}
+        for i, field in enumerate(key_fields):
+            lookups[field.attname + "__in"] = set(key[i] for key in months)
+        counts = Counter()
+        with transaction.atomic(using=self.db):
+            # The days of a month share a row: lock it, for concurrent
+            # writers of other days not to be overwritten.
+            existing = {}
+            for row in self.filter(**lookups).select_for_update():
+                key = tuple(getattr(row, field.attname) for field in key_fields)
+                existing[key] = row
+            to_create = []
+            to_update = []
+            for key, days in months.items():
+                row = existing.get(key)
+                if row is None:
+                    row = self.model(
+                        **dict(zip((field.attname for field in key_fields), key))
+                    )
+                values = list(row.values)
+                changed = False
+                for day, value in days.items():
+                    index = day.day - 1
+                    values.extend([None] * (index + 1 - len(values)))
+                    old_value = values[index]
+                    if increment and old_value is not None:
+                        value += old_value
+                    if old_value == value:
+                        counts["unchanged"] += 1
+                        continue
+                    counts["created" if old_value is None else "updated"] += 1
+                    values[index] = value
+                    changed = True
+                row.values = values
+                if row.pk is None:
+                    to_create.append(row)
+                elif changed:
+                    to_update.append(row)
+            self.bulk_create(to_create)
+            self.bulk_update(to_update, ["values"])
+            self.touch(row.metric_id for row in to_create)
+        # Counted once written, as writing is retried on conflicts.
+        for name, count in counts.items():
+            result[name] += count
+
+    def narrow(self, **kwargs):
+        """Up-to including, narrowing down the rows to the months covering
+        the date range, and ``series()`` to the dates within it.
+        """
+        from_date = kwargs.pop("from_date", None)
+        to_date = kwargs.pop("to_date", None)
+        date = kwargs.pop("date", None)
+        if date:
+            from_date = to_date = date
+        qs = self
+        if from_date:
+            qs = qs.filter(month__gte=from_date.replace(day=1))
+        if to_date:
+            qs = qs.filter(month__lte=to_date)
+        qs = qs._chain()
+        current_from, current_to = qs._date_range
+        qs._date_range = (
+            max(filter(None, [current_from, from_date]), default=None),
+            min(filter(None, [current_to, to_date]), default=None),
+        )
+        return super(ByMonthQuerySetMixin, qs).narrow(**kwargs)
+
+    def get_series_fields(self):
+        return [name for name in self.model._meta.unique_together[0] if name != "month"]
+
+    def expand(self, row):
+        """The statistics stored in the given row, within the date range
+        narrowed down to.
+        """
+        model = apps.get_model(self.statistic_model)
+        attnames = [
+            self.model._meta.get_field(name).attname
+            for name in self.get_series_fields()
+        ]
+        from_date, to_date = self._date_range
+        ret = []
+        for i, value in enumerate(row.values):
+            day = row.month + timedelta(days=i)
+            if (
+                value is None
+                or (from_date and day < from_date)
+                or (to_date and day > to_date)
+            ):
+                continue
+            ret.append(
+                model(
+                    date=day,
+                    value=value,
+                    **{attname: getattr(row, attname) for attname in attnames}
+                )
+            )
+        return ret
+
+    def series(self, **kwargs):
+        """The statistics (narrowed down using ``kwargs``), ordered by
+        series and date.
+        """
+        qs = self.narrow(**kwargs)
+        if not qs.ordered:
+            qs = qs.order_by(*(qs.get_series_fields() + ["month"]))
+        return [stat for row in qs for stat in qs.expand(row)]
+
+    def most_recent(self, **kwargs):
+        qs = self.narrow(**kwargs)
+        for row in qs.order_by("-month").iterator():
+            stats = qs.expand(row)
+            if stats:
+                return stats[-1]
+        return None
+
+
+class CompactStatisticByDateAndObjectQuerySet(
+    ByMonthQuerySetMixin, ByObjectQuerySetMixin, AbstractStatisticQuerySet
+):
+    statistic_model = "trackstats.StatisticByDateAndObject"
+
+
+class CompactStatisticByDateAndObject(ByMonthMixin, ByObjectMixin, models.Model):
+    """``StatisticByDateAndObject``, stored compactly (see
+    ``ByMonthQuerySetMixin``), for dense series: a single row (and index
+    entry) per month, instead of one per day.
+    """
+
+    metric = models.ForeignKey(Metric, on_delete=models.PROTECT)
+    period = models.IntegerField(choices=PERIOD_CHOICES)
+
+    objects = CompactStatisticByDateAndObjectQuerySet.as_manager()
+
+    class Meta:
+        unique_together = ["month", "metric", "object_type", "object_id", "period"]
+        verbose_name = "Compact statistic by date and object"
+        verbose_name_plural = "Compact statistics by date and object"
+
+    def __str__(self):
+        return "{month:%Y-%m}: {count} values".format(
+            month=self.month,
+            count=sum(1 for value in self.values if value is not None),
+        )
+
+
+class DimensionValueManager(models.Manager):
+    def intern(self, values):
+        """Returns a dictionary mapping each of the given values to its
+        (possibly newly created) ``DimensionValue``.
+        """
+        values = set(DimensionValue.to_value(value) for value in values)
+        ret = {dim.value: dim for dim in self.filter(value__in=values)}
+        missing = values.difference(ret)
+        if missing:
+            self.bulk_create(
+                [DimensionValue(value=value) for value in missing],
+                ignore_conflicts=True,
+            )
+            ret.update({dim.value: dim for dim in self.filter(value__in=missing)})
+        return ret
+
+
+class DimensionValue(models.Model):
+    """An interned dimension value (e.g. a country code or a plan name),
+    keeping statistics by dimension narrow and well indexed.
+    """
+
+    # Stands in for a missing value (``None``), keeping it apart from an
+    # empty one.
+    NULL = "\u2400"
+
+    objects = DimensionValueManager()
+
+    value = models.CharField(max_length=255, unique=True)
+
+    def __str__(self):
+        return self.value
+
+    @staticmethod
+    def to_value(value):
+        return DimensionValue.NULL if value is None else str(value)
+
+
+class ByDimensionMixin(models.Model):
+    dimension = models.ForeignKey(DimensionValue, on_delete=models.PROTECT)
+
+    class Meta:
+        abstract = True
+
+
+class ByDimensionQuerySetMixin(object):
+    def get_record_kwargs(self, **kwargs):
+        dimension = kwargs["dimension"]
+        if not isinstance(dimension, DimensionValue):
+            kwargs["dimension"] = DimensionValue.objects.db_manager(
+                self.write_db
+            ).intern([dimension])[DimensionValue.to_value(dimension)]
+        return super(ByDimensionQuerySetMixin, self).get_record_kwargs(**kwargs)
+
+    def _bulk_record(self, batch, result, increment=False):
+        # Intern all dimension values of the batch at once.
+        dimensions = DimensionValue.objects.db_manager(self.write_db).intern(
+            kwargs["dimension"]
+            for kwargs in batch
+            if not isinstance(kwargs["dimension"], DimensionValue)
+        )
+        batch = [
+            dict(
+                kwargs,
+                dimension=dimensions.get(
+                    DimensionValue.to_value(kwargs["dimension"]), kwargs["dimension"]
+                ),
+            )
+            for kwargs in batch
+        ]
+        return super(ByDimensionQuerySetMixin, self)._bulk_record(
+            batch, result, increment
+        )
+
+    def narrow(self, **kwargs):
+        qs = self
+        dimension = kwargs.pop("dimension", None)
+        dimensions = kwargs.pop("dimensions", None)
+        assert dimension is None or dimensions is None
+        if dimension is not None:
+            dimensions = [dimension]
+        if dimensions is not None:
+            instances = [d for d in dimensions if isinstance(d, DimensionValue)]
+            values = [
+                DimensionValue.to_value(d)
+                for d in dimensions
+                if not isinstance(d, DimensionValue)
+            ]
+            qs = qs.filter(
+                models.Q(dimension__in=instances)
+                | models.Q(dimension__value__in=values)
+            )
+        return super(ByDimensionQuerySetMixin, qs).narrow(**kwargs)
+
+    def top(self, n, **kwargs):
+        """The ``n`` dimension values having the highest total value (summed
+        over the narrowed statistics), as a list of ``(value, total)``
+        tuples.
+        """
+        return list(
+            self.narrow(**kwargs)
+            .order_by()
+            .values("dimension__value")
+            .annotate(total=models.Sum("value"))
+            .order_by("-total", "dimension__value")
+            .values_list("dimension__value", "total")[:n]
+        )
+
+    def pivot(self, **kwargs):
+        """The narrowed statistics as ``{date: {dimension value: value}}``."""
+        ret = {}
+        rows = (
+            self.narrow(**kwargs)
+            .order_by("date")
+            .values_list("date", "dimension__value", "value")
+        )
+        for dt, dimension, value in rows:
+            ret.setdefault(dt, {})[dimension] = value
+        return ret
+
+
+class StatisticByDateAndDimensionQuerySet(
+    ByDateQuerySetMixin, ByDimensionQuerySetMixin, AbstractStatisticQuerySet
+):
+    pass
+
+
+class StatisticByDateAndDimension(ByDateMixin, ByDimensionMixin, AbstractStatistic):
+    objects = StatisticByDateAndDimensionQuerySet.as_manager()
+
+    class Meta:
+        unique_together = ["date", "metric", "dimension", "period"]
+        verbose_name = "Statistic by date and dimension"
+        verbose_name_plural = "Statistics by date and dimension"
+
+    def __str__(self):
+        return "{date}: {value}".format(date=self.date, value=self.value)
+
+
+# The first key of the PostgreSQL advisory locks taken on checkpoints, to
+# not collide with those of others.
+LOCK_NAMESPACE = zlib.crc32(b"trackstats") & 0x7FFFFFFF
+
+# The checkpoints locked by this thread (i.e. by its database sessions),
+# per database. Advisory locks are re-entrant: a session taking a lock it
+# holds already succeeds.
+_advisory_locks = threading.local()
+
+
+def _held_locks(db):
+    return _advisory_locks.__dict__.setdefault(db, set())
+
+
+class TrackerCheckpointManager(models.Manager):
+    def get_for(self, metric, period, source, object_type=None, object_id=None):
+        """Fetches (or creates) the checkpoint of the tracker identified by
+        the given metric, period, object scope and source.
+        """
+        key = ":".join(
+            str(part)
+            for part in [
+                metric.pk,
+                period,
+                object_type.pk if object_type else "",
+                "" if object_id is None else object_id,
+                source,
+            ]
+        )
+        checkpoint, _ = self.get_or_create(
+            key=key,
+            defaults=dict(
+                metric=metric,
+                period=period,
+                object_type=object_type,
+                object_id=object_id,
+                source=source,
+            ),
+        )
+        return checkpoint
+
+
+class TrackerCheckpoint(models.Model):
+    """Records up to which date a tracker has tracked its statistics, so
+    that it can resume from there, even if it did not find any data.
+    """
+
+    STATUS_RUNNING = "running"
+    STATUS_COMPLETED = "completed"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = (
+        (STATUS_RUNNING, "Running"),
+        (STATUS_COMPLETED, "Completed"),
+        (STATUS_FAILED, "Failed"),
+    )
+
+    objects = TrackerCheckpointManager()
+
+    key = models.CharField(
+        max_length=255, unique=True, help_text="Identifies the tracker"
+    )
+    metric = models.ForeignKey(Metric, on_delete=models.CASCADE)
+    period = models.IntegerField(choices=PERIOD_CHOICES)
+    object_type = models.ForeignKey(
+        ContentType, null=True, blank=True, on_delete=models.CASCADE
+    )
+    object_id = models.PositiveIntegerField(null=True, blank=True)
+    source = models.CharField(max_length=200, help_text="The source tracked")
+    high_water_mark = models.DateField(
+        null=True, help_text="Statistics are complete up to including this date"
+    )
+    last_event_id = models.BigIntegerField(
+        null=True, help_text="The last event aggregated, when tracking events"
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, blank=True)
+    started_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+
+    def __str__(self):
+        return self.key
+
+    def start(self):
+        self.status = self.STATUS_RUNNING
+        self.started_at = timezone.now()
+        self.finished_at = None
+        self.save(update_fields=["status", "started_at", "finished_at"])
+
+    def acquire(self, timeout=None):
+        """Starts a run, unless another one is running already, in which
+        case ``False`` is returned.
+
+        On PostgreSQL, this takes a session level advisory lock, which is
+        released when the run finishes (or the connection is lost). Runs
+        in the same session (i.e. thread) are told apart by keeping track
+        of the locks taken, as the session would take these again.
+        Elsewhere, the checkpoint itself serves as lock, by means of a
+        conditional update of its status. A run that started more than
+        ``timeout`` (a ``timedelta``) ago is then assumed to have died.
+        """
+        db = self._state.db
+        self._previous_state = (self.status, self.started_at, self.finished_at)
+        if is_postgresql(db):
+            locks = _held_locks(db)
+            if self.pk in locks:
+                return False
+            with connections[db].cursor() as cursor:
+                cursor.execute(
+                    "SELECT pg_try_advisory_lock(%s, %s)", [LOCK_NAMESPACE, self.pk]
+                )
+                if not cursor.fetchone()[0]:
+                    return False
+            locks.add(self.pk)
+            self.start()
+            return True
+        now = timezone.now()
+        available = ~models.Q(status=self.STATUS_RUNNING)
+        if timeout is not None:
+            available |= models.Q(started_at__lt=now - timeout)
+        acquired = (
+            TrackerCheckpoint.objects.using(db)
+            .filter(available, pk=self.pk)
+            .update(status=self.STATUS_RUNNING, started_at=now, finished_at=None)
+        )
+        if acquired:
+            self.status = self.STATUS_RUNNING
+            self.started_at = now
+            self.finished_at = None
+        return bool(acquired)
+
+    def release(self):
+        db = self._state.db
+        if is_postgresql(db) and self.pk in _held_locks(db):
+            _held_locks(db).discard(self.pk)
+            with connections[db].cursor() as cursor:
+                cursor.execute(
+                    "SELECT pg_advisory_unlock(%s, %s)", [LOCK_NAMESPACE, self.pk]
+                )
+
+    def abandon(self):
+        """Releases an acquired checkpoint without having run."""
+        self.status, self.started_at, self.finished_at = self._previous_state
+        self.save(update_fields=["status", "started_at", "finished_at"])
+        self.release()
+
+    def complete(self, high_water_mark):
+        self.status = self.STATUS_COMPLETED
+        self.high_water_mark = high_water_mark
+        self.finished_at = timezone.now()
+        self.save(update_fields=["status", "high_water_mark", "finished_at"])
+        self.release()
+
+    def fail(self):
+        self.status = self.STATUS_FAILED
+        self.finished_at = timezone.now()
+        self.save(update_fields=["status", "finished_at"])
+        self.release()
+
+
+class EventManager(models.Manager):
+    def ingest(self, events, batch_size=10000, use_copy=True):
+        """Stores many events at once. ``events`` is an iterable of dicts
+        containing the ``metric``, and optionally the ``timestamp``
+        (defaulting to now), ``object`` and ``amount``.
+
+        On PostgreSQL, batches are loaded using ``COPY`` (unless
+        ``use_copy`` is false), elsewhere using ``bulk_create()``. Returns
+        the number of events stored.
+        """
+        using = self.db
+        columns = [
+            "metric_id",
+            "timestamp",
+            "object_type_id",
+            "object_id",
+            "amount",
+            "logged_at",
+        ]
+        content_types = ContentType.objects.db_manager(using)
+        count = 0
+        events = iter(events)
+        while True:
+            batch = []
+            for kwargs in islice(events, batch_size):
+                event = Event(
+                    metric=kwargs["metric"],
+                    timestamp=kwargs.get("timestamp") or timezone.now(),
+                    amount=kwargs.get("amount"),
+                )
+                if kwargs.get("object") is not None:
+                    event.object_type = content_types.get_for_model(kwargs["object"])
+                    event.object_id = kwargs["object"].pk
+                batch.append(event)
+            if not batch:
+                return count
+            if use_copy and is_postgresql(using):
+                with connections[using].cursor() as cursor:
+                    copy_rows(
+                        cursor,
+                        self.model._meta.db_table,
+                        columns,
+                        [
+                            [getattr(event, column) for column in columns]
+                            for event in batch
+                        ],
+                    )
+            else:
+                self.bulk_create(batch)
+            count += len(batch)
+
+
+class Event(models.Model):
+    """An append-only log of events (e.g. feature usage, impressions),
+    to be aggregated into statistics by the event trackers.
+    """
+
+    objects = EventManager()
+
+    metric = models.ForeignKey(Metric, on_delete=models.PROTECT)
+    timestamp = models.DateTimeField(default=timezone.now)
+    object_type = models.ForeignKey(
+        ContentType, null=True, blank=True, on_delete=models.PROTECT
+    )
+    object_id = models.PositiveIntegerField(null=True, blank=True)
+    object = GenericForeignKey("object_type", "object_id")
+    amount = models.BigIntegerField(null=True, blank=True)
+    logged_at = models.DateTimeField(
+        default=timezone.now,
+        editable=False,
+        help_text="When the event was stored, as opposed to when it occurred",
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["metric", "id"]),
+            # Finding the events settled, see ``EventTrackerMixin``.
+            models.Index(fields=["metric", "logged_at"]),
+        ]
+
+    def __str__(self):
+        return "{metric}: {timestamp}".format(
+            metric=self.metric, timestamp=self.timestamp
+        )
@@ -0,0 +1,54 @@
+from django.utils.module_loading import autodiscover_modules
+
+
+class TrackerRegistry(object):
+    """Keeps the trackers of a project, along with the querysets they
+    track, so that these can be run by the management commands. Register
+    them from a ``trackers`` module in any of your apps::
+
+        from trackstats.registry import registry
+
+        registry.register(
+            "users",
+            CountObjectsByDateTracker(
+                period=Period.DAY,
+                metric=Metric.objects.USERS_USER_COUNT,
+                date_field="date_joined",
+            ),
+            User.objects.all(),
+        )
+    """
+
+    def __init__(self):
+        self._trackers = {}
+        self._discovered = False
+
+    def register(self, name, tracker, queryset):
+        assert name not in self._trackers, "Tracker {!r} already registered".format(
+            name
+        )
+        if getattr(tracker, "name", None) is None:
+            # Keys the checkpoints of the tracker.
+            tracker.name = name
+        self._trackers[name] = (tracker, queryset)
+
+    def unregister(self, name):
+        del self._trackers[name]
+
+    def autodiscover(self):
+        if not self._discovered:
+            autodiscover_modules("trackers")
+            self._discovered = True
+
+    def get(self, name):
+        """Returns the tracker registered as ``name``, along with a fresh
+        copy of its queryset.
+        """
+        tracker, queryset = self._trackers[name]
+        return tracker, queryset.all()
+
+    def names(self):
+        return sorted(self._trackers)
+
+
+registry = TrackerRegistry()
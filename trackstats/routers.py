@@ -0,0 +1,37 @@
+from . import app_settings
+
+
+class TrackStatsRouter(object):
+    """Routes all trackstats models to the database configured by means of
+    ``TRACKSTATS_DATABASE``, e.g. a separate analytics database::
+
+        DATABASE_ROUTERS = ["trackstats.routers.TrackStatsRouter"]
+        TRACKSTATS_DATABASE = "analytics"
+
+    Note that the statistics refer to content types, so the
+    ``contenttypes`` app needs to be migrated on that database as well.
+    """
+
+    app_label = "trackstats"
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == self.app_label:
+            return app_settings.DATABASE
+        return None
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label == self.app_label:
+            return app_settings.DATABASE
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if self.app_label in (obj1._meta.app_label, obj2._meta.app_label):
+            # E.g. statistics referring to content types, which live in
+            # both databases.
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if app_label == self.app_label and app_settings.DATABASE:
+            return db == app_settings.DATABASE
+        return None
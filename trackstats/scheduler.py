@@ -0,0 +1,154 @@
+from collections import defaultdict
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+
+from .registry import registry as default_registry
+from .trackers import TrackerLocked, TrackerNotSupported
+
+
+class ScheduleResult(object):
+    def __init__(self):
+        # The runs of the trackers that completed, in order of completion.
+        self.runs = {}
+        self.locked = []
+        self.failed = {}
+        # Not supporting what was asked (e.g. re-tracking a window), by name
+        # the ``TrackerNotSupported`` raised. Their statistics are left as
+        # is, so trackers depending on them do run.
+        self.unsupported = {}
+        # Not run, as (some of) their inputs could not be tracked.
+        self.skipped = []
+
+
+def get_dependencies(trackers):
+    """Maps the name of each of the given trackers (a dict of name to
+    tracker) to the names of those tracking the statistics it reads.
+    """
+    producers = defaultdict(set)
+    for name, tracker in trackers.items():
+        for metric in tracker.get_metrics():
+            producers[(metric.pk, tracker.period)].add(name)
+    return {
+        name: set().union(
+            *(
+                producers[(metric.pk, period)]
+                for metric, period in tracker.get_dependencies()
+            )
+        )
+        - {name}
+        for name, tracker in trackers.items()
+    }
+
+
+def get_order(dependencies):
+    """The names in ``dependencies`` (as returned by ``get_dependencies()``)
+    ordered such that each comes after those it depends on.
+    """
+    ret = []
+    remaining = dict(dependencies)
+    while remaining:
+        ready = sorted(
+            name for name, names in remaining.items() if not names - set(ret)
+        )
+        if not ready:
+            raise ImproperlyConfigured(
+                "Circular tracker dependencies: {}".format(", ".join(sorted(remaining)))
+            )
+        ret.extend(ready)
+        for name in ready:
+            del remaining[name]
+    return ret
+
+
+def run_tracker(tracker, qs, kwargs, threaded):
+    try:
+        tracker.track(qs, **kwargs)
+    finally:
+        if threaded:
+            # Each thread has connections of its own, close these.
+            connections.close_all()
+    return tracker.run
+
+
+def schedule(
+    names=None,
+    from_date=None,
+    to_date=None,
+    refresh_periods=(),
+    max_workers=1,
+    registry=default_registry,
+):
+    """Runs the registered trackers (all, unless ``names`` are given) in
+    the order of their dependencies, e.g. derived metrics after the
+    trackers of their inputs, as soon as these completed. Independent
+    trackers run in parallel, using up to ``max_workers`` threads. Those
+    depending on a tracker that failed (or was locked) are skipped, so
+    that these are not tracked from stale inputs. Dependencies on trackers
+    not given, or not supporting the run (see ``TrackerNotSupported``), are
+    assumed to be satisfied.
+
+    The window to re-track, if any, applies to all trackers, so that any
+    derived from the statistics re-tracked are refreshed as well.
+    """
+    names = names or registry.names()
+    trackers = {name: registry.get(name) for name in names}
+    dependencies = get_dependencies(
+        {name: tracker for name, (tracker, qs) in trackers.items()}
+    )
+    # Fails early on cycles.
+    order = get_order(dependencies)
+    kwargs = {
+        "from_date": from_date,
+        "to_date": to_date,
+        "refresh_periods": refresh_periods,
+    }
+    result = ScheduleResult()
+    executor = ThreadPoolExecutor(max_workers) if max_workers > 1 else None
+
+    def submit(name):
+        tracker, qs = trackers[name]
+        if executor:
+            return executor.submit(run_tracker, tracker, qs, kwargs, True)
+        # Run in this thread, reporting like a future.
+        future = Future()
+        try:
+            future.set_result(run_tracker(tracker, qs, kwargs, False))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    pending = {}
+    started = set()
+    try:
+        while True:
+            for name in order:
+                if name not in started and dependencies[name] <= set(result.runs).union(
+                    result.unsupported
+                ):
+                    started.add(name)
+                    pending[submit(name)] = name
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=pending.get):
+                name = pending.pop(future)
+                try:
+                    result.runs[name] = future.result()
+                except TrackerLocked:
+                    result.locked.append(name)
+                except TrackerNotSupported as e:
+                    result.unsupported[name] = e
+                except Exception as e:
+                    result.failed[name] = e
+    finally:
+        if executor:
+            executor.shutdown()
+    result.skipped = [name for name in order if name not in started]
+    return result
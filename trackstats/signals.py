@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+
+# Sent after a tracker has run, successfully or not. Arguments: `tracker`,
+# `run` (a `trackstats.instrumentation.TrackerRun`).
+tracker_run_finished = Signal()
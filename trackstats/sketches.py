@@ -0,0 +1,120 @@
+import math
+from collections import Counter
+
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+
+
+class Histogram(object):
+    """A mergeable histogram with logarithmically sized buckets (as in
+    DDSketch): any quantile is estimated within the given relative
+    accuracy, regardless of the number of values added. Histograms of the
+    same accuracy can be merged, e.g. to combine daily distributions into
+    one for a date range.
+    """
+
+    def __init__(self, relative_accuracy=DEFAULT_RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.positive = Counter()
+        self.negative = Counter()
+        self.zero = 0
+        self.count = 0
+        self.sum = 0
+        self.min = None
+        self.max = None
+
+    def key(self, value):
+        """The bucket of ``abs(value)``: bucket ``k`` holds the values in
+        ``(gamma ** (k - 1), gamma ** k]``.
+        """
+        return int(math.ceil(math.log(abs(value), self.gamma)))
+
+    def estimate(self, sign, key):
+        if sign == 0:
+            return 0
+        return sign * 2 * self.gamma**key / (self.gamma + 1)
+
+    def add_bucket(self, sign, key, count):
+        if sign > 0:
+            self.positive[key] += count
+        elif sign < 0:
+            self.negative[key] += count
+        else:
+            self.zero += count
+
+    def add_summary(self, count, total, minimum, maximum):
+        self.count += count
+        self.sum += total
+        if minimum is not None:
+            self.min = minimum if self.min is None else min(self.min, minimum)
+        if maximum is not None:
+            self.max = maximum if self.max is None else max(self.max, maximum)
+
+    def add(self, value, count=1):
+        value = float(value)
+        if value == 0:
+            self.add_bucket(0, 0, count)
+        else:
+            self.add_bucket(1 if value > 0 else -1, self.key(value), count)
+        self.add_summary(count, value * count, value, value)
+
+    def merge(self, other):
+        assert other.relative_accuracy == self.relative_accuracy
+        self.positive.update(other.positive)
+        self.negative.update(other.negative)
+        self.zero += other.zero
+        self.add_summary(other.count, other.sum, other.min, other.max)
+        return self
+
+    def iter_buckets(self):
+        """Yields ``(sign, key, count)`` in ascending order of value."""
+        for key in sorted(self.negative, reverse=True):
+            yield -1, key, self.negative[key]
+        if self.zero:
+            yield 0, 0, self.zero
+        for key in sorted(self.positive):
+            yield 1, key, self.positive[key]
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for sign, key, count in self.iter_buckets():
+            seen += count
+            if seen > rank:
+                value = self.estimate(sign, key)
+                # The exact extremes are known, never estimate beyond those.
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self):
+        if not self.count:
+            return None
+        return self.sum / self.count
+
+    def to_dict(self):
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "positive": {str(key): count for key, count in self.positive.items()},
+            "negative": {str(key): count for key, count in self.negative.items()},
+            "zero": self.zero,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        ret = cls(relative_accuracy=data["relative_accuracy"])
+        ret.positive.update({int(k): n for k, n in data["positive"].items()})
+        ret.negative.update({int(k): n for k, n in data["negative"].items()})
+        ret.zero = data["zero"]
+        ret.count = data["count"]
+        ret.sum = data["sum"]
+        ret.min = data["min"]
+        ret.max = data["max"]
+        return ret
@@ -0,0 +1,271 @@
+"""Benchmarks for the trackers and the statistic queries.
+
+Usage::
+
+    DJANGO_SETTINGS_MODULE=trackstats.tests.settings \\
+        python -m trackstats.tests.benchmark --users=1000 --days=730 \\
+        --output=results.json
+
+Set ``TRACKSTATS_DATABASE_ENGINE=postgresql`` (and the usual ``PG*``
+environment variables) to run against PostgreSQL instead of SQLite. A
+test database is created and destroyed for each run. Pass
+``--compare=results.json`` to compare against the results of an earlier
+run.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from datetime import timedelta
+
+
+def generate(users, comments, days, seed):
+    """Populates the database with ``users`` users who signed up over the
+    last ``days`` days, and ``comments`` comments by these users posted
+    after they signed up.
+    """
+    from django.contrib.auth import get_user_model
+    from django.utils import timezone
+
+    from trackstats.tests.models import Comment
+
+    User = get_user_model()
+    rnd = random.Random(seed)
+    now = timezone.now()
+    seconds = days * 86400
+    User.objects.bulk_create(
+        [
+            User(
+                username="user{}".format(i),
+                date_joined=now - timedelta(seconds=rnd.randrange(seconds)),
+            )
+            for i in range(users)
+        ],
+        batch_size=1000,
+    )
+    joined = list(User.objects.values_list("pk", "date_joined"))
+    batch = []
+    for i in range(comments):
+        pk, date_joined = rnd.choice(joined)
+        delta = (now - date_joined).total_seconds()
+        batch.append(
+            Comment(
+                user_id=pk,
+                timestamp=date_joined + timedelta(seconds=rnd.random() * delta),
+            )
+        )
+        if len(batch) >= 5000:
+            Comment.objects.bulk_create(batch)
+            batch = []
+    Comment.objects.bulk_create(batch)
+
+
+class QueryCounter(object):
+    def __init__(self):
+        self.queries = 0
+        self.writes = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        if sql.lstrip().upper().startswith(("INSERT", "UPDATE")):
+            self.writes += 1
+        return execute(sql, params, many, context)
+
+
+def measure(name, func, repeat=1):
+    from django.db import connection
+
+    from trackstats.models import StatisticByDate, StatisticByDateAndObject
+
+    def count_rows():
+        return (
+            StatisticByDate.objects.count() + StatisticByDateAndObject.objects.count()
+        )
+
+    rows_before = count_rows()
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        start = time.perf_counter()
+        for i in range(repeat):
+            func()
+        seconds = (time.perf_counter() - start) / repeat
+    result = {
+        "name": name,
+        "seconds": seconds,
+        "queries": counter.queries // repeat,
+        "write_queries": counter.writes // repeat,
+        "rows_created": count_rows() - rows_before,
+    }
+    print(
+        "{name:<50} {seconds:>10.4f}s {queries:>8} queries"
+        " {rows_created:>8} rows".format(**result),
+        file=sys.stderr,
+    )
+    return result
+
+
+def run(options):
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+
+    from trackstats.models import (
+        Domain,
+        Metric,
+        Period,
+        StatisticByDate,
+        StatisticByDateAndObject,
+    )
+    from trackstats.tests.models import Comment
+    from trackstats.trackers import (
+        CountObjectsByDateAndObjectTracker,
+        CountObjectsByDateTracker,
+    )
+
+    User = get_user_model()
+    generate(options.users, options.comments, options.days, options.seed)
+    domain = Domain.objects.register(ref="benchmark")
+    user_count = Metric.objects.register(domain=domain, ref="user_count")
+    comment_count = Metric.objects.register(domain=domain, ref="comment_count")
+    trackers = [
+        (
+            "users",
+            User.objects.all(),
+            lambda period: CountObjectsByDateTracker(
+                period=period, metric=user_count, date_field="date_joined"
+            ),
+        ),
+        (
+            "comments_by_user",
+            Comment.objects.all(),
+            lambda period: CountObjectsByDateAndObjectTracker(
+                period=period,
+                metric=comment_count,
+                object_model=User,
+                object_field="user",
+                date_field="timestamp",
+            ),
+        ),
+    ]
+    results = []
+    for name, qs, tracker in trackers:
+        for period_name in options.periods:
+            period = getattr(Period, period_name.upper())
+            prefix = "track.{}.{}".format(name, period_name)
+            results.append(
+                measure(prefix + ".initial", lambda: tracker(period).track(qs))
+            )
+            results.append(
+                measure(prefix + ".incremental", lambda: tracker(period).track(qs))
+            )
+
+    objects = list(User.objects.order_by("pk")[:100])
+    reads = [
+        (
+            "narrow.by_date",
+            lambda: list(
+                StatisticByDate.objects.narrow(metric=user_count, period=Period.DAY)
+            ),
+        ),
+        (
+            "most_recent.by_date",
+            lambda: StatisticByDate.objects.most_recent(
+                metric=user_count, period=Period.DAY
+            ),
+        ),
+        (
+            "narrow.by_date_and_object.100_objects",
+            lambda: list(
+                StatisticByDateAndObject.objects.narrow(
+                    metric=comment_count, period=Period.DAY, objects=objects
+                )
+            ),
+        ),
+        (
+            "most_recent.by_date_and_object",
+            lambda: StatisticByDateAndObject.objects.most_recent(
+                metric=comment_count, period=Period.LIFETIME, object=objects[0]
+            ),
+        ),
+    ]
+    for name, func in reads:
+        results.append(measure("read." + name, func, repeat=options.repeat))
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "django": __import__("django").get_version(),
+            "database": connection.vendor,
+            "timestamp": time.time(),
+        },
+        "scale": {
+            "users": options.users,
+            "comments": options.comments,
+            "days": options.days,
+            "seed": options.seed,
+        },
+        "results": results,
+    }
+
+
+def compare(report, baseline):
+    baseline = {result["name"]: result for result in baseline["results"]}
+    for result in report["results"]:
+        before = baseline.get(result["name"])
+        if not before:
+            continue
+        print(
+            "{:<50} {:>+8.1f}% time {:>+6} queries".format(
+                result["name"],
+                100 * (result["seconds"] - before["seconds"]) / before["seconds"],
+                result["queries"] - before["queries"],
+            ),
+            file=sys.stderr,
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--comments", type=int, default=50000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--periods", nargs="+", default=["day", "lifetime"], help="E.g. day lifetime"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=10, help="Repetitions of each read benchmark"
+    )
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--compare", help="Results of an earlier run to compare to")
+    options = parser.parse_args(argv)
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "trackstats.tests.settings")
+    import django
+
+    django.setup()
+    from django.db import connection
+    from django.test.utils import (
+        setup_test_environment,
+        teardown_test_environment,
+    )
+
+    setup_test_environment()
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        report = run(options)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+    if options.output:
+        with open(options.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if options.compare:
+        with open(options.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,32 @@
-DATABASE_ENGINE = "sqlite3"
+import os
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": ":memory:",
+
+DATABASE_ENGINE = os.environ.get("TRACKSTATS_DATABASE_ENGINE", "sqlite3")
+
+if DATABASE_ENGINE == "postgresql":
+    # Connection parameters are taken from the standard PG* environment
+    # variables.
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ.get("PGDATABASE", "trackstats"),
+        },
+        "analytics": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ.get("PGDATABASE", "trackstats") + "_analytics",
+        },
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": ":memory:",
+        },
+        "analytics": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": ":memory:",
+        },
     }
-}
 
 INSTALLED_APPS = (
     "django.contrib.contenttypes",
@@ -37,6 +58,7 @@ TEMPLATES = [
     }
 ]
 
+ROOT_URLCONF = "trackstats.tests.urls"
 
 USE_TZ = True
 
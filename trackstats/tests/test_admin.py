@@ -0,0 +1,88 @@
+from datetime import date
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase, override_settings
+
+from trackstats.models import Domain, Metric, Period, StatisticByDate
+
+
+class GraphTestCase(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_superuser(
+            username="admin", email="admin@example.com", password="secret"
+        )
+        domain = Domain.objects.register(ref="users")
+        self.user_count = Metric.objects.register(domain=domain, ref="user_count")
+        self.record(5)
+        self.model_admin = admin.site._registry[StatisticByDate]
+
+    def record(self, value):
+        # The metric is marked as changed once committed.
+        with self.captureOnCommitCallbacks(execute=True):
+            StatisticByDate.objects.record(
+                metric=self.user_count,
+                period=Period.DAY,
+                value=value,
+                date=date(2016, 1, 1),
+            )
+
+    def graph(self, **headers):
+        request = RequestFactory().get(
+            "/admin/trackstats/statisticbydate/graph/",
+            {
+                "metric": self.user_count.pk,
+                "from_date": "2016-01-01",
+                "to_date": "2016-01-31",
+            },
+            **headers
+        )
+        request.user = self.user
+        return self.model_admin.graph(request)
+
+    def test_conditional_get(self):
+        response = self.graph()
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertIn("Last-Modified", response)
+        # Validating the form (looking up the metric) is all it takes.
+        with self.assertNumQueries(1):
+            response = self.graph(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # Recording the same value again changes nothing.
+        self.record(5)
+        self.assertEqual(self.graph(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.record(6)
+        response = self.graph(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    @override_settings(TRACKSTATS_GRAPH_CACHE="default")
+    def test_cache(self):
+        content = self.graph().content
+        with self.assertNumQueries(1):
+            response = self.graph()
+        self.assertEqual(response.content, content)
+        self.record(6)
+        self.assertNotEqual(self.graph().content, content)
+
+    def test_changed_elsewhere(self):
+        request = RequestFactory().post("/")
+        request.user = self.user
+        stat = StatisticByDate.objects.get()
+        for change in [
+            lambda: StatisticByDate.objects.update(value=7),
+            lambda: self.model_admin.save_model(request, stat, None, True),
+            lambda: self.model_admin.delete_queryset(
+                request, StatisticByDate.objects.all()
+            ),
+        ]:
+            etag = self.graph()["ETag"]
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+            self.assertEqual(self.graph(HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.record(5)
+        etag = self.graph()["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.model_admin.delete_model(request, StatisticByDate.objects.get())
+        self.assertEqual(self.graph(HTTP_IF_NONE_MATCH=etag).status_code, 200)
@@ -0,0 +1,87 @@
+import csv
+import json
+from datetime import date
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from trackstats.export import iter_csv, iter_ndjson
+from trackstats.models import (
+    Domain,
+    Metric,
+    Period,
+    StatisticByDate,
+    StatisticByDateAndObject,
+)
+
+
+User = get_user_model()
+
+
+class ExportTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="john")
+        self.domain = Domain.objects.register(ref="shopping")
+        self.order_count = Metric.objects.register(
+            domain=self.domain, ref="order_count"
+        )
+        StatisticByDate.objects.record(
+            metric=self.order_count, value=3, period=Period.DAY, date=date(2016, 1, 1)
+        )
+        StatisticByDateAndObject.objects.record(
+            metric=self.order_count,
+            value=2,
+            period=Period.DAY,
+            date=date(2016, 1, 1),
+            object=self.user,
+        )
+
+    def tearDown(self):
+        Domain.objects.clear_cache()
+        Metric.objects.clear_cache()
+
+    def test_csv(self):
+        rows = list(csv.reader(iter_csv(StatisticByDate.objects.all())))
+        self.assertEqual(
+            rows,
+            [
+                ["domain", "metric", "date", "period", "value"],
+                ["shopping", "order_count", "2016-01-01", str(Period.DAY), "3"],
+            ],
+        )
+
+    def test_ndjson_by_object(self):
+        lines = list(iter_ndjson(StatisticByDateAndObject.objects.all()))
+        self.assertEqual(
+            [json.loads(line) for line in lines],
+            [
+                {
+                    "domain": "shopping",
+                    "metric": "order_count",
+                    "date": "2016-01-01",
+                    "period": Period.DAY,
+                    "value": 2,
+                    "object_type": "auth.user",
+                    "object_id": self.user.pk,
+                }
+            ],
+        )
+
+    def test_command(self):
+        out = StringIO()
+        call_command(
+            "trackstats_export",
+            "--format=ndjson",
+            "--metric=order_count",
+            "--period=day",
+            "--from-date=2016-01-01",
+            stdout=out,
+        )
+        self.assertEqual(json.loads(out.getvalue())["value"], 3)
+        out = StringIO()
+        call_command("trackstats_export", "--to-date=2015-12-31", stdout=out)
+        self.assertEqual(
+            out.getvalue().splitlines(), ["domain,metric,date,period,value"]
+        )
@@ -0,0 +1,77 @@
+from datetime import date
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from trackstats.export import iter_ndjson
+from trackstats.imports import import_statistics
+from trackstats.models import (
+    Domain,
+    Metric,
+    Period,
+    StatisticByDate,
+    StatisticByDateAndObject,
+)
+
+
+User = get_user_model()
+
+
+class ImportTestCase(TestCase):
+    def setUp(self):
+        self.domain = Domain.objects.register(ref="shopping")
+        self.order_count = Metric.objects.register(
+            domain=self.domain, ref="order_count"
+        )
+
+    def tearDown(self):
+        Domain.objects.clear_cache()
+        Metric.objects.clear_cache()
+
+    def test_csv(self):
+        StatisticByDate.objects.record(
+            metric=self.order_count, value=1, period=Period.DAY, date=date(2016, 1, 1)
+        )
+        data = StringIO(
+            "domain,metric,date,period,value\n"
+            "shopping,order_count,2016-01-01,{day},3\n"
+            "shopping,order_count,2016-01-02,day,4\n"
+            "shopping,order_count,2016-01-03,{lifetime},\n"
+            "shopping,unknown,2016-01-01,{day},3\n"
+            "shopping,order_count,2016-13-01,{day},3\n"
+            "shopping,order_count,2016-01-01,{day},three\n".format(
+                day=Period.DAY, lifetime=Period.LIFETIME
+            )
+        )
+        result = import_statistics(StatisticByDate, data, batch_size=2)
+        self.assertEqual((result.created, result.updated), (2, 1))
+        self.assertEqual([line for line, _ in result.rejected_rows], [4, 5, 6])
+        self.assertEqual(
+            list(
+                StatisticByDate.objects.order_by("date").values_list(
+                    "date", "period", "value"
+                )
+            ),
+            [
+                (date(2016, 1, 1), Period.DAY, 3),
+                (date(2016, 1, 2), Period.DAY, 4),
+                (date(2016, 1, 3), Period.LIFETIME, None),
+            ],
+        )
+
+    def test_export_roundtrip(self):
+        user = User.objects.create(username="john")
+        StatisticByDateAndObject.objects.record(
+            metric=self.order_count,
+            value=2,
+            period=Period.DAY,
+            date=date(2016, 1, 1),
+            object=user,
+        )
+        data = StringIO("".join(iter_ndjson(StatisticByDateAndObject.objects.all())))
+        StatisticByDateAndObject.objects.all().delete()
+        result = import_statistics(StatisticByDateAndObject, data, format="ndjson")
+        self.assertEqual(result.created, 1)
+        stat = StatisticByDateAndObject.objects.get()
+        self.assertEqual((stat.object, stat.value), (user, 2))
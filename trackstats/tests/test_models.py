@@ -1,14 +1,23 @@
-from datetime import date
+from collections import Counter
+from datetime import date, timedelta
+from unittest import mock
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.contrib.contenttypes.models import ContentType
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
 
 from trackstats.models import (
+    CompactStatisticByDateAndObject,
     Domain,
+    LatestStatisticByDate,
+    LatestStatisticByDateAndObject,
     Metric,
     Period,
     StatisticByDate,
     StatisticByDateAndObject,
+    TrackerCheckpoint,
+    deferred_touch,
 )
 
 
@@ -77,6 +86,30 @@ class StatisticsTestCase(TestCase):
         )
         self.assertEqual(record.date, date.today())
 
+    def test_touch(self):
+        def changed_at():
+            return Metric.objects.get(pk=self.user_count.pk).changed_at
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                StatisticByDate.objects.bulk_record(
+                    dict(period=Period.DAY, metric=self.user_count, value=i, date=dt)
+                    for i, dt in enumerate([date(2016, 1, 1), date(2016, 1, 2)])
+                )
+                StatisticByDate.objects.filter(date=date(2016, 1, 1)).update(value=3)
+                # Not while writing the statistics.
+                self.assertIsNone(changed_at())
+        self.assertIsNotNone(changed_at())
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with deferred_touch():
+                for i in range(3):
+                    StatisticByDate.objects.record(
+                        period=Period.DAY, metric=self.user_count, value=i
+                    )
+                StatisticByDate.objects.filter(value=0).delete()
+        # Marked once.
+        self.assertEqual(len(callbacks), 1)
+
     def test_record_at_date(self):
         dt = date(2016, 1, 1)
         record = StatisticByDate.objects.record(
@@ -94,3 +127,483 @@ class StatisticsTestCase(TestCase):
             date=dt,
         )
         self.assertEqual(record.date, dt)
+
+    def test_bulk_record(self):
+        dt = date(2016, 1, 1)
+        StatisticByDate.objects.record(
+            period=Period.DAY, metric=self.user_count, value=10, date=dt
+        )
+        result = StatisticByDate.objects.bulk_record(
+            [
+                dict(period=Period.DAY, metric=self.user_count, value=11, date=dt),
+                dict(
+                    period=Period.DAY,
+                    metric=self.user_count,
+                    value=1,
+                    date=dt + timedelta(days=1),
+                ),
+            ],
+            batch_size=1,
+        )
+        self.assertEqual(result, {"created": 1, "updated": 1, "unchanged": 0})
+        self.assertEqual(
+            list(
+                StatisticByDate.objects.narrow(metric=self.user_count)
+                .order_by("date")
+                .values_list("value", flat=True)
+            ),
+            [11, 1],
+        )
+        result = StatisticByDate.objects.bulk_record(
+            [dict(period=Period.DAY, metric=self.user_count, value=11, date=dt)]
+        )
+        self.assertEqual(result, {"created": 0, "updated": 0, "unchanged": 1})
+
+    def test_bulk_record_by_date_and_object(self):
+        dt = date(2016, 1, 1)
+        StatisticByDateAndObject.objects.bulk_record(
+            [
+                dict(
+                    period=Period.DAY,
+                    metric=self.user_count,
+                    value=1,
+                    object=o,
+                    date=dt,
+                )
+                for o in [self.user, self.user]
+            ]
+        )
+        stat = StatisticByDateAndObject.objects.get()
+        self.assertEqual(stat.object, self.user)
+
+    def test_with_objects(self):
+        dt = date(2016, 1, 1)
+        domains = [Domain.objects.register(ref="d{}".format(i)) for i in range(3)]
+        users = [self.user] + [
+            User.objects.create(username="user{}".format(i)) for i in range(3)
+        ]
+        StatisticByDateAndObject.objects.bulk_record(
+            dict(
+                period=Period.DAY,
+                metric=self.user_count,
+                object=obj,
+                value=1,
+                date=dt,
+            )
+            for obj in users + domains
+        )
+        # Warm up the content type cache.
+        list(StatisticByDateAndObject.objects.narrow(objects=users))
+        list(StatisticByDateAndObject.objects.narrow(objects=domains))
+        qs = StatisticByDateAndObject.objects.order_by("pk")
+        with self.assertNumQueries(3):
+            objects = [stat.object for stat in qs.with_objects(only=["pk"])]
+        self.assertEqual(objects, users + domains)
+        # One query for the statistics, and one per chunk of 2 users.
+        with self.assertNumQueries(3):
+            objects = [
+                stat.object
+                for stat in qs.filter(object_type__model="user")
+                .with_objects()
+                .iterator(chunk_size=2)
+            ]
+        self.assertEqual(objects, users)
+        # Objects of models that no longer exist are left out.
+        stale = ContentType.objects.create(app_label="tests", model="removed")
+        StatisticByDateAndObject.objects.filter(object_type__model="domain").update(
+            object_type=stale
+        )
+        objects = [stat.object for stat in qs.with_objects()]
+        self.assertEqual(objects, users + [None] * len(domains))
+
+    def test_narrow_lifetime(self):
+        dt = date(2016, 1, 1)
+        StatisticByDate.objects.record(
+            period=Period.LIFETIME, metric=self.user_count, value=10, date=dt
+        )
+        StatisticByDate.objects.record(
+            period=Period.DAY, metric=self.user_count, value=1, date=dt
+        )
+        stat = StatisticByDate.objects.most_recent(
+            metric=self.user_count, period=Period.LIFETIME
+        )
+        self.assertEqual(stat.value, 10)
+
+    def test_with_previous(self):
+        dt = date(2016, 1, 1)
+        StatisticByDate.objects.bulk_record(
+            dict(
+                period=Period.DAY,
+                metric=metric,
+                value=value,
+                date=dt + timedelta(days=i),
+            )
+            for metric in [self.user_count, self.order_count]
+            for i, value in enumerate([4, 0, 2, 6])
+        )
+        stats = StatisticByDate.objects.narrow(metric=self.user_count)
+        self.assertEqual(
+            list(
+                stats.with_previous()
+                .order_by("date")
+                .values_list("previous_value", "delta", "relative_delta")
+            ),
+            [(None, None, None), (4, -4, -1.0), (0, 2, None), (2, 4, 2.0)],
+        )
+        # Narrowing down after annotating leaves the previous values be.
+        self.assertEqual(
+            list(
+                stats.with_previous()
+                .filter(date__gt=dt + timedelta(days=1))
+                .order_by("date")
+                .values_list("date", "previous_value", "delta")
+            ),
+            [(dt + timedelta(days=2), 0, 2), (dt + timedelta(days=3), 2, 4)],
+        )
+        self.assertEqual(
+            [
+                (stat.metric, stat.value, stat.previous_value)
+                for stat in StatisticByDate.objects.with_previous().narrow(
+                    metric=self.order_count, date=dt + timedelta(days=3)
+                )
+            ],
+            [(self.order_count, 6, 2)],
+        )
+        self.assertEqual(
+            list(
+                stats.with_previous(timedelta(days=2))
+                .filter(date__gt=dt)
+                .order_by("date")
+                .values_list("previous_value", "delta")
+            ),
+            [(None, None), (4, -2), (0, 6)],
+        )
+
+    def test_movers(self):
+        dt = date(2016, 1, 1)
+        users = [self.user] + [
+            User.objects.create(username="user{}".format(i)) for i in range(3)
+        ]
+        StatisticByDateAndObject.objects.bulk_record(
+            dict(
+                period=Period.LIFETIME,
+                metric=self.order_count,
+                object=user,
+                value=value,
+                date=dt + timedelta(days=i),
+            )
+            for user, values in zip(users, [(1, 2), (10, 11), (10, 3), (0, 5)])
+            for i, value in enumerate(values)
+        )
+        movers = StatisticByDateAndObject.objects.movers(
+            2, metric=self.order_count, period=Period.LIFETIME, date=dt + timedelta(1)
+        )
+        self.assertEqual(
+            [(stat.object_id, stat.delta) for stat in movers],
+            [(users[2].pk, -7), (users[3].pk, 5)],
+        )
+        movers = StatisticByDateAndObject.objects.movers(
+            1,
+            relative=True,
+            metric=self.order_count,
+            period=Period.LIFETIME,
+            date=dt + timedelta(1),
+        )
+        self.assertEqual([stat.object_id for stat in movers], [users[0].pk])
+
+
+@override_settings(TRACKSTATS_TRACK_LATEST=True)
+class LatestStatisticsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="john")
+        domain = Domain.objects.register(ref="users")
+        self.user_count = Metric.objects.register(domain=domain, ref="user_count")
+
+    def test_record(self):
+        dt = date(2016, 1, 1)
+        for days, value in [(1, 10), (0, 5), (1, 11)]:
+            StatisticByDate.objects.record(
+                period=Period.LIFETIME,
+                metric=self.user_count,
+                value=value,
+                date=dt + timedelta(days=days),
+            )
+        latest = StatisticByDate.objects.latest(
+            metric=self.user_count, period=Period.LIFETIME
+        )
+        self.assertEqual((latest.date, latest.value), (dt + timedelta(days=1), 11))
+        self.assertEqual(LatestStatisticByDate.objects.count(), 1)
+        self.assertIsNone(
+            StatisticByDate.objects.latest(metric=self.user_count, period=Period.DAY)
+        )
+
+    def test_bulk_record(self):
+        dt = date(2016, 1, 1)
+        other = User.objects.create(username="jane")
+        StatisticByDateAndObject.objects.bulk_record(
+            dict(
+                period=Period.LIFETIME,
+                metric=self.user_count,
+                object=user,
+                value=days * 10 + i,
+                date=dt + timedelta(days=days),
+            )
+            for i, user in enumerate([self.user, other])
+            for days in [2, 0, 1]
+        )
+        with self.assertNumQueries(1):
+            latest = StatisticByDateAndObject.objects.latest(
+                metric=self.user_count, period=Period.LIFETIME, object=other
+            )
+        self.assertEqual((latest.date, latest.value), (dt + timedelta(days=2), 21))
+        self.assertEqual(latest.object, other)
+        self.assertEqual(LatestStatisticByDateAndObject.objects.count(), 2)
+
+    def test_rebuild(self):
+        dt = date(2016, 1, 1)
+        with override_settings(TRACKSTATS_TRACK_LATEST=False):
+            for days in range(3):
+                StatisticByDate.objects.record(
+                    period=Period.DAY,
+                    metric=self.user_count,
+                    value=days,
+                    date=dt + timedelta(days=days),
+                )
+        self.assertFalse(LatestStatisticByDate.objects.exists())
+        StatisticByDate.objects.rebuild_latest()
+        latest = LatestStatisticByDate.objects.get()
+        self.assertEqual((latest.date, latest.value), (dt + timedelta(days=2), 2))
+
+    def test_latest_field(self):
+        StatisticByDate.objects.record(
+            period=Period.DAY, metric=self.user_count, value=1
+        )
+        self.assertEqual(StatisticByDate.objects.latest("date").value, 1)
+
+    def test_most_recent_for_objects(self):
+        dt = date(2016, 1, 1)
+        users = [User.objects.create(username="user{}".format(i)) for i in range(3)]
+        StatisticByDateAndObject.objects.bulk_record(
+            dict(
+                period=period,
+                metric=self.user_count,
+                object=user,
+                value=i * 10 + days,
+                date=dt + timedelta(days=days),
+            )
+            for i, user in enumerate(users[:2])
+            for days in [2, 0, 1]
+            for period in [Period.DAY, Period.LIFETIME]
+        )
+        for track_latest in [True, False]:
+            for objects in [users, User.objects.all()]:
+                with override_settings(TRACKSTATS_TRACK_LATEST=track_latest):
+                    with self.assertNumQueries(1):
+                        stats = (
+                            StatisticByDateAndObject.objects.most_recent_for_objects(
+                                self.user_count, Period.DAY, objects
+                            )
+                        )
+                self.assertEqual(
+                    {pk: (stat.date, stat.value) for pk, stat in stats.items()},
+                    {
+                        users[0].pk: (dt + timedelta(days=2), 2),
+                        users[1].pk: (dt + timedelta(days=2), 12),
+                    },
+                )
+
+    def test_find_gaps(self):
+        dt = date(2016, 1, 1)
+        StatisticByDate.objects.bulk_record(
+            dict(
+                period=Period.DAY,
+                metric=self.user_count,
+                value=1,
+                date=dt + timedelta(days=days),
+            )
+            for days in [1, 2, 5, 7]
+        )
+        self.assertEqual(
+            StatisticByDate.objects.find_gaps(
+                dt, dt + timedelta(days=9), metric=self.user_count, period=Period.DAY
+            ),
+            [
+                (dt, dt),
+                (dt + timedelta(days=3), dt + timedelta(days=4)),
+                (dt + timedelta(days=6), dt + timedelta(days=6)),
+                (dt + timedelta(days=8), dt + timedelta(days=9)),
+            ],
+        )
+        self.assertEqual(
+            StatisticByDate.objects.find_gaps(
+                dt, dt, metric=self.user_count, period=Period.LIFETIME
+            ),
+            [(dt, dt)],
+        )
+
+
+class CompactStatisticsTestCase(TestCase):
+    def setUp(self):
+        self.users = [
+            User.objects.create(username="john"),
+            User.objects.create(username="jane"),
+        ]
+        domain = Domain.objects.register(ref="users")
+        self.comment_count = Metric.objects.register(domain=domain, ref="comment_count")
+
+    def test_bulk_record(self):
+        dt = date(2016, 1, 30)
+        result = CompactStatisticByDateAndObject.objects.bulk_record(
+            dict(
+                period=Period.DAY,
+                metric=self.comment_count,
+                object=user,
+                value=days * 10 + i,
+                date=dt + timedelta(days=days),
+            )
+            for i, user in enumerate(self.users)
+            for days in range(4)
+        )
+        self.assertEqual(result, {"created": 8, "updated": 0, "unchanged": 0})
+        # A row per object and month.
+        self.assertEqual(CompactStatisticByDateAndObject.objects.count(), 4)
+        result = CompactStatisticByDateAndObject.objects.bulk_increment(
+            [
+                dict(
+                    period=Period.DAY,
+                    metric=self.comment_count,
+                    object=self.users[0],
+                    value=value,
+                    date=dt + timedelta(days=days),
+                )
+                for days, value in [(0, 0), (1, 5), (5, 7)]
+            ]
+        )
+        self.assertEqual(result, {"created": 1, "updated": 1, "unchanged": 1})
+        stats = CompactStatisticByDateAndObject.objects.series(
+            metric=self.comment_count,
+            period=Period.DAY,
+            object=self.users[0],
+            from_date=dt + timedelta(days=1),
+        )
+        self.assertEqual(
+            [(stat.date, stat.value) for stat in stats],
+            [
+                (dt + timedelta(days=1), 15),
+                (dt + timedelta(days=2), 20),
+                (dt + timedelta(days=3), 30),
+                (dt + timedelta(days=5), 7),
+            ],
+        )
+        self.assertIsInstance(stats[0], StatisticByDateAndObject)
+        self.assertEqual(stats[0].object, self.users[0])
+        # There is no telling a day without data from one without statistic.
+        with self.assertRaises(ValueError):
+            CompactStatisticByDateAndObject.objects.record(
+                period=Period.DAY,
+                metric=self.comment_count,
+                object=self.users[0],
+                value=None,
+                date=dt + timedelta(days=6),
+            )
+
+    def test_conflict(self):
+        dt = date(2016, 2, 29)
+        qs_class = CompactStatisticByDateAndObject.objects.all().__class__
+        bulk_create = qs_class.bulk_create
+        conflicts = []
+
+        def conflict(qs, objs, *args, **kwargs):
+            if objs and not conflicts:
+                # A concurrent writer created the row in the meantime.
+                conflicts.append(True)
+                raise IntegrityError
+            return bulk_create(qs, objs, *args, **kwargs)
+
+        with mock.patch.object(qs_class, "bulk_create", conflict):
+            result = CompactStatisticByDateAndObject.objects.bulk_record(
+                [
+                    dict(
+                        period=Period.DAY,
+                        metric=self.comment_count,
+                        object=self.users[0],
+                        value=2,
+                        date=dt,
+                    )
+                ]
+            )
+        # Retried, counting the statistic once.
+        self.assertEqual(result, {"created": 1, "updated": 0, "unchanged": 0})
+        row = CompactStatisticByDateAndObject.objects.get()
+        self.assertEqual(row.values[-1], 2)
+
+    def test_record(self):
+        dt = date(2016, 2, 29)
+        stat = CompactStatisticByDateAndObject.objects.record(
+            metric=self.comment_count,
+            period=Period.LIFETIME,
+            object=self.users[1],
+            value=3,
+            date=dt,
+        )
+        self.assertEqual((stat.date, stat.value), (dt, 3))
+        CompactStatisticByDateAndObject.objects.record(
+            metric=self.comment_count,
+            period=Period.LIFETIME,
+            object=self.users[1],
+            value=2,
+            date=dt - timedelta(days=1),
+        )
+        row = CompactStatisticByDateAndObject.objects.get()
+        self.assertEqual(row.month, date(2016, 2, 1))
+        self.assertEqual(row.values, [None] * 27 + [2, 3])
+        most_recent = CompactStatisticByDateAndObject.objects.most_recent(
+            metric=self.comment_count, period=Period.LIFETIME, object=self.users[1]
+        )
+        self.assertEqual((most_recent.date, most_recent.value), (dt, 3))
+        most_recent = CompactStatisticByDateAndObject.objects.most_recent(
+            metric=self.comment_count,
+            period=Period.LIFETIME,
+            object=self.users[1],
+            to_date=dt - timedelta(days=1),
+        )
+        self.assertEqual(most_recent.value, 2)
+        self.assertIsNone(
+            CompactStatisticByDateAndObject.objects.most_recent(
+                metric=self.comment_count, period=Period.DAY
+            )
+        )
+
+
+class TrackerCheckpointTestCase(TestCase):
+    def test_advisory_lock(self):
+        metric = Metric.objects.register(
+            domain=Domain.objects.register(ref="users"), ref="user_count"
+        )
+        checkpoint = TrackerCheckpoint.objects.get_for(
+            metric=metric, period=Period.DAY, source="auth.user.date_joined"
+        )
+        # Mimic the (session level, re-entrant) advisory locks.
+        locks = Counter()
+
+        def lock(namespace, pk):
+            locks[pk] += 1
+            return True
+
+        def unlock(namespace, pk):
+            locks[pk] -= 1
+            return True
+
+        connection.ensure_connection()
+        connection.connection.create_function("pg_try_advisory_lock", 2, lock)
+        connection.connection.create_function("pg_advisory_unlock", 2, unlock)
+        with mock.patch("trackstats.models.is_postgresql", return_value=True):
+            self.assertTrue(checkpoint.acquire())
+            # Another run in the same session does not get in.
+            other = TrackerCheckpoint.objects.get(pk=checkpoint.pk)
+            self.assertFalse(other.acquire())
+            checkpoint.complete(date(2016, 1, 1))
+            self.assertEqual(locks[checkpoint.pk], 0)
+            self.assertTrue(other.acquire())
+            other.abandon()
+        self.assertEqual(locks[checkpoint.pk], 0)
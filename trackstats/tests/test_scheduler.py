@@ -0,0 +1,241 @@
+import threading
+from collections import Counter
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db.models import F
+from django.db.models.functions import NullIf
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from trackstats.models import Domain, Metric, Period, StatisticByDate
+from trackstats.registry import TrackerRegistry, registry
+from trackstats.scheduler import get_dependencies, get_order, schedule
+from trackstats.tests.models import Comment
+from trackstats.trackers import (
+    CountObjectsByDateTracker,
+    DerivedMetricTracker,
+    TrackerLocked,
+    TrackerNotSupported,
+)
+
+
+def to_date(dt):
+    return timezone.make_naive(dt).date()
+
+
+class DerivedMetricsTestCase(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        domain = Domain.objects.register(ref="users")
+        self.user_count = Metric.objects.register(domain=domain, ref="user_count")
+        self.comment_count = Metric.objects.register(domain=domain, ref="comment_count")
+        self.comments_per_user = Metric.objects.register(
+            domain=domain, ref="comments_per_user"
+        )
+        self.users = Counter()
+        self.comments = Counter()
+        now = timezone.now()
+        for i in range(12):
+            dt = now - timedelta(days=i % 4)
+            user = User.objects.create(username="user{}".format(i), date_joined=dt)
+            self.users[to_date(dt)] += 1
+            # Non-exact ratios, e.g. 5 comments by 3 users (1.67 per user).
+            for j in range(i % 5):
+                Comment.objects.create(user=user, timestamp=dt)
+                self.comments[to_date(dt)] += 1
+        # Halfway ratios as well: 5 comments by 8 users (62.5 per 100 users),
+        # rounded up by the database (and not to even, as round() does).
+        dt = now - timedelta(days=1)
+        for i in range(5):
+            User.objects.create(username="lurker{}".format(i), date_joined=dt)
+            self.users[to_date(dt)] += 1
+        # Registered such that the derived metric sorts first.
+        trackers = [
+            (
+                "comments",
+                CountObjectsByDateTracker(
+                    period=Period.DAY,
+                    metric=self.comment_count,
+                    date_field="timestamp",
+                ),
+                Comment.objects.all(),
+            ),
+            (
+                "a_comments_per_user",
+                DerivedMetricTracker(
+                    period=Period.DAY,
+                    metric=self.comments_per_user,
+                    inputs={
+                        "comments": self.comment_count,
+                        "users": self.user_count,
+                    },
+                    expression=F("comments") * 100 / NullIf(F("users"), 0),
+                ),
+                StatisticByDate.objects.all(),
+            ),
+            (
+                "users",
+                CountObjectsByDateTracker(
+                    period=Period.DAY,
+                    metric=self.user_count,
+                    date_field="date_joined",
+                ),
+                get_user_model().objects.all(),
+            ),
+        ]
+        for name, tracker, qs in trackers:
+            registry.register(name, tracker, qs)
+            self.addCleanup(registry.unregister, name)
+
+    def get_expected(self):
+        return {
+            day: int(Decimal(self.comments[day] * 100 / n).quantize(0, ROUND_HALF_UP))
+            for day, n in self.users.items()
+        }
+
+    def assertDerived(self):
+        stats = StatisticByDate.objects.narrow(
+            metric=self.comments_per_user, period=Period.DAY
+        )
+        self.assertEqual(
+            {stat.date: stat.value for stat in stats},
+            self.get_expected(),
+        )
+
+    def test_derived(self):
+        out = StringIO()
+        call_command("trackstats_track", stdout=out)
+        self.assertEqual(
+            [line.split(":")[0] for line in out.getvalue().splitlines()],
+            ["comments", "users", "a_comments_per_user"],
+        )
+        self.assertDerived()
+        tracker, qs = registry.get("a_comments_per_user")
+        self.assertEqual(tracker.run.from_date, min(self.users))
+        # Checkpointed under the name registered.
+        self.assertEqual(
+            tracker.checkpoints[0].source,
+            "a_comments_per_user@trackstats.statisticbydate.date",
+        )
+        # Resumes from the checkpoint.
+        call_command("trackstats_track", "a_comments_per_user", stdout=StringIO())
+        self.assertEqual(tracker.run.from_date, date.today())
+
+    def test_in_database(self):
+        tracker, qs = registry.get("a_comments_per_user")
+        tracker.in_database = True
+        self.addCleanup(setattr, tracker, "in_database", False)
+        call_command("trackstats_track", stdout=StringIO())
+        self.assertDerived()
+
+    def test_retrack(self):
+        call_command("trackstats_track", stdout=StringIO())
+        day = date.today() - timedelta(days=2)
+        Comment.objects.filter(timestamp__date=day).delete()
+        del self.comments[day]
+        call_command(
+            "trackstats_track",
+            "--from-date={}".format(day),
+            "--to-date={}".format(day),
+            stdout=StringIO(),
+        )
+        self.assertDerived()
+
+
+class FakeTracker(object):
+    period = Period.DAY
+
+    def __init__(self, metric, inputs=(), barrier=None, error=None):
+        self.metric = metric
+        self.inputs = inputs
+        self.barrier = barrier
+        self.error = error
+        self.tracked = []
+
+    def get_metrics(self):
+        return [self.metric]
+
+    def get_dependencies(self):
+        return [(metric, self.period) for metric in self.inputs]
+
+    def track(self, qs, **kwargs):
+        if self.barrier:
+            # Only passes when both trackers run at the same time.
+            self.barrier.wait()
+        if self.error:
+            raise self.error
+        self.run = kwargs
+        self.tracked.append(kwargs)
+
+
+class SchedulerTestCase(SimpleTestCase):
+    def setUp(self):
+        self.registry = TrackerRegistry()
+        self.metrics = [Metric(pk=i) for i in range(4)]
+
+    def register(self, name, tracker):
+        self.registry.register(name, tracker, Metric.objects.none())
+        return tracker
+
+    def test_order(self):
+        base, other, derived, derived_twice = self.metrics
+        trackers = {
+            "c": FakeTracker(derived_twice, inputs=[derived, base]),
+            "b": FakeTracker(derived, inputs=[base, other]),
+            "base": FakeTracker(base),
+            "other": FakeTracker(other),
+        }
+        dependencies = get_dependencies(trackers)
+        self.assertEqual(
+            dependencies,
+            {"c": {"b", "base"}, "b": {"base", "other"}, "base": set(), "other": set()},
+        )
+        self.assertEqual(get_order(dependencies), ["base", "other", "b", "c"])
+        trackers["base"].inputs = [derived_twice]
+        with self.assertRaises(ImproperlyConfigured):
+            get_order(get_dependencies(trackers))
+
+    def test_parallel(self):
+        base, other, derived, unrelated = self.metrics
+        barrier = threading.Barrier(2, timeout=5)
+        self.register("base", FakeTracker(base, barrier=barrier))
+        self.register("other", FakeTracker(other, barrier=barrier))
+        tracker = self.register("derived", FakeTracker(derived, inputs=[base, other]))
+        result = schedule(
+            from_date=date(2016, 1, 1), max_workers=2, registry=self.registry
+        )
+        self.assertEqual(list(result.runs)[-1], "derived")
+        self.assertEqual(
+            tracker.tracked,
+            [{"from_date": date(2016, 1, 1), "to_date": None, "refresh_periods": ()}],
+        )
+
+    def test_failed(self):
+        base, other, derived, unrelated = self.metrics
+        self.register("base", FakeTracker(base, error=ValueError("oops")))
+        self.register("other", FakeTracker(other, error=TrackerLocked()))
+        self.register("derived", FakeTracker(derived, inputs=[base]))
+        self.register("unrelated", FakeTracker(unrelated))
+        result = schedule(registry=self.registry)
+        self.assertEqual(list(result.runs), ["unrelated"])
+        self.assertEqual(list(result.failed), ["base"])
+        self.assertEqual(result.locked, ["other"])
+        self.assertEqual(result.skipped, ["derived"])
+        # Unless the inputs are not scheduled.
+        result = schedule(["derived"], registry=self.registry)
+        self.assertEqual(list(result.runs), ["derived"])
+
+    def test_unsupported(self):
+        base, other, derived, unrelated = self.metrics
+        error = TrackerNotSupported("base cannot re-track")
+        self.register("base", FakeTracker(base, error=error))
+        self.register("derived", FakeTracker(derived, inputs=[base]))
+        result = schedule(from_date=date(2016, 1, 1), registry=self.registry)
+        self.assertEqual(result.unsupported, {"base": error})
+        # The statistics of base are left as is.
+        self.assertEqual(list(result.runs), ["derived"])
@@ -1,22 +1,50 @@
 import random
 from collections import Counter
-from datetime import date, timedelta
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from io import StringIO
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.db.models import Count, Q, Sum, Value
+from django.db.models.functions import NullIf
+from django.test import TestCase, override_settings
 from django.utils import timezone
 
+import pytz
+
 from trackstats.models import (
+    CompactStatisticByDateAndObject,
+    DimensionValue,
+    DistributionByDate,
+    DistributionByDateAndObject,
     Domain,
+    Event,
     Metric,
     Period,
     StatisticByDate,
+    StatisticByDateAndDimension,
     StatisticByDateAndObject,
+    TrackerCheckpoint,
 )
+from trackstats.registry import registry
+from trackstats.signals import tracker_run_finished
 from trackstats.tests.models import Comment
 from trackstats.trackers import (
+    CountObjectsByDateAndDimensionTracker,
     CountObjectsByDateAndObjectTracker,
     CountObjectsByDateTracker,
+    CountRollupTracker,
+    DistributionByDateAndObjectTracker,
+    DistributionByDateTracker,
+    EventsByDateAndObjectTracker,
+    EventsByDateTracker,
+    MaxRollupTracker,
+    MultiMetricByDateAndObjectTracker,
+    MultiMetricByDateTracker,
+    MultiTimezoneByDateAndObjectTracker,
+    RollupTracker,
+    TrackerLocked,
+    TrackerNotSupported,
 )
 
 
@@ -78,6 +106,212 @@ class TrackersTestCase(TestCase):
             len(self.expected_signups) - 1,
         )
 
+    def test_multi_metric(self):
+        staff_count = Metric.objects.register(
+            domain=self.users_domain, ref="staff_count"
+        )
+        tracker = MultiMetricByDateTracker(
+            period=Period.DAY,
+            date_field="date_joined",
+            metrics={
+                self.user_count: Count("pk"),
+                staff_count: Count("pk", filter=Q(is_staff=True)),
+            },
+        )
+        tracker.track(self.User.objects.all())
+        self.assertEqual(tracker.run.phases["aggregate"]["queries"], 1)
+        stats = StatisticByDate.objects.narrow(
+            metrics=[self.user_count], period=Period.DAY
+        )
+        for stat in stats:
+            self.assertEqual(stat.value, self.expected_signups[stat.date]["day"])
+        self.assertEqual(stats.count(), len(self.expected_signups) - 1)
+        self.assertEqual(
+            set(
+                StatisticByDate.objects.narrow(
+                    metric=staff_count, period=Period.DAY
+                ).values_list("value", flat=True)
+            ),
+            {0},
+        )
+
+    def test_in_database(self):
+        tracker = CountObjectsByDateTracker(
+            period=Period.DAY,
+            metric=self.user_count,
+            date_field="date_joined",
+            in_database=True,
+        )
+        tracker.track(self.User.objects.all())
+        self.assertNotIn("aggregate", tracker.run.phases)
+        self.assertEqual(tracker.run.rows_written, len(self.expected_signups) - 1)
+        stats = StatisticByDate.objects.narrow(
+            metrics=[self.user_count], period=Period.DAY
+        )
+        for stat in stats:
+            self.assertEqual(stat.value, self.expected_signups[stat.date]["day"])
+        self.assertEqual(stats.count(), len(self.expected_signups) - 1)
+        # Unchanged values are not written again.
+        tracker.track(self.User.objects.all())
+        self.assertEqual(tracker.run.rows_written, 0)
+
+    def test_run_metrics(self):
+        runs = []
+
+        def handler(sender, tracker, run, **kwargs):
+            runs.append(run)
+
+        tracker_run_finished.connect(handler)
+        try:
+            with self.assertLogs("trackstats.trackers", "INFO"):
+                CountObjectsByDateTracker(
+                    period=Period.DAY, metric=self.user_count, date_field="date_joined"
+                ).track(self.User.objects.all())
+        finally:
+            tracker_run_finished.disconnect(handler)
+        [run] = runs
+        data = run.as_dict()
+        self.assertEqual(data["to_date"], date.today().isoformat())
+        self.assertEqual(data["rows_read"], len(self.expected_signups) - 1)
+        self.assertEqual(data["rows_written"], len(self.expected_signups) - 1)
+        self.assertEqual(set(data["phases"]), {"start_date", "aggregate", "write"})
+        self.assertEqual(data["phases"]["aggregate"]["queries"], 1)
+
+    def test_skip_unchanged(self):
+        tracker = CountObjectsByDateTracker(
+            period=Period.LIFETIME, metric=self.user_count, date_field="date_joined"
+        )
+        tracker.track(self.User.objects.all())
+        tracker.track(self.User.objects.all())
+        # The last day is recomputed, but not written.
+        self.assertEqual(tracker.run.rows_written, 0)
+        self.assertEqual(tracker.run.rows_unchanged, 1)
+        tracker = CountObjectsByDateTracker(
+            period=Period.DAY, metric=self.user_count, date_field="date_joined"
+        )
+        tracker.track(self.User.objects.all())
+        tracker.track(self.User.objects.all())
+        self.assertEqual(tracker.run.rows_written, 0)
+        # The day before the checkpoint is recomputed (timezones).
+        self.assertEqual(tracker.run.rows_unchanged, 1)
+
+    def test_touch(self):
+        tracker = CountObjectsByDateTracker(
+            period=Period.DAY, metric=self.user_count, date_field="date_joined"
+        )
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            tracker.track(self.User.objects.all())
+        # Once per run, rather than per batch written.
+        self.assertEqual(len(callbacks), 1)
+        self.user_count.refresh_from_db()
+        self.assertIsNotNone(self.user_count.changed_at)
+
+    def test_checkpoint(self):
+        tracker = CountObjectsByDateTracker(
+            period=Period.DAY, metric=self.user_count, date_field="timestamp"
+        )
+        tracker.track(Comment.objects.all())
+        self.assertEqual(tracker.run.from_date, None)
+        checkpoint = TrackerCheckpoint.objects.get()
+        self.assertEqual(checkpoint.status, TrackerCheckpoint.STATUS_COMPLETED)
+        self.assertEqual(checkpoint.high_water_mark, date.today())
+        self.assertEqual(checkpoint.source, "tests.comment.timestamp")
+        # No longer scans the source to find out where to start.
+        tracker.track(Comment.objects.all())
+        self.assertEqual(tracker.run.from_date, date.today())
+        self.assertEqual(TrackerCheckpoint.objects.count(), 1)
+        # Tracking the same source by another date, or under another name,
+        # does not resume from it.
+        for kwargs in [{"date_field": "user__date_joined"}, {"name": "other"}]:
+            other = CountObjectsByDateTracker(
+                period=Period.DAY,
+                metric=self.user_count,
+                **dict({"date_field": "timestamp"}, **kwargs)
+            )
+            other.track(Comment.objects.all())
+            self.assertEqual(other.run.from_date, None)
+        self.assertEqual(
+            sorted(TrackerCheckpoint.objects.values_list("source", flat=True)),
+            [
+                "other@tests.comment.timestamp",
+                "tests.comment.timestamp",
+                "tests.comment.user__date_joined",
+            ],
+        )
+
+    def test_backfill(self):
+        for period in [Period.DAY, Period.LIFETIME]:
+            tracker = CountObjectsByDateTracker(
+                period=period, metric=self.user_count, date_field="date_joined"
+            )
+            registry.register(str(period), tracker, self.User.objects.all())
+            tracker.track(self.User.objects.all())
+            self.addCleanup(registry.unregister, str(period))
+        from_date = date.today() - timedelta(days=5)
+        StatisticByDate.objects.filter(
+            date__in=[from_date, from_date + timedelta(days=2)]
+        ).delete()
+        StatisticByDate.objects.filter(
+            period=Period.LIFETIME, date=from_date + timedelta(days=3)
+        ).delete()
+        out = StringIO()
+        call_command(
+            "trackstats_backfill",
+            "--from-date={}".format(from_date - timedelta(days=1)),
+            "--dry-run",
+            stdout=out,
+        )
+        self.assertEqual(
+            out.getvalue().splitlines(),
+            [
+                "0: {} - {}".format(from_date, from_date),
+                "0: {} - {}".format(
+                    from_date + timedelta(days=2), from_date + timedelta(days=3)
+                ),
+                "86400: {} - {}".format(from_date, from_date),
+                "86400: {} - {}".format(
+                    from_date + timedelta(days=2), from_date + timedelta(days=2)
+                ),
+                # No signups today.
+                "86400: {} - {}".format(date.today(), date.today()),
+            ],
+        )
+        # From before the first signup.
+        before = min(self.expected_signups) - timedelta(days=1)
+        call_command(
+            "trackstats_backfill",
+            "--from-date={}".format(before),
+            stdout=StringIO(),
+        )
+        for stat in StatisticByDate.objects.narrow(metric=self.user_count):
+            period = "day" if stat.period == Period.DAY else "lifetime"
+            if stat.date == before:
+                # Recorded as having no data, rather than reported again.
+                self.assertEqual(stat.value, None if period == "day" else 0)
+                continue
+            self.assertEqual(stat.value, self.expected_signups[stat.date][period])
+        # But for today, data may yet arrive.
+        self.assertFalse(
+            StatisticByDate.objects.filter(
+                period=Period.DAY, date=date.today()
+            ).exists()
+        )
+        self.assertEqual(
+            StatisticByDate.objects.count(), 2 * len(self.expected_signups) + 1
+        )
+        out = StringIO()
+        call_command(
+            "trackstats_backfill",
+            "--from-date={}".format(before),
+            "--dry-run",
+            stdout=out,
+        )
+        self.assertEqual(
+            out.getvalue(), "86400: {} - {}\n".format(date.today(), date.today())
+        )
+        checkpoint = TrackerCheckpoint.objects.get(period=Period.DAY)
+        self.assertEqual(checkpoint.high_water_mark, date.today())
+
 
 class ObjectTrackersTestCase(TestCase):
     def setUp(self):
@@ -135,3 +369,703 @@ class ObjectTrackersTestCase(TestCase):
                 self.expected_daily[(stat.date, stat.object.pk)], stat.value
             )
         self.assertEqual(stats.count(), len(self.expected_daily))
+
+    def test_compact(self):
+        tracker = CountObjectsByDateAndObjectTracker(
+            period=Period.DAY,
+            metric=self.comment_count,
+            object_model=self.User,
+            object_field="user",
+            date_field="timestamp",
+            statistic_model=CompactStatisticByDateAndObject,
+        )
+        tracker.track(Comment.objects.all())
+        stats = CompactStatisticByDateAndObject.objects.series(
+            metric=self.comment_count, period=Period.DAY
+        )
+        self.assertEqual(
+            {(stat.date, stat.object_id): stat.value for stat in stats},
+            self.expected_daily,
+        )
+        self.assertEqual(StatisticByDateAndObject.objects.count(), 0)
+        # Windows cannot be replaced, nor searched for gaps.
+        from_date = date.today() - timedelta(days=1)
+        with self.assertRaises(TrackerNotSupported):
+            tracker.track(Comment.objects.all(), from_date=from_date)
+        with self.assertRaises(TrackerNotSupported):
+            tracker.backfill(Comment.objects.all(), from_date, date.today())
+
+    def test_rolling(self):
+        CountObjectsByDateAndObjectTracker(
+            period=Period.WEEK,
+            metric=self.comment_count,
+            object_model=self.User,
+            object_field="user",
+            date_field="timestamp",
+        ).track(Comment.objects.all())
+        stats = StatisticByDateAndObject.objects.narrow(
+            metric=self.comment_count, period=Period.WEEK
+        )
+        for stat in stats:
+            self.assertEqual(
+                stat.value,
+                self.expected_lifetime[(stat.date, stat.object_id)]
+                - self.expected_lifetime[
+                    (stat.date - timedelta(days=7), stat.object_id)
+                ],
+            )
+        self.assertEqual(stats.count(), len(self.expected_lifetime))
+
+    def test_retrack(self):
+        for name, period in [("daily", Period.DAY), ("lifetime", Period.LIFETIME)]:
+            tracker = CountObjectsByDateAndObjectTracker(
+                period=period,
+                metric=self.comment_count,
+                object_model=self.User,
+                object_field="user",
+                date_field="timestamp",
+            )
+            registry.register(name, tracker, Comment.objects.all())
+            tracker.track(Comment.objects.all())
+            self.addCleanup(registry.unregister, name)
+        # Comments got deleted, or arrived late.
+        day = date.today() - timedelta(days=3)
+        user, other = self.users[:2]
+        Comment.objects.filter(user=user, timestamp__date=day).delete()
+        del self.expected_daily[(day, user.pk)]
+        dt = timezone.now() - timedelta(days=4)
+        Comment.objects.create(timestamp=dt, user=other)
+        self.expected_daily[(to_date(dt), other.pk)] += 1
+        self.expected_lifetime = Counter()
+        for (first, pk), n in self.expected_daily.items():
+            for i in range((date.today() - first).days + 1):
+                self.expected_lifetime[(first + timedelta(days=i), pk)] += n
+        out = StringIO()
+        call_command(
+            "trackstats_track",
+            "daily",
+            "--from-date={}".format(to_date(dt)),
+            "--to-date={}".format(day),
+            "--refresh-period=lifetime",
+            stdout=out,
+        )
+        self.assertEqual(out.getvalue(), "daily: 2 rows written, 8 unchanged\n")
+        for period, expected in [
+            (Period.DAY, self.expected_daily),
+            (Period.LIFETIME, self.expected_lifetime),
+        ]:
+            stats = StatisticByDateAndObject.objects.narrow(
+                metric=self.comment_count, period=period
+            )
+            self.assertEqual(
+                {(stat.date, stat.object_id): stat.value for stat in stats},
+                dict(expected),
+            )
+        checkpoint = TrackerCheckpoint.objects.get(period=Period.DAY)
+        self.assertEqual(checkpoint.high_water_mark, date.today())
+        with self.assertRaises(ValueError):
+            tracker.track(Comment.objects.all(), refresh_periods=[Period.LIFETIME])
+
+    def test_sharded(self):
+        for period, expected in [
+            (Period.DAY, self.expected_daily),
+            (Period.LIFETIME, self.expected_lifetime),
+        ]:
+            for shard in range(3):
+                CountObjectsByDateAndObjectTracker(
+                    period=period,
+                    metric=self.comment_count,
+                    object_model=self.User,
+                    object_field="user",
+                    date_field="timestamp",
+                    shards=3,
+                    shard=shard,
+                ).track(Comment.objects.all())
+            stats = StatisticByDateAndObject.objects.narrow(
+                metric=self.comment_count, period=period
+            )
+            self.assertEqual(
+                {(stat.date, stat.object_id): stat.value for stat in stats},
+                dict(expected),
+            )
+        self.assertEqual(TrackerCheckpoint.objects.count(), 6)
+        # Each shard finds the gaps of its own objects.
+        day = date.today() - timedelta(days=2)
+        pks = [user.pk for user in self.users if user.pk % 3 == 1]
+        StatisticByDateAndObject.objects.filter(
+            period=Period.DAY, date=day, object_id__in=pks
+        ).delete()
+        for shard in range(3):
+            tracker = CountObjectsByDateAndObjectTracker(
+                period=Period.DAY,
+                metric=self.comment_count,
+                object_model=self.User,
+                object_field="user",
+                date_field="timestamp",
+                shards=3,
+                shard=shard,
+            )
+            self.assertEqual(
+                tracker.get_gaps(day - timedelta(days=1), day),
+                [(day, day)] if shard == 1 else [],
+            )
+
+    def test_locked(self):
+        def tracker(shard):
+            return CountObjectsByDateAndObjectTracker(
+                period=Period.DAY,
+                metric=self.comment_count,
+                object_model=self.User,
+                object_field="user",
+                date_field="timestamp",
+                shards=2,
+                shard=shard,
+            )
+
+        checkpoint = tracker(0).get_checkpoints(Comment.objects.all())[0]
+        self.assertTrue(checkpoint.acquire())
+        with self.assertLogs("trackstats.trackers") as logs:
+            with self.assertRaises(TrackerLocked):
+                tracker(0).track(Comment.objects.all())
+        self.assertEqual([record.levelname for record in logs.records], ["WARNING"])
+        # Other shards are not affected.
+        tracker(1).track(Comment.objects.all())
+        self.assertTrue(StatisticByDateAndObject.objects.exists())
+        # Stale locks are taken over.
+        TrackerCheckpoint.objects.filter(pk=checkpoint.pk).update(
+            started_at=timezone.now() - timedelta(days=1)
+        )
+        tracker(0).track(Comment.objects.all())
+        checkpoint.refresh_from_db()
+        self.assertEqual(checkpoint.status, TrackerCheckpoint.STATUS_COMPLETED)
+
+    def test_multi_metric(self):
+        comment_users = Metric.objects.register(
+            domain=self.comment_count.domain, ref="comment_users"
+        )
+        MultiMetricByDateAndObjectTracker(
+            period=Period.LIFETIME,
+            metrics={
+                self.comment_count: Count("pk"),
+                comment_users: Count("user", distinct=True),
+            },
+            object_model=self.User,
+            object_field="user",
+            date_field="timestamp",
+        ).track(Comment.objects.all())
+        stats = StatisticByDateAndObject.objects.narrow(
+            metrics=[self.comment_count], period=Period.LIFETIME
+        )
+        for stat in stats:
+            self.assertEqual(
+                self.expected_lifetime[(stat.date, stat.object.pk)], stat.value
+            )
+        self.assertEqual(stats.count(), len(self.expected_lifetime))
+        stats = StatisticByDateAndObject.objects.narrow(
+            metrics=[comment_users], period=Period.LIFETIME
+        )
+        self.assertEqual(set(stats.values_list("value", flat=True)), {1})
+        self.assertEqual(stats.count(), len(self.expected_lifetime))
+
+    def test_in_database(self):
+        comment_users = Metric.objects.register(
+            domain=self.comment_count.domain, ref="comment_users"
+        )
+        for period in [Period.DAY, Period.LIFETIME]:
+            tracker = MultiMetricByDateAndObjectTracker(
+                period=period,
+                metrics={
+                    self.comment_count: Count("pk"),
+                    comment_users: Count("user", distinct=True),
+                },
+                object_model=self.User,
+                object_field="user",
+                date_field="timestamp",
+                in_database=True,
+            )
+            tracker.track(Comment.objects.all())
+            self.assertNotIn("aggregate", tracker.run.phases)
+        expected = {
+            Period.DAY: self.expected_daily,
+            Period.LIFETIME: self.expected_lifetime,
+        }
+        for period, expected_values in expected.items():
+            stats = StatisticByDateAndObject.objects.narrow(
+                metric=self.comment_count, period=period
+            )
+            self.assertEqual(
+                {(stat.date, stat.object_id): stat.value for stat in stats},
+                expected_values,
+            )
+            stats = StatisticByDateAndObject.objects.narrow(
+                metric=comment_users, period=period
+            )
+            self.assertEqual(set(stats.values_list("value", flat=True)), {1})
+            self.assertEqual(stats.count(), len(expected_values))
+
+    def test_multi_timezone(self):
+        metrics = {
+            name: Metric.objects.register(
+                domain=self.comment_count.domain, ref="comment_count_" + name
+            )
+            for name in ["UTC", "America/New_York", "Asia/Kolkata"]
+        }
+        midnight = datetime.combine(date.today(), time(), tzinfo=dt_timezone.utc)
+        for hours in [-4, -1, 2]:
+            Comment.objects.create(
+                timestamp=midnight + timedelta(hours=hours), user=self.users[0]
+            )
+        tracker = MultiTimezoneByDateAndObjectTracker(
+            timezones=metrics,
+            object_model=self.User,
+            object_field="user",
+            date_field="timestamp",
+        )
+        tracker.track(Comment.objects.all())
+        self.assertEqual(tracker.run.phases["aggregate"]["queries"], 1)
+        for name, metric in metrics.items():
+            expected = Counter(
+                (
+                    comment.timestamp.astimezone(pytz.timezone(name)).date(),
+                    comment.user_id,
+                )
+                for comment in Comment.objects.all()
+            )
+            stats = StatisticByDateAndObject.objects.narrow(
+                metric=metric, period=Period.DAY
+            )
+            self.assertEqual(
+                {(stat.date, stat.object_id): stat.value for stat in stats},
+                dict(expected),
+            )
+
+    def test_rollup(self):
+        total_count = Metric.objects.register(
+            domain=self.comment_count.domain, ref="total_comment_count"
+        )
+        for period, expected_values in [
+            (Period.DAY, self.expected_daily),
+            (Period.LIFETIME, self.expected_lifetime),
+        ]:
+            CountObjectsByDateAndObjectTracker(
+                period=period,
+                metric=self.comment_count,
+                object_model=self.User,
+                object_field="user",
+                date_field="timestamp",
+            ).track(Comment.objects.all())
+            expected = {}
+            for (day, user_id), value in expected_values.items():
+                expected.setdefault(day, []).append(value)
+            for tracker_class, rollup in [
+                (RollupTracker, sum),
+                (MaxRollupTracker, max),
+                (CountRollupTracker, len),
+            ]:
+                tracker = tracker_class(
+                    period=period,
+                    metric=total_count,
+                    source_metric=self.comment_count,
+                    in_database=tracker_class is MaxRollupTracker,
+                )
+                tracker.track(StatisticByDateAndObject.objects.all())
+                stats = StatisticByDate.objects.narrow(
+                    metric=total_count, period=period
+                )
+                self.assertEqual(
+                    {stat.date: stat.value for stat in stats},
+                    {day: rollup(values) for day, values in expected.items()},
+                )
+                stats.delete()
+                TrackerCheckpoint.objects.filter(metric=total_count).delete()
+
+
+class DimensionTrackersTestCase(TestCase):
+    def setUp(self):
+        self.User = get_user_model()
+        domain = Domain.objects.register(ref="users")
+        self.user_count = Metric.objects.register(domain=domain, ref="user_count")
+        self.expected = Counter()
+        dt = timezone.now() - timedelta(days=3)
+        random.seed(33)
+        for i in range(30):
+            country = random.choice(["NL", "DE", "FR"])
+            joined = dt + timedelta(days=i % 3)
+            self.User.objects.create(
+                username="user{}".format(i), first_name=country, date_joined=joined
+            )
+            self.expected[(to_date(joined), country)] += 1
+
+    def test_count_daily(self):
+        CountObjectsByDateAndDimensionTracker(
+            period=Period.DAY,
+            metric=self.user_count,
+            dimension_field="first_name",
+            date_field="date_joined",
+        ).track(self.User.objects.all())
+        self.assertEqual(
+            DimensionValue.objects.count(), len(set(c for _, c in self.expected))
+        )
+        stats = StatisticByDateAndDimension.objects.narrow(
+            metric=self.user_count, period=Period.DAY
+        )
+        pivot = stats.pivot()
+        self.assertEqual(
+            {(dt, c): n for dt, row in pivot.items() for c, n in row.items()},
+            dict(self.expected),
+        )
+        totals = Counter()
+        for (_, country), n in self.expected.items():
+            totals[country] += n
+        self.assertEqual(
+            stats.top(1), sorted(totals.items(), key=lambda t: (-t[1], t[0]))[:1]
+        )
+        self.assertEqual(
+            sum(stats.narrow(dimension="NL").values_list("value", flat=True)),
+            totals["NL"],
+        )
+
+    def test_null(self):
+        self.User.objects.filter(first_name="NL").update(first_name="")
+        CountObjectsByDateAndDimensionTracker(
+            period=Period.LIFETIME,
+            metric=self.user_count,
+            dimension_field="country",
+            date_field="date_joined",
+        ).track(
+            self.User.objects.annotate(
+                country=NullIf("first_name", Value("DE"))
+            ).filter(first_name__in=["", "DE"])
+        )
+        stats = StatisticByDateAndDimension.objects.narrow(
+            metric=self.user_count, period=Period.LIFETIME, date=date.today()
+        )
+        totals = Counter()
+        for (_, country), n in self.expected.items():
+            totals[country] += n
+        # Missing values are not merged with empty ones.
+        self.assertEqual(
+            dict(stats.values_list("dimension__value", "value")),
+            {"": totals["NL"], DimensionValue.NULL: totals["DE"]},
+        )
+        self.assertEqual(stats.narrow(dimensions=[None]).get().value, totals["DE"])
+
+
+class DistributionTrackersTestCase(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        domain = Domain.objects.register(ref="comments")
+        self.comment_length = Metric.objects.register(
+            domain=domain, ref="comment_length"
+        )
+        self.users = [
+            User.objects.create(username="user{}".format(i)) for i in range(2)
+        ]
+        self.lengths = {}
+        dt = timezone.now() - timedelta(days=7)
+        while to_date(dt) <= date.today():
+            for user in self.users:
+                for i in range(50):
+                    length = random.choice([0, random.randint(1, 5000)])
+                    Comment.objects.create(timestamp=dt, user=user, length=length)
+                    self.lengths.setdefault((to_date(dt), user.pk), []).append(length)
+            dt += timedelta(days=1)
+
+    def assertQuantiles(self, quantiles, lengths):
+        lengths = sorted(lengths)
+        for q, value in quantiles.items():
+            exact = lengths[int(q * (len(lengths) - 1))]
+            self.assertAlmostEqual(value, exact, delta=exact * 0.01 + 1e-9)
+
+    def test_daily(self):
+        DistributionByDateTracker(
+            period=Period.DAY,
+            metric=self.comment_length,
+            date_field="timestamp",
+            value_field="length",
+        ).track(Comment.objects.all())
+        self.assertEqual(
+            DistributionByDate.objects.count(), len(self.lengths) // len(self.users)
+        )
+        from_date = date.today() - timedelta(days=3)
+        lengths = [
+            length
+            for (day, pk), values in self.lengths.items()
+            if day >= from_date
+            for length in values
+        ]
+        quantiles = DistributionByDate.objects.quantiles(
+            quantiles=(0, 0.25, 0.5, 0.95, 1),
+            metric=self.comment_length,
+            period=Period.DAY,
+            from_date=from_date,
+        )
+        self.assertQuantiles(quantiles, lengths)
+        histogram = DistributionByDate.objects.merged(
+            metric=self.comment_length, period=Period.DAY, from_date=from_date
+        )
+        self.assertEqual(histogram.count, len(lengths))
+        self.assertEqual(histogram.sum, sum(lengths))
+
+    def test_daily_by_object(self):
+        DistributionByDateAndObjectTracker(
+            period=Period.DAY,
+            metric=self.comment_length,
+            object_model=get_user_model(),
+            object_field="user",
+            date_field="timestamp",
+            value_field="length",
+        ).track(Comment.objects.all())
+        self.assertEqual(DistributionByDateAndObject.objects.count(), len(self.lengths))
+        user = self.users[0]
+        quantiles = DistributionByDateAndObject.objects.quantiles(
+            metric=self.comment_length, period=Period.DAY, object=user
+        )
+        self.assertQuantiles(
+            quantiles,
+            [
+                length
+                for (day, pk), values in self.lengths.items()
+                if pk == user.pk
+                for length in values
+            ],
+        )
+
+    def test_lifetime(self):
+        for tracker in [
+            DistributionByDateTracker(
+                period=Period.LIFETIME,
+                metric=self.comment_length,
+                date_field="timestamp",
+                value_field="length",
+            ),
+            DistributionByDateAndObjectTracker(
+                period=Period.LIFETIME,
+                metric=self.comment_length,
+                object_model=get_user_model(),
+                object_field="user",
+                date_field="timestamp",
+                value_field="length",
+            ),
+        ]:
+            tracker.track(Comment.objects.all())
+            user = self.users[0]
+            upto_date = date.today() - timedelta(days=2)
+            narrow_kwargs = {
+                "metric": self.comment_length,
+                "period": Period.LIFETIME,
+                "date": upto_date,
+            }
+            lengths = [
+                length
+                for (day, pk), values in self.lengths.items()
+                if day <= upto_date
+                for length in values
+            ]
+            if tracker.statistic_model is DistributionByDateAndObject:
+                narrow_kwargs["object"] = user
+                lengths = [
+                    length
+                    for (day, pk), values in self.lengths.items()
+                    if day <= upto_date and pk == user.pk
+                    for length in values
+                ]
+            stat = tracker.statistic_model.objects.narrow(**narrow_kwargs).get()
+            histogram = stat.histogram
+            self.assertEqual(histogram.count, len(lengths))
+            self.assertEqual(histogram.sum, sum(lengths))
+            self.assertQuantiles(
+                tracker.statistic_model.objects.quantiles(
+                    quantiles=(0, 0.5, 0.95, 1), **narrow_kwargs
+                ),
+                lengths,
+            )
+
+
+class EventTrackersTestCase(TestCase):
+    def setUp(self):
+        domain = Domain.objects.register(ref="events")
+        self.impressions = Metric.objects.register(domain=domain, ref="impressions")
+        self.users = [
+            get_user_model().objects.create(username="user{}".format(i))
+            for i in range(3)
+        ]
+        self.expected = Counter()
+
+    def ingest(self, days):
+        events = []
+        for day in range(days):
+            dt = timezone.now() - timedelta(days=day)
+            for user in self.users:
+                for i in range(random.randint(1, 3)):
+                    events.append(
+                        dict(metric=self.impressions, timestamp=dt, object=user)
+                    )
+                    self.expected[(to_date(dt), user.pk)] += 1
+        self.assertEqual(Event.objects.ingest(events, batch_size=10), len(events))
+
+    def test_by_date(self):
+        self.ingest(5)
+        tracker = EventsByDateTracker(
+            metric=self.impressions, prune=True, settle_lag=timedelta(0)
+        )
+        tracker.track(Event.objects.all())
+        self.assertFalse(Event.objects.exists())
+        self.ingest(2)
+        tracker = EventsByDateTracker(
+            metric=self.impressions, prune=True, settle_lag=timedelta(0)
+        )
+        tracker.track(Event.objects.all())
+        self.assertEqual(tracker.run.from_date, date.today() - timedelta(days=1))
+        expected = Counter()
+        for (day, pk), n in self.expected.items():
+            expected[day] += n
+        self.assertEqual(
+            dict(
+                StatisticByDate.objects.narrow(
+                    metric=self.impressions, period=Period.DAY
+                ).values_list("date", "value")
+            ),
+            dict(expected),
+        )
+        # Nothing left to aggregate.
+        tracker.track(Event.objects.all())
+        self.assertEqual(tracker.run.rows_read, 0)
+
+    def test_window(self):
+        self.ingest(2)
+        tracker = EventsByDateTracker(metric=self.impressions, settle_lag=timedelta(0))
+        tracker.track(Event.objects.all())
+        from_date = date.today() - timedelta(days=1)
+        for retrack in [
+            lambda: tracker.track(Event.objects.all(), from_date=from_date),
+            lambda: tracker.backfill(Event.objects.all(), from_date, date.today()),
+        ]:
+            with self.assertRaises(TrackerNotSupported):
+                retrack()
+        # Refused before taking the checkpoint.
+        checkpoint = TrackerCheckpoint.objects.get()
+        self.assertEqual(checkpoint.status, TrackerCheckpoint.STATUS_COMPLETED)
+        registry.register("impressions", tracker, Event.objects.all())
+        self.addCleanup(registry.unregister, "impressions")
+        err = StringIO()
+        call_command(
+            "trackstats_track",
+            "--from-date={}".format(from_date),
+            stdout=StringIO(),
+            stderr=err,
+        )
+        self.assertIn("impressions: ", err.getvalue())
+        self.assertIn("cannot re-track", err.getvalue())
+        err = StringIO()
+        call_command(
+            "trackstats_backfill",
+            "--from-date={}".format(from_date),
+            stdout=StringIO(),
+            stderr=err,
+        )
+        self.assertTrue(err.getvalue().startswith("impressions: "))
+        self.assertTrue(err.getvalue().endswith(", skipped\n"))
+
+    def test_settle_lag(self):
+        self.ingest(2)
+        settled = Event.objects.order_by("pk")[5].pk
+        Event.objects.filter(pk__lte=settled).update(
+            logged_at=timezone.now() - timedelta(hours=2)
+        )
+        tracker = EventsByDateTracker(
+            metric=self.impressions, prune=True, settle_lag=timedelta(hours=1)
+        )
+        tracker.track(Event.objects.all())
+        # The events logged since may yet be joined by others of lower IDs.
+        stats = StatisticByDate.objects.narrow(
+            metric=self.impressions, period=Period.DAY
+        )
+        self.assertEqual(stats.aggregate(n=Sum("value"))["n"], 6)
+        self.assertEqual(Event.objects.filter(pk__lte=settled).count(), 0)
+        self.assertEqual(Event.objects.count(), sum(self.expected.values()) - 6)
+        Event.objects.update(logged_at=timezone.now() - timedelta(hours=2))
+        tracker.track(Event.objects.all())
+        self.assertEqual(
+            stats.aggregate(n=Sum("value"))["n"], sum(self.expected.values())
+        )
+        self.assertFalse(Event.objects.exists())
+
+    def test_by_date_and_object(self):
+        self.ingest(3)
+        tracker = EventsByDateAndObjectTracker(
+            metric=self.impressions,
+            object_model=get_user_model(),
+            settle_lag=timedelta(0),
+        )
+        tracker.track(Event.objects.all())
+        self.ingest(1)
+        tracker.track(Event.objects.all())
+        self.assertEqual(Event.objects.count(), sum(self.expected.values()))
+        stats = StatisticByDateAndObject.objects.narrow(
+            metric=self.impressions, period=Period.DAY
+        )
+        self.assertEqual(
+            {(stat.date, stat.object_id): stat.value for stat in stats},
+            dict(self.expected),
+        )
+
+
+class MultiDatabaseTestCase(TestCase):
+    databases = {"default", "analytics"}
+
+    def setUp(self):
+        self.User = get_user_model()
+        domain = Domain.objects.using("analytics").create(ref="comments")
+        self.comment_count = Metric.objects.using("analytics").create(
+            domain=domain, ref="comment_count"
+        )
+        self.user = self.User.objects.create(username="john")
+        for i in range(3):
+            Comment.objects.create(user=self.user)
+
+    def test_stats_using(self):
+        CountObjectsByDateAndObjectTracker(
+            period=Period.DAY,
+            metric=self.comment_count,
+            object_model=self.User,
+            object_field="user",
+            date_field="timestamp",
+            stats_using="analytics",
+        ).track(Comment.objects.all())
+        self.assertFalse(StatisticByDateAndObject.objects.using("default").exists())
+        stat = StatisticByDateAndObject.objects.using("analytics").get()
+        self.assertEqual(stat.value, 3)
+        self.assertEqual(stat.object_type._state.db, "analytics")
+        self.assertTrue(TrackerCheckpoint.objects.using("analytics").exists())
+
+    @override_settings(
+        DATABASE_ROUTERS=["trackstats.routers.TrackStatsRouter"],
+        TRACKSTATS_DATABASE="analytics",
+    )
+    def test_router(self):
+        CountObjectsByDateTracker(
+            period=Period.LIFETIME, metric=self.comment_count, date_field="timestamp"
+        ).track(Comment.objects.all())
+        self.assertFalse(StatisticByDate.objects.using("default").exists())
+        stat = StatisticByDate.objects.get()
+        self.assertEqual(stat.value, 3)
+        self.assertEqual(stat._state.db, "analytics")
+
+    @override_settings(
+        DATABASE_ROUTERS=["trackstats.routers.TrackStatsRouter"],
+        TRACKSTATS_DATABASE="analytics",
+    )
+    def test_with_objects(self):
+        CountObjectsByDateAndObjectTracker(
+            period=Period.DAY,
+            metric=self.comment_count,
+            object_model=self.User,
+            object_field="user",
+            date_field="timestamp",
+        ).track(Comment.objects.all())
+        stat = StatisticByDateAndObject.objects.with_objects().get()
+        self.assertEqual(stat._state.db, "analytics")
+        # Loaded from the database of the users.
+        with self.assertNumQueries(0, using="analytics"):
+            self.assertEqual(stat.object, self.user)
@@ -0,0 +1,171 @@
+from datetime import date, datetime, time, timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db.models import F
+from django.test import TestCase
+from django.utils import timezone
+
+from trackstats.models import (
+    CompactStatisticByDateAndObject,
+    Domain,
+    Metric,
+    Period,
+    StatisticByDate,
+    StatisticByDateAndObject,
+)
+from trackstats.registry import registry
+from trackstats.tests.models import Comment
+from trackstats.trackers import (
+    CountObjectsByDateAndObjectTracker,
+    CountObjectsByDateTracker,
+)
+from trackstats.verify import verify
+
+
+User = get_user_model()
+
+
+class VerifyTestCase(TestCase):
+    def setUp(self):
+        domain = Domain.objects.register(ref="comments")
+        self.comment_count = Metric.objects.register(domain=domain, ref="comment_count")
+        self.users = [
+            User.objects.create(username="user{}".format(i)) for i in range(3)
+        ]
+        self.from_date = date.today() - timedelta(days=40)
+        for days in range(40):
+            dt = timezone.make_aware(
+                datetime.combine(self.from_date + timedelta(days=days), time(12))
+            )
+            for i, user in enumerate(self.users):
+                for n in range((days + i) % 3 + 1):
+                    Comment.objects.create(timestamp=dt, user=user)
+
+    def tearDown(self):
+        Domain.objects.clear_cache()
+        Metric.objects.clear_cache()
+
+    def get_tracker(self):
+        return CountObjectsByDateTracker(
+            period=Period.DAY, metric=self.comment_count, date_field="timestamp"
+        )
+
+    def test_by_date(self):
+        tracker = self.get_tracker()
+        tracker.track(Comment.objects.all())
+        result = verify(tracker, Comment.objects.all(), window="week")
+        self.assertEqual(result.discrepancies, [])
+        self.assertEqual(result.mismatches, [])
+        self.assertGreaterEqual(result.windows, 6)
+        stats = StatisticByDate.objects.narrow(
+            metric=self.comment_count, period=Period.DAY
+        ).order_by("date")
+        changed, deleted = stats[3], stats[20]
+        stats.filter(pk=changed.pk).update(value=F("value") + 1)
+        deleted.delete()
+        result = verify(tracker, Comment.objects.all(), window="week")
+        self.assertEqual(len(result.mismatches), 2)
+        self.assertEqual(
+            [(d.date, d.expected, d.actual) for d in result.discrepancies],
+            [
+                (changed.date, changed.value, changed.value + 1),
+                (deleted.date, deleted.value, None),
+            ],
+        )
+        result = verify(tracker, Comment.objects.all(), retrack=True)
+        self.assertEqual(
+            result.retracked,
+            [(changed.date, changed.date), (deleted.date, deleted.date)],
+        )
+        result = verify(tracker, Comment.objects.all())
+        self.assertEqual(result.discrepancies, [])
+
+    def test_by_object(self):
+        tracker = CountObjectsByDateAndObjectTracker(
+            period=Period.DAY,
+            metric=self.comment_count,
+            object_model=User,
+            object_field="user",
+            date_field="timestamp",
+        )
+        tracker.track(Comment.objects.all())
+        self.assertEqual(verify(tracker, Comment.objects.all()).discrepancies, [])
+        # Swapping values between objects keeps the total of the day.
+        day = self.from_date + timedelta(days=10)
+        stats = StatisticByDateAndObject.objects.narrow(
+            metric=self.comment_count, period=Period.DAY, date=day
+        )
+        first, second = stats.filter(object_id__in=[u.pk for u in self.users[:2]])
+        stats.filter(pk=first.pk).update(value=second.value)
+        stats.filter(pk=second.pk).update(value=first.value)
+        result = verify(tracker, Comment.objects.all())
+        self.assertEqual(len(result.mismatches), 1)
+        self.assertEqual(
+            sorted((d.object_id, d.expected, d.actual) for d in result.discrepancies),
+            sorted(
+                [
+                    (first.object_id, first.value, second.value),
+                    (second.object_id, second.value, first.value),
+                ]
+            ),
+        )
+
+    def test_command(self):
+        tracker = self.get_tracker()
+        tracker.track(Comment.objects.all())
+        registry.register("comments", tracker, Comment.objects.all())
+        self.addCleanup(registry.unregister, "comments")
+        StatisticByDate.objects.filter(date=self.from_date).update(value=0)
+        out = StringIO()
+        call_command("trackstats_verify", "comments", "--retrack", stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(
+            lines[0],
+            "comments: {}: metric {}: expected 6, found 0".format(
+                self.from_date.isoformat(), self.comment_count.pk
+            ),
+        )
+        self.assertEqual(
+            lines[1],
+            "comments: re-tracked {0} - {0}".format(self.from_date.isoformat()),
+        )
+        self.assertRegex(lines[2], r"^comments: 1 discrepancies in 1 of \d+ windows$")
+        self.assertEqual(
+            StatisticByDate.objects.get(date=self.from_date, period=Period.DAY).value,
+            6,
+        )
+
+    def test_command_skipped(self):
+        trackers = {
+            "comments": self.get_tracker(),
+            "compact": CountObjectsByDateAndObjectTracker(
+                period=Period.DAY,
+                metric=self.comment_count,
+                object_model=User,
+                object_field="user",
+                date_field="timestamp",
+                statistic_model=CompactStatisticByDateAndObject,
+            ),
+            "broken": CountObjectsByDateTracker(
+                period=Period.DAY, metric=self.comment_count, date_field="removed"
+            ),
+        }
+        for name, tracker in trackers.items():
+            registry.register(name, tracker, Comment.objects.all())
+            self.addCleanup(registry.unregister, name)
+        trackers["comments"].track(Comment.objects.all())
+        out = StringIO()
+        err = StringIO()
+        with self.assertRaisesMessage(CommandError, "Failed tracker(s): broken"):
+            call_command("trackstats_verify", stdout=out, stderr=err)
+        lines = err.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith("broken: failed: FieldDoesNotExist("))
+        self.assertEqual(
+            lines[1],
+            "compact: Only daily statistics of additive aggregates can be"
+            " verified, skipped",
+        )
+        # The others are verified all the same.
+        self.assertRegex(out.getvalue(), r"^comments: 0 discrepancies in 0 of \d+")
@@ -1,53 +1,352 @@
-from datetime import date, datetime, time, timedelta
+import copy
+import math
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
 
 import django
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
-from django.db import connections, models
+from django.db import connections, models, router, transaction
+from django.db.models.functions import (
+    Abs,
+    Cast,
+    Ceil,
+    Coalesce,
+    Ln,
+    Mod,
+    Round,
+    Sign,
+    TruncDate,
+)
 from django.utils import timezone
 
-from .models import Period, StatisticByDate, StatisticByDateAndObject
+import pytz
+
+from .instrumentation import TrackerRun
+from .models import (
+    PERIOD_CHOICES,
+    AbstractStatistic,
+    DistributionByDate,
+    DistributionByDateAndObject,
+    Period,
+    StatisticByDate,
+    StatisticByDateAndDimension,
+    StatisticByDateAndObject,
+    TrackerCheckpoint,
+    date_ranges,
+    deferred_touch,
+)
+from .sketches import DEFAULT_RELATIVE_ACCURACY, Histogram
+
+
+def is_additive(aggr_op):
+    """Whether the aggregates of disjoint sets of rows add up to that of
+    all rows: true for a ``Sum``, and a ``Count`` that is not distinct
+    (other than by primary key).
+    """
+    if not isinstance(aggr_op, (models.Sum, models.Count)):
+        return False
+    if aggr_op.distinct:
+        expression = aggr_op.get_source_expressions()[0]
+        return getattr(expression, "name", None) == "pk"
+    return True
+
+
+class TrackerLocked(Exception):
+    """Raised when tracking while another run of the same tracker (or
+    shard) is in progress.
+    """
+
+
+class TrackerNotSupported(NotImplementedError):
+    """Raised when asking a tracker for what it does not support, e.g. to
+    re-track a window of dates.
+    """
 
 
 class ObjectsByDateTracker(object):
+    # Identifies the tracker in the key of its checkpoints, so that those
+    # tracking the same source differently do not share them. Set to the
+    # name registered under, if not given (see ``trackstats.registry``).
+    name = None
     date_field = "date"
     aggr_op = None
     metric = None
     period = None
     statistic_model = StatisticByDate
+    # Resume from a persisted checkpoint instead of deriving the start date
+    # from the statistics (and the source) on every run.
+    use_checkpoint = True
+    checkpoints = ()
+    # Runs are assumed to have died after this long, unless the checkpoint
+    # is locked by means of a PostgreSQL advisory lock.
+    lock_timeout = timedelta(hours=6)
+    # Whether the values tracked are to be added to those of the statistics
+    # (see ``bulk_increment()``), instead of replacing them.
+    incremental = False
+    # Aggregate and write the statistics in the database, using a single
+    # ``INSERT ... SELECT ... ON CONFLICT`` statement per metric, instead of
+    # fetching the aggregated rows (see ``can_track_in_database()``).
+    in_database = False
+    window_records = None
+    # The database to read the source from (e.g. a replica), defaults to
+    # that of the queryset tracked.
+    using = None
+    # The database to write the statistics to, defaults to the one the
+    # database routers pick for the statistic model.
+    stats_using = None
 
     def __init__(self, **kwargs):
         for prop, val in kwargs.items():
             setattr(self, prop, val)
+        self.run = TrackerRun(self)
+
+    def __str__(self):
+        return "{}({}, {})".format(
+            self.__class__.__name__,
+            ", ".join(str(metric) for metric in self.get_metrics()),
+            dict(PERIOD_CHOICES).get(self.period, self.period),
+        )
+
+    def get_metrics(self):
+        return [self.metric]
+
+    def get_dependencies(self):
+        """The ``(metric, period)`` statistics the tracker reads, to be
+        tracked before it is (see ``trackstats.scheduler``).
+        """
+        return []
+
+    def get_stats_db(self):
+        return self.stats_using or router.db_for_write(self.statistic_model)
+
+    def get_statistics(self):
+        return self.statistic_model.objects.db_manager(self.get_stats_db())
+
+    def get_content_type(self, model_or_object):
+        return ContentType.objects.db_manager(self.get_stats_db()).get_for_model(
+            model_or_object
+        )
+
+    def get_aggregates(self):
+        return {"ts_n": self.aggr_op}
+
+    def get_records(self, val, date):
+        """The statistics to record (as ``record()`` keyword arguments,
+        excluding the period) for a row of aggregated values.
+        """
+        return [
+            dict(
+                metric=self.metric,
+                value=val["ts_n"],
+                date=date,
+                **self.get_record_kwargs(val)
+            )
+        ]
+
+    def write(self, records):
+        """Records the statistics, as returned by ``get_records()``, in
+        bulk.
+        """
+        if self.window_records is not None:
+            # Re-tracking a window, see ``retrack_run()``.
+            self.window_records.extend(records)
+            return
+        statistics = self.get_statistics()
+        bulk_write = (
+            statistics.bulk_increment if self.incremental else statistics.bulk_record
+        )
+        result = bulk_write(dict(period=self.period, **kwargs) for kwargs in records)
+        self.run.rows_written += result["created"] + result["updated"]
+        self.run.rows_unchanged += result["unchanged"]
+
+    def can_track_in_database(self, qs):
+        """Whether to track in the database: requires ``in_database``, and
+        the source and the statistics to share a PostgreSQL or SQLite
+        database. Statistics written elsewhere as well (latest values) or
+        buffered (when re-tracking a window) are tracked as usual.
+        """
+        return (
+            self.in_database
+            and self.window_records is None
+            and qs.db == self.get_stats_db()
+            and connections[qs.db].vendor in ("postgresql", "sqlite")
+            and issubclass(self.statistic_model, AbstractStatistic)
+            and self.get_statistics().get_latest_model() is None
+        )
+
+    def get_insert_annotations(self):
+        """The source annotations selected when tracking in the database,
+        grouped by along with the date.
+        """
+        return {}
+
+    def get_insert_columns(self, metric, date=None):
+        """The statistic fields inserted when tracking in the database,
+        mapped to the aggregated value they are selected from, or to a
+        constant ``models.Value``.
+        """
+        return {
+            "date": "ts_date" if date is None else models.Value(date),
+            "metric": models.Value(metric.pk),
+            "period": models.Value(self.period),
+            "value": "ts_n",
+        }
+
+    def write_in_database(self, vals, date=None):
+        """Writes the statistics aggregated by ``vals`` (a ``values()``
+        queryset, grouped by day unless a ``date`` is given) using an
+        ``INSERT ... SELECT ... ON CONFLICT DO UPDATE`` statement per
+        metric, skipping unchanged values. None of the rows cross the wire.
+        """
+        connection = connections[vals.db]
+        qn = connection.ops.quote_name
+        opts = self.statistic_model._meta
+        table = qn(opts.db_table)
+        value = qn(opts.get_field("value").column)
+        if self.incremental:
+            update = "{value} = COALESCE({table}.{value}, 0) + EXCLUDED.{value}"
+        else:
+            update = (
+                "{value} = EXCLUDED.{value} WHERE {table}.{value} {distinct}"
+                " EXCLUDED.{value}"
+            )
+        update = update.format(
+            table=table,
+            value=value,
+            distinct=(
+                "IS DISTINCT FROM" if connection.vendor == "postgresql" else "IS NOT"
+            ),
+        )
+        key = ", ".join(
+            qn(opts.get_field(name).column) for name in opts.unique_together[0]
+        )
+        sql, params = vals.query.get_compiler(connection=connection).as_sql()
+        for metric in self.get_metrics():
+            columns = []
+            select = []
+            select_params = []
+            for name, source in self.get_insert_columns(metric, date).items():
+                field = opts.get_field(name)
+                columns.append(qn(field.column))
+                if isinstance(source, models.Value):
+                    if connection.vendor == "postgresql":
+                        # Otherwise, parameters are taken to be text.
+                        select.append("%s::" + field.cast_db_type(connection))
+                    else:
+                        select.append("%s")
+                    select_params.append(
+                        field.get_db_prep_save(source.value, connection)
+                    )
+                else:
+                    select.append("ts." + qn(source))
+            with connection.cursor() as cursor:
+                # WHERE TRUE: SQLite would otherwise parse ON CONFLICT as a
+                # join constraint.
+                cursor.execute(
+                    "INSERT INTO {table} ({columns}) SELECT {select}"
+                    " FROM ({sql}) ts WHERE TRUE"
+                    " ON CONFLICT ({key}) DO UPDATE SET {update}".format(
+                        table=table,
+                        columns=", ".join(columns),
+                        select=", ".join(select),
+                        sql=sql,
+                        key=key,
+                        update=update,
+                    ),
+                    select_params + list(params),
+                )
+                # Unchanged values are neither inserted nor updated.
+                written = cursor.rowcount
+            self.run.rows_written += written
+            if written:
+                self.get_statistics().touch([metric.pk])
 
-    def get_most_recent_kwargs(self):
-        most_recent_kwargs = {"metric": self.metric, "period": self.period}
+    def get_most_recent_kwargs(self, metric):
+        most_recent_kwargs = {"metric": metric, "period": self.period}
         return most_recent_kwargs
 
+    def get_checkpoint_kwargs(self, qs, metric):
+        return {
+            "metric": metric,
+            "period": self.period,
+            "source": "{}{}.{}".format(
+                "{}@".format(self.name) if self.name else "",
+                qs.model._meta.label_lower,
+                self.date_field,
+            ),
+        }
+
+    def get_checkpoints(self, qs):
+        return [
+            TrackerCheckpoint.objects.db_manager(self.get_stats_db()).get_for(
+                **self.get_checkpoint_kwargs(qs, metric)
+            )
+            for metric in self.get_metrics()
+        ]
+
+    def acquire_checkpoints(self, qs):
+        checkpoints = self.get_checkpoints(qs)
+        for i, checkpoint in enumerate(checkpoints):
+            if not checkpoint.acquire(self.lock_timeout):
+                for acquired in checkpoints[:i]:
+                    acquired.abandon()
+                raise TrackerLocked(str(self))
+        return checkpoints
+
+    def get_most_recent(self, metric):
+        return self.get_statistics().most_recent(**self.get_most_recent_kwargs(metric))
+
     def get_start_date(self, qs):
-        most_recent_kwargs = self.get_most_recent_kwargs()
-        last_stat = self.statistic_model.objects.most_recent(**most_recent_kwargs)
-        if last_stat:
-            start_date = last_stat.date
-        else:
+        if self.checkpoints and all(cp.high_water_mark for cp in self.checkpoints):
+            # Recompute the last day tracked, it may not have been over yet.
+            return min(cp.high_water_mark for cp in self.checkpoints)
+        start_date = None
+        for metric in self.get_metrics():
+            last_stat = self.get_most_recent(metric)
+            if not last_stat:
+                start_date = None
+                break
+            if start_date is None or last_stat.date < start_date:
+                start_date = last_stat.date
+        if start_date is None:
             first_instance = qs.order_by(self.date_field).first()
             if first_instance is None:
                 # No data
                 return
             start_date = getattr(first_instance, self.date_field)
-        if start_date and isinstance(start_date, datetime):
-            if timezone.is_aware(start_date):
-                start_date = timezone.make_naive(start_date).date()
+        return self.to_date(start_date)
+
+    def to_date(self, value):
+        if value and isinstance(value, datetime):
+            if timezone.is_aware(value):
+                value = timezone.make_naive(value).date()
             else:
-                start_date = start_date.date()
-        return start_date
+                value = value.date()
+        return value
 
-    def track_lifetime_upto(self, qs, upto_date):
+    def get_upto_filter_kwargs(self, upto_date):
+        """Filters the source up to including ``upto_date``, and, for
+        rolling periods (e.g. ``Period.WEEK``), from the start of the
+        period ending at that date.
+        """
         filter_kwargs = {self.date_field + "__date__lte": upto_date}
-        n = qs.filter(**filter_kwargs).count()
-        self.statistic_model.objects.record(
-            metric=self.metric, value=n, period=self.period, date=upto_date
-        )
+        if self.period != Period.LIFETIME:
+            days = self.period // Period.DAY
+            filter_kwargs[self.date_field + "__date__gt"] = upto_date - timedelta(
+                days=days
+            )
+        return filter_kwargs
+
+    def track_lifetime_upto(self, qs, upto_date):
+        """Tracks the statistic of ``upto_date``, which covers all data up to
+        that date (or, for rolling periods, the period ending at it).
+        """
+        filter_kwargs = self.get_upto_filter_kwargs(upto_date)
+        with self.run.phase("aggregate"):
+            val = qs.filter(**filter_kwargs).aggregate(**self.get_aggregates())
+            self.run.rows_read += 1
+        with self.run.phase("write"):
+            self.write(self.get_records(val, upto_date))
 
     def get_track_values(self):
         return []
@@ -55,70 +354,304 @@ class ObjectsByDateTracker(object):
     def get_record_kwargs(self, val):
         return {}
 
-    def track(self, qs):
-        to_date = date.today()
-        start_date = self.get_start_date(qs)
-        if not start_date:
+    def filter_source(self, qs):
+        return qs
+
+    def track(self, qs, from_date=None, to_date=None, refresh_periods=()):
+        """Tracks the statistics, from where the previous run left off.
+
+        Alternatively, pass ``from_date`` (and ``to_date``, defaulting to
+        today) to re-track just that window, e.g. after data arrived late
+        or got deleted. Statistics in the window that no longer have data
+        are deleted. Statistics depending on the window (of the lifetime
+        or rolling period after it) are refreshed, as are those of this
+        tracker for the other periods given by ``refresh_periods``.
+
+        The statistics of the window are collected in memory before being
+        written, and those of the lifetime (or rolling periods) take a
+        query per day, so keep windows short.
+        """
+        if from_date is None:
+            if refresh_periods:
+                raise ValueError("refresh_periods requires from_date")
+            self.execute(qs, self.track_run)
             return
+        self.check_window_supported()
+        to_date = to_date or date.today()
+        self.execute(
+            qs, lambda qs: self.retrack_run(qs, from_date, to_date), advance=False
+        )
+        for period in refresh_periods:
+            tracker = copy.copy(self)
+            tracker.period = period
+            tracker.checkpoints = ()
+            tracker.track(qs, from_date, to_date)
+
+    def backfill(self, qs, from_date, to_date):
+        """Tracks the days, from ``from_date`` up to including ``to_date``,
+        for which statistics are missing (see ``get_gaps()``). Returns the
+        ranges of days tracked.
+
+        Days found to have no data at all are recorded as such (a value of
+        NULL, see ``get_empty_record_kwargs()``), so that these are not
+        reported as missing, and tracked, over and over again.
+        """
+        self.check_window_supported()
+        gaps = []
+
+        def backfill_run(qs):
+            self.run.from_date = from_date
+            self.run.to_date = to_date
+            with self.run.phase("gaps"):
+                gaps.extend(self.get_gaps(from_date, to_date))
+            for first, last in gaps:
+                self.track_window(qs, first, last)
+            if gaps:
+                with self.run.phase("write"):
+                    self.record_empty(gaps)
+
+        self.execute(qs, backfill_run, advance=False)
+        return gaps
+
+    def check_window_supported(self):
+        """Raises ``TrackerNotSupported`` unless the tracker can re-track
+        (or backfill) a window of dates.
+        """
+        if not self.get_statistics().all().supports_windows:
+            raise TrackerNotSupported(
+                "{} cannot re-track (or backfill) windows of dates of {}".format(
+                    self, self.statistic_model._meta.verbose_name_plural
+                )
+            )
+
+    def get_empty_record_kwargs(self):
+        """The ``record()`` keyword arguments (besides the metric, period
+        and date, and defaulting to a NULL value) of the statistics marking
+        days without data, or None if these cannot be marked, e.g. when
+        tracking per object, for all objects.
+        """
+        return {}
+
+    def record_empty(self, gaps):
+        """Records the days in ``gaps`` (a list of ``(first, last)``
+        tuples) that still lack statistics as having no data. Today is
+        left out, as data may yet arrive.
+        """
+        kwargs = self.get_empty_record_kwargs()
+        if kwargs is None:
+            return
+        kwargs = dict({"value": None}, **kwargs)
+        today = date.today()
+        days = set()
+        for first, last in gaps:
+            days.update(
+                first + timedelta(days=i) for i in range((last - first).days + 1)
+            )
+        days = {day for day in days if day < today}
+        if not days:
+            return
+        first, last = min(days), max(days)
+        for metric in self.get_metrics():
+            missing = []
+            for gap_first, gap_last in self.get_window_statistics(
+                metric, first, last
+            ).find_gaps(first, last):
+                missing.extend(
+                    gap_first + timedelta(days=i)
+                    for i in range((gap_last - gap_first).days + 1)
+                )
+            result = self.get_statistics().bulk_record(
+                dict(kwargs, metric=metric, period=self.period, date=day)
+                for day in missing
+                if day in days
+            )
+            self.run.rows_written += result["created"]
+
+    def get_window_end(self, to_date):
+        """The last date of which the statistic depends on the data up to
+        including ``to_date``.
+        """
+        if self.period == Period.DAY:
+            return to_date
+        today = date.today()
         if self.period == Period.LIFETIME:
-            # Intentionally recompute last stat, as we may have computed
-            # that the last time when the day was not over yet.
-            upto_date = start_date
-            while upto_date <= to_date:
-                self.track_lifetime_upto(qs, upto_date)
-                upto_date += timedelta(days=1)
-        elif self.period == Period.DAY:
-            values_fields = ["ts_date"] + self.get_track_values()
-            connection = connections[qs.db]
-            tzname = timezone.get_current_timezone_name() if settings.USE_TZ else None
-
-            is_datetime = isinstance(
-                qs.model._meta.get_field(self.date_field), models.DateTimeField
-            )
-            if is_datetime:
-                if django.VERSION[:2] >= (4, 1):
-                    date_sql = connection.ops.datetime_cast_date_sql(
-                        self.date_field, (), tzname
-                    )
+            return max(to_date, today)
+        days = self.period // Period.DAY
+        return max(to_date, min(to_date + timedelta(days=days - 1), today))
+
+    def get_window_statistics(self, metric, from_date, to_date):
+        return self.get_statistics().narrow(
+            from_date=from_date, to_date=to_date, **self.get_most_recent_kwargs(metric)
+        )
+
+    def retrack_run(self, qs, from_date, to_date):
+        end_date = self.get_window_end(to_date)
+        self.run.from_date = from_date
+        self.run.to_date = end_date
+        self.window_records = []
+        try:
+            self.track_window(qs, from_date, end_date)
+            records = self.window_records
+        finally:
+            self.window_records = None
+        date_field = self.statistic_model._meta.get_field("date")
+        with self.run.phase("write"):
+            for metric in self.get_metrics():
+                result = self.get_window_statistics(
+                    metric, from_date, end_date
+                ).replace(
+                    dict(period=self.period, **kwargs)
+                    for kwargs in records
+                    if kwargs["metric"] == metric
+                    and from_date <= date_field.to_python(kwargs["date"]) <= end_date
+                )
+                self.run.rows_written += (
+                    result["created"] + result["updated"] + result["deleted"]
+                )
+                self.run.rows_unchanged += result["unchanged"]
+
+    def get_gaps(self, from_date, to_date):
+        """The ranges of days lacking statistics for any of the metrics."""
+        self.check_window_supported()
+        dates = set()
+        for metric in self.get_metrics():
+            for first, last in self.get_window_statistics(
+                metric, from_date, to_date
+            ).find_gaps(from_date, to_date):
+                dates.update(
+                    first + timedelta(days=i) for i in range((last - first).days + 1)
+                )
+        return date_ranges(sorted(dates))
+
+    def execute(self, qs, run_func, advance=True):
+        """Runs ``run_func(qs)``, holding the checkpoints. Unless
+        ``advance`` is false, these are moved forward to the date up to
+        which the run tracked.
+        """
+        if self.using:
+            qs = qs.using(self.using)
+        qs = self.filter_source(qs)
+        self.run = TrackerRun(self, using=[qs.db, self.get_stats_db()])
+        with self.run:
+            with self.run.phase("start_date"):
+                if self.use_checkpoint:
+                    self.checkpoints = self.acquire_checkpoints(qs)
+            try:
+                # Marks the metrics as changed once, after writing.
+                with deferred_touch():
+                    run_func(qs)
+            except Exception:
+                for checkpoint in self.checkpoints:
+                    checkpoint.fail()
+                raise
+            for checkpoint in self.checkpoints:
+                checkpoint.complete(
+                    self.run.to_date if advance else checkpoint.high_water_mark
+                )
+
+    def get_day_values(self, qs, start_date, extra_values=(), end_date=None):
+        """Returns ``qs`` grouped by day (``ts_date``), starting at
+        ``start_date`` (up to including ``end_date``, if given), ready to
+        be annotated with the aggregates.
+        """
+        values_fields = ["ts_date"] + self.get_track_values() + list(extra_values)
+        connection = connections[qs.db]
+        tzname = timezone.get_current_timezone_name() if settings.USE_TZ else None
+
+        is_datetime = isinstance(
+            qs.model._meta.get_field(self.date_field), models.DateTimeField
+        )
+        if is_datetime:
+            if django.VERSION[:2] >= (4, 1):
+                date_sql = connection.ops.datetime_cast_date_sql(
+                    self.date_field, (), tzname
+                )
+                vals = qs.extra(
+                    select={"ts_date": date_sql[0]}, select_params=date_sql[1]
+                )
+            else:
+                date_sql = connection.ops.datetime_cast_date_sql(
+                    self.date_field, tzname
+                )
+                # before django 2.0 it returns a tuple
+                if isinstance(date_sql, tuple):
                     vals = qs.extra(
                         select={"ts_date": date_sql[0]}, select_params=date_sql[1]
                     )
                 else:
-                    date_sql = connection.ops.datetime_cast_date_sql(
-                        self.date_field, tzname
-                    )
-                    # before django 2.0 it returns a tuple
-                    if isinstance(date_sql, tuple):
-                        vals = qs.extra(
-                            select={"ts_date": date_sql[0]}, select_params=date_sql[1]
-                        )
-                    else:
-                        vals = qs.extra(select={"ts_date": date_sql})
-                start_dt = datetime.combine(start_date, time()) - timedelta(days=1)
+                    vals = qs.extra(select={"ts_date": date_sql})
+            start_dt = datetime.combine(start_date, time()) - timedelta(days=1)
+            if tzname:
+                start_dt = timezone.make_aware(
+                    start_dt, timezone.get_current_timezone()
+                )
+            if end_date:
+                end_dt = datetime.combine(end_date + timedelta(days=1), time())
                 if tzname:
-                    start_dt = timezone.make_aware(
-                        start_dt, timezone.get_current_timezone()
+                    end_dt = timezone.make_aware(
+                        end_dt, timezone.get_current_timezone()
                     )
-            else:
-                vals = qs.extra(select={"ts_date": self.date_field})
-                start_dt = start_date
-            vals = (
-                vals.filter(**{self.date_field + "__gte": start_dt})
-                .values(*values_fields)
-                .order_by()
-                .annotate(ts_n=self.aggr_op)
-            )
-            # TODO: Bulk create
-            for val in vals:
-                self.statistic_model.objects.record(
-                    metric=self.metric,
-                    value=val["ts_n"],
-                    date=val["ts_date"],
-                    period=self.period,
-                    **self.get_record_kwargs(val)
-                )
+                vals = vals.filter(**{self.date_field + "__lt": end_dt})
+        else:
+            vals = qs.extra(select={"ts_date": self.date_field})
+            start_dt = start_date
+            if end_date:
+                vals = vals.filter(**{self.date_field + "__lte": end_date})
+        return (
+            vals.filter(**{self.date_field + "__gte": start_dt})
+            .values(*values_fields)
+            .order_by()
+        )
+
+    def track_run(self, qs):
+        to_date = date.today()
+        self.run.to_date = to_date
+        with self.run.phase("start_date"):
+            start_date = self.get_start_date(qs)
+        if not start_date:
+            return
+        self.run.from_date = start_date
+        # Intentionally recompute last stat, as we may have computed that
+        # the last time when the day was not over yet.
+        self.track_window(qs, start_date)
+
+    def track_window(self, qs, from_date, to_date=None):
+        """Tracks the days from ``from_date`` up to including ``to_date``
+        (defaulting to the date the run tracks up to).
+        """
+        if self.period == Period.DAY:
+            self.track_days(qs, from_date, to_date)
         else:
-            raise NotImplementedError
+            # Lifetime, or rolling periods.
+            upto_date = from_date
+            while upto_date <= (to_date or self.run.to_date):
+                self.track_lifetime_upto(qs, upto_date)
+                upto_date += timedelta(days=1)
+
+    def track_days(self, qs, start_date, end_date=None):
+        if self.can_track_in_database(qs):
+            annotations = self.get_insert_annotations()
+            vals = self.get_day_values(
+                qs.annotate(**annotations),
+                start_date,
+                extra_values=list(annotations),
+                end_date=end_date,
+            ).annotate(**self.get_aggregates())
+            with self.run.phase("write"):
+                self.write_in_database(vals)
+            return
+        vals = self.get_day_values(qs, start_date, end_date=end_date).annotate(
+            **self.get_aggregates()
+        )
+        with self.run.phase("aggregate"):
+            vals = list(vals)
+            self.run.rows_read += len(vals)
+        with self.run.phase("write"):
+            self.write(
+                record
+                for val in vals
+                for record in self.get_records(val, val["ts_date"])
+            )
 
 
 class ObjectsByDateAndObjectTracker(ObjectsByDateTracker):
@@ -126,47 +659,128 @@ class ObjectsByDateAndObjectTracker(ObjectsByDateTracker):
     object_model = None
     object_field = None
     statistic_model = StatisticByDateAndObject
+    # To split the work over separate workers, track only the objects whose
+    # ID modulo ``shards`` equals ``shard``.
+    shards = None
+    shard = None
 
     def __init__(self, **kwargs):
         super(ObjectsByDateAndObjectTracker, self).__init__(**kwargs)
         assert self.object is None or self.object_field is None
         assert self.object or self.object_field
+        assert (self.shards is None) == (self.shard is None)
+        assert self.shards is None or (
+            self.object_model and 0 <= self.shard < self.shards
+        )
+
+    def __str__(self):
+        ret = super(ObjectsByDateAndObjectTracker, self).__str__()
+        if self.shards:
+            ret += "[{}/{}]".format(self.shard, self.shards)
+        return ret
+
+    def filter_shard(self, qs, field):
+        return qs.annotate(
+            ts_shard=Mod(models.F(field), models.Value(self.shards))
+        ).filter(ts_shard=self.shard)
+
+    def filter_source(self, qs):
+        if self.shards:
+            qs = self.filter_shard(qs, self.object_field)
+        return qs
+
+    def get_window_statistics(self, metric, from_date, to_date):
+        stats = super(ObjectsByDateAndObjectTracker, self).get_window_statistics(
+            metric, from_date, to_date
+        )
+        if self.shards:
+            stats = self.filter_shard(stats, "object_id")
+        return stats
+
+    def get_most_recent(self, metric):
+        if not self.shards:
+            return super(ObjectsByDateAndObjectTracker, self).get_most_recent(metric)
+        stats = self.get_statistics().narrow(**self.get_most_recent_kwargs(metric))
+        return self.filter_shard(stats, "object_id").order_by("-date").first()
 
-    def get_most_recent_kwargs(self):
-        kwargs = super(ObjectsByDateAndObjectTracker, self).get_most_recent_kwargs()
+    def get_most_recent_kwargs(self, metric):
+        kwargs = super(ObjectsByDateAndObjectTracker, self).get_most_recent_kwargs(
+            metric
+        )
         if self.object_model:
-            kwargs["object_type"] = ContentType.objects.get_for_model(self.object_model)
+            kwargs["object_type"] = self.get_content_type(self.object_model)
         else:
             kwargs["object"] = self.object
         return kwargs
 
-    def track_lifetime_upto(self, qs, upto_date):
-        filter_kwargs = {self.date_field + "__date__lte": upto_date}
+    def get_empty_record_kwargs(self):
         if self.object_model:
+            return None
+        return {"object": self.object}
+
+    def get_checkpoint_kwargs(self, qs, metric):
+        kwargs = super(ObjectsByDateAndObjectTracker, self).get_checkpoint_kwargs(
+            qs, metric
+        )
+        if self.object_model:
+            kwargs["object_type"] = self.get_content_type(self.object_model)
+        else:
+            kwargs["object_type"] = self.get_content_type(self.object)
+            kwargs["object_id"] = self.object.pk
+        if self.shards:
+            kwargs["source"] += ".shard{}/{}".format(self.shard, self.shards)
+        return kwargs
+
+    def track_lifetime_upto(self, qs, upto_date):
+        if not self.object_model:
+            return super(ObjectsByDateAndObjectTracker, self).track_lifetime_upto(
+                qs, upto_date
+            )
+        filter_kwargs = self.get_upto_filter_kwargs(upto_date)
+        if self.can_track_in_database(qs):
+            annotations = self.get_insert_annotations()
             vals = (
+                qs.filter(**filter_kwargs)
+                .annotate(**annotations)
+                .values(*annotations)
+                .order_by()
+                .annotate(**self.get_aggregates())
+            )
+            with self.run.phase("write"):
+                self.write_in_database(vals, upto_date)
+            return
+        with self.run.phase("aggregate"):
+            vals = list(
                 qs.filter(**filter_kwargs)
                 .values(self.object_field)
-                .annotate(ts_n=self.aggr_op)
+                .order_by()
+                .annotate(**self.get_aggregates())
             )
-            for val in vals:
-                object = self.object_model(pk=val[self.object_field])
-                # TODO: Bulk create
-                StatisticByDateAndObject.objects.record(
-                    metric=self.metric,
-                    value=val["ts_n"],
-                    date=upto_date,
-                    object=object,
-                    period=self.period,
-                )
-        else:
-            n = qs.filter(**filter_kwargs).count()
-            StatisticByDateAndObject.objects.record(
-                metric=self.metric,
-                value=n,
-                object=self.object,
-                period=self.period,
-                date=upto_date,
+            self.run.rows_read += len(vals)
+        with self.run.phase("write"):
+            self.write(
+                record for val in vals for record in self.get_records(val, upto_date)
+            )
+
+    def get_insert_annotations(self):
+        ret = super(ObjectsByDateAndObjectTracker, self).get_insert_annotations()
+        if self.object_model:
+            ret["ts_object_id"] = models.F(self.object_field)
+        return ret
+
+    def get_insert_columns(self, metric, date=None):
+        ret = super(ObjectsByDateAndObjectTracker, self).get_insert_columns(
+            metric, date
+        )
+        if self.object_model:
+            ret["object_type"] = models.Value(
+                self.get_content_type(self.object_model).pk
             )
+            ret["object_id"] = "ts_object_id"
+        else:
+            ret["object_type"] = models.Value(self.get_content_type(self.object).pk)
+            ret["object_id"] = models.Value(self.object.pk)
+        return ret
 
     def get_track_values(self):
         ret = super(ObjectsByDateAndObjectTracker, self).get_track_values()
@@ -182,9 +796,561 @@ class ObjectsByDateAndObjectTracker(ObjectsByDateTracker):
         return {"object": object}
 
 
+class ObjectsByDateAndDimensionTracker(ObjectsByDateTracker):
+    """Tracks statistics grouped by date and the value of a plain source
+    field (``dimension_field``), e.g. a country or a plan.
+    """
+
+    dimension_field = None
+    statistic_model = StatisticByDateAndDimension
+
+    def __init__(self, **kwargs):
+        super(ObjectsByDateAndDimensionTracker, self).__init__(**kwargs)
+        assert self.dimension_field
+
+    def get_empty_record_kwargs(self):
+        return None
+
+    def get_checkpoint_kwargs(self, qs, metric):
+        kwargs = super(ObjectsByDateAndDimensionTracker, self).get_checkpoint_kwargs(
+            qs, metric
+        )
+        kwargs["source"] += "." + self.dimension_field
+        return kwargs
+
+    def track_lifetime_upto(self, qs, upto_date):
+        filter_kwargs = self.get_upto_filter_kwargs(upto_date)
+        with self.run.phase("aggregate"):
+            vals = list(
+                qs.filter(**filter_kwargs)
+                .values(self.dimension_field)
+                .order_by()
+                .annotate(**self.get_aggregates())
+            )
+            self.run.rows_read += len(vals)
+        with self.run.phase("write"):
+            self.write(
+                record for val in vals for record in self.get_records(val, upto_date)
+            )
+
+    def can_track_in_database(self, qs):
+        # The dimension values are to be interned, see ``bulk_record()``.
+        return False
+
+    def get_track_values(self):
+        ret = super(ObjectsByDateAndDimensionTracker, self).get_track_values()
+        ret.append(self.dimension_field)
+        return ret
+
+    def get_record_kwargs(self, val):
+        return {"dimension": val[self.dimension_field]}
+
+
 class CountObjectsByDateTracker(ObjectsByDateTracker):
     aggr_op = models.Count("pk", distinct=True)
 
 
 class CountObjectsByDateAndObjectTracker(ObjectsByDateAndObjectTracker):
     aggr_op = models.Count("pk", distinct=True)
+
+
+class CountObjectsByDateAndDimensionTracker(ObjectsByDateAndDimensionTracker):
+    aggr_op = models.Count("pk", distinct=True)
+
+
+class RollupTracker(ObjectsByDateTracker):
+    """Derives statistics by date from those of another metric by object
+    (``source_metric``, of the same period), e.g. the total number of orders
+    from the number of orders per shop, by grouping the statistics by date
+    instead of aggregating the (raw) source once more. Track the
+    statistics by object first, then roll them up::
+
+        RollupTracker(
+            period=Period.DAY,
+            metric=Metric.objects.SHOPPING_ORDER_COUNT,
+            source_metric=Metric.objects.SHOPPING_SHOP_ORDER_COUNT,
+        ).track(StatisticByDateAndObject.objects.all())
+
+    The values are summed up, see ``MaxRollupTracker`` and
+    ``CountRollupTracker`` for alternatives.
+    """
+
+    aggr_op = models.Sum("value")
+    source_metric = None
+
+    def __init__(self, **kwargs):
+        super(RollupTracker, self).__init__(**kwargs)
+        assert self.source_metric
+
+    def filter_source(self, qs):
+        return (
+            super(RollupTracker, self)
+            .filter_source(qs)
+            .filter(metric=self.source_metric, period=self.period)
+        )
+
+    def get_dependencies(self):
+        return [(self.source_metric, self.period)]
+
+    def track_window(self, qs, from_date, to_date=None):
+        # The source statistics cover the period already, whichever it is.
+        self.track_days(qs, from_date, to_date)
+
+
+class MaxRollupTracker(RollupTracker):
+    aggr_op = models.Max("value")
+
+
+class CountRollupTracker(RollupTracker):
+    """Counts the objects having a positive value, e.g. the number of
+    shops with orders.
+    """
+
+    aggr_op = models.Count("pk", filter=models.Q(value__gt=0))
+
+
+class DerivedMetricTracker(ObjectsByDateTracker):
+    """Derives a metric from the statistics by date of other metrics (of
+    the same period), by means of an expression evaluated by the database
+    over the sums of their values per date (zero for metrics lacking a
+    statistic of the date). ``inputs`` maps the names the
+    expression refers to to the metrics, e.g. the conversion rate::
+
+        DerivedMetricTracker(
+            period=Period.DAY,
+            metric=Metric.objects.SHOPPING_CONVERSION_RATE,
+            inputs={
+                "orders": Metric.objects.SHOPPING_ORDER_COUNT,
+                "visits": Metric.objects.SHOPPING_VISIT_COUNT,
+            },
+            expression=F("orders") * 10000 / NullIf(F("visits"), 0),
+        ).track(StatisticByDate.objects.all())
+
+    As values are integers, the expression is rounded: scale ratios (here,
+    to basis points) as needed. Where the expression is undefined (NULL),
+    no data is recorded to be available. Track the input metrics first, see
+    ``trackstats.scheduler``.
+    """
+
+    inputs = None
+    expression = None
+
+    def __init__(self, **kwargs):
+        super(DerivedMetricTracker, self).__init__(**kwargs)
+        assert self.inputs and self.expression is not None
+
+    def get_aggregates(self):
+        # As floats, for the expression not to be evaluated using integer
+        # division (and to be rounded, rather than truncated).
+        ret = {
+            name: Cast(
+                Coalesce(models.Sum("value", filter=models.Q(metric=metric)), 0),
+                models.FloatField(),
+            )
+            for name, metric in self.inputs.items()
+        }
+        ret["ts_n"] = Cast(Round(self.expression), models.BigIntegerField())
+        return ret
+
+    def filter_source(self, qs):
+        return (
+            super(DerivedMetricTracker, self)
+            .filter_source(qs)
+            .filter(metric__in=list(self.inputs.values()), period=self.period)
+        )
+
+    def get_dependencies(self):
+        return [(metric, self.period) for metric in self.inputs.values()]
+
+    def track_window(self, qs, from_date, to_date=None):
+        # The input statistics cover the period already, whichever it is.
+        self.track_days(qs, from_date, to_date)
+
+
+class MultiMetricTrackerMixin(object):
+    """Tracks several metrics from the same queryset in a single pass, by
+    means of one query computing all of their aggregates. ``metrics``
+    maps each metric to its aggregate expression.
+    """
+
+    metrics = None
+
+    def get_metrics(self):
+        return list(self.metrics.keys())
+
+    def get_aggregates(self):
+        return {
+            "ts_{}".format(i): aggr_op
+            for i, aggr_op in enumerate(self.metrics.values())
+        }
+
+    def get_insert_columns(self, metric, date=None):
+        ret = super(MultiMetricTrackerMixin, self).get_insert_columns(metric, date)
+        ret["value"] = "ts_{}".format(self.get_metrics().index(metric))
+        return ret
+
+    def get_records(self, val, date):
+        record_kwargs = self.get_record_kwargs(val)
+        return [
+            dict(
+                metric=metric, value=val["ts_{}".format(i)], date=date, **record_kwargs
+            )
+            for i, metric in enumerate(self.get_metrics())
+        ]
+
+
+class MultiMetricByDateTracker(MultiMetricTrackerMixin, ObjectsByDateTracker):
+    pass
+
+
+class MultiMetricByDateAndObjectTracker(
+    MultiMetricTrackerMixin, ObjectsByDateAndObjectTracker
+):
+    pass
+
+
+class MultiMetricByDateAndDimensionTracker(
+    MultiMetricTrackerMixin, ObjectsByDateAndDimensionTracker
+):
+    pass
+
+
+class MultiTimezoneTrackerMixin(object):
+    """Tracks the daily statistics for several timezones at once, e.g. for
+    regions each having their own notion of a day. ``timezones`` maps
+    each timezone (name) to the metric to track its days into.
+
+    The source is scanned once, grouping by the dates in all timezones
+    together, after which the groups are summed up per timezone. Hence,
+    the aggregate has to be additive (see ``is_additive()``).
+    """
+
+    aggr_op = models.Count("pk")
+    period = Period.DAY
+    timezones = None
+
+    def __init__(self, **kwargs):
+        super(MultiTimezoneTrackerMixin, self).__init__(**kwargs)
+        assert self.timezones
+        assert self.period == Period.DAY
+        assert is_additive(
+            self.aggr_op
+        ), "Only additive aggregates can be tracked for several timezones"
+
+    def get_metrics(self):
+        return list(self.timezones.values())
+
+    def get_start_date(self, qs):
+        start_date = super(MultiTimezoneTrackerMixin, self).get_start_date(qs)
+        # The day (of the current timezone) to start from may have started
+        # earlier elsewhere.
+        return start_date and start_date - timedelta(days=1)
+
+    def track_days(self, qs, start_date, end_date=None):
+        assert isinstance(
+            qs.model._meta.get_field(self.date_field), models.DateTimeField
+        )
+        # Whatever the timezones, their days are within a day of UTC ones.
+        filter_kwargs = {
+            self.date_field
+            + "__gte": datetime.combine(
+                start_date - timedelta(days=1), time(), tzinfo=dt_timezone.utc
+            )
+        }
+        if end_date:
+            filter_kwargs[self.date_field + "__lt"] = datetime.combine(
+                end_date + timedelta(days=2), time(), tzinfo=dt_timezone.utc
+            )
+        dates = {
+            "ts_date_{}".format(i): TruncDate(
+                self.date_field, tzinfo=pytz.timezone(name)
+            )
+            for i, name in enumerate(self.timezones)
+        }
+        track_values = self.get_track_values()
+        vals = (
+            qs.filter(**filter_kwargs)
+            .annotate(**dates)
+            .values(*(list(dates) + track_values))
+            .order_by()
+            .annotate(**self.get_aggregates())
+        )
+        totals = {}
+        with self.run.phase("aggregate"):
+            for val in vals:
+                self.run.rows_read += 1
+                for i, metric in enumerate(self.get_metrics()):
+                    day = val["ts_date_{}".format(i)]
+                    if day < start_date or (end_date and day > end_date):
+                        # Partially covered.
+                        continue
+                    key = (metric, day) + tuple(val[f] for f in track_values)
+                    if key in totals:
+                        totals[key][1] += val["ts_n"] or 0
+                    else:
+                        totals[key] = [val, val["ts_n"] or 0]
+        with self.run.phase("write"):
+            self.write(
+                dict(
+                    metric=key[0],
+                    value=value,
+                    date=key[1],
+                    **self.get_record_kwargs(val)
+                )
+                for key, (val, value) in totals.items()
+            )
+
+
+class MultiTimezoneByDateTracker(MultiTimezoneTrackerMixin, ObjectsByDateTracker):
+    pass
+
+
+class MultiTimezoneByDateAndObjectTracker(
+    MultiTimezoneTrackerMixin, ObjectsByDateAndObjectTracker
+):
+    pass
+
+
+class DistributionTrackerMixin(object):
+    """Tracks the daily distribution of the values of a numeric source
+    field (``value_field``), e.g. order amounts or response times, as
+    mergeable histograms (see ``trackstats.sketches.Histogram``).
+
+    The histograms are built by the database: values are grouped by day
+    and bucket, so that no individual values are fetched.
+    """
+
+    value_field = None
+    relative_accuracy = DEFAULT_RELATIVE_ACCURACY
+
+    def get_empty_record_kwargs(self):
+        kwargs = super(DistributionTrackerMixin, self).get_empty_record_kwargs()
+        if kwargs is None:
+            return None
+        # An empty histogram, rather than NULL.
+        return dict(kwargs, value=Histogram(relative_accuracy=self.relative_accuracy))
+
+    def get_aggregates(self):
+        return {
+            "ts_count": models.Count(self.value_field),
+            "ts_sum": models.Sum(self.value_field),
+            "ts_min": models.Min(self.value_field),
+            "ts_max": models.Max(self.value_field),
+        }
+
+    def get_bucket_annotations(self):
+        gamma = Histogram(self.relative_accuracy).gamma
+        value = models.F(self.value_field)
+        return {
+            "ts_sign": Sign(value),
+            "ts_bucket": models.Case(
+                models.When(**{self.value_field: 0, "then": models.Value(0)}),
+                default=Ceil(
+                    Ln(Abs(value)) / models.Value(math.log(gamma)),
+                    output_field=models.FloatField(),
+                ),
+                output_field=models.FloatField(),
+            ),
+        }
+
+    def get_records(self, val, date):
+        return [
+            dict(
+                metric=self.metric,
+                value=val["ts_histogram"],
+                date=date,
+                **self.get_record_kwargs(val)
+            )
+        ]
+
+    def get_histograms(self, summaries, buckets, key_fields):
+        """Builds the histograms from the ``summaries`` (aggregates) and
+        ``buckets`` (counts by bucket) of the values, grouped by
+        ``key_fields``. Returns the summaries, along with their histogram
+        (``ts_histogram``).
+        """
+        vals = {}
+        for val in summaries:
+            if not val["ts_count"]:
+                # No values at all.
+                continue
+            key = tuple(val[f] for f in key_fields)
+            val["ts_histogram"] = Histogram(self.relative_accuracy)
+            val["ts_histogram"].add_summary(
+                val["ts_count"],
+                float(val["ts_sum"]),
+                float(val["ts_min"]),
+                float(val["ts_max"]),
+            )
+            vals[key] = val
+        for val in buckets:
+            key = tuple(val[f] for f in key_fields)
+            vals[key]["ts_histogram"].add_bucket(
+                int(val["ts_sign"]), int(val["ts_bucket"]), val["ts_n"]
+            )
+            self.run.rows_read += 1
+        return vals.values()
+
+    def track_lifetime_upto(self, qs, upto_date):
+        qs = qs.filter(
+            **dict(
+                self.get_upto_filter_kwargs(upto_date),
+                **{self.value_field + "__isnull": False}
+            )
+        )
+        track_values = self.get_track_values()
+        buckets = (
+            qs.annotate(**self.get_bucket_annotations())
+            .values(*track_values + ["ts_sign", "ts_bucket"])
+            .order_by()
+            .annotate(ts_n=models.Count("pk"))
+        )
+        if track_values:
+            summaries = (
+                qs.values(*track_values).order_by().annotate(**self.get_aggregates())
+            )
+        else:
+            summaries = [qs.aggregate(**self.get_aggregates())]
+        with self.run.phase("aggregate"):
+            vals = list(self.get_histograms(summaries, buckets, track_values))
+        with self.run.phase("write"):
+            self.write(
+                record for val in vals for record in self.get_records(val, upto_date)
+            )
+
+    def track_days(self, qs, start_date, end_date=None):
+        qs = qs.filter(**{self.value_field + "__isnull": False})
+        track_values = self.get_track_values()
+        buckets = (
+            self.get_day_values(
+                qs.annotate(**self.get_bucket_annotations()),
+                start_date,
+                extra_values=["ts_sign", "ts_bucket"],
+                end_date=end_date,
+            )
+            .annotate(ts_n=models.Count("pk"))
+            .order_by()
+        )
+        summaries = self.get_day_values(qs, start_date, end_date=end_date).annotate(
+            **self.get_aggregates()
+        )
+        with self.run.phase("aggregate"):
+            vals = list(
+                self.get_histograms(summaries, buckets, ["ts_date"] + track_values)
+            )
+        with self.run.phase("write"):
+            self.write(
+                record
+                for val in vals
+                for record in self.get_records(val, val["ts_date"])
+            )
+
+
+class DistributionByDateTracker(DistributionTrackerMixin, ObjectsByDateTracker):
+    statistic_model = DistributionByDate
+
+
+class DistributionByDateAndObjectTracker(
+    DistributionTrackerMixin, ObjectsByDateAndObjectTracker
+):
+    statistic_model = DistributionByDateAndObject
+
+
+class EventTrackerMixin(object):
+    """Aggregates the events (see ``Event``) of the metric logged since
+    the previous run into the daily statistics. The last event aggregated
+    is kept in the checkpoint, and the new aggregates are added to the
+    statistics, so these have to be additive (e.g. counts or sums of
+    amounts). This allows for pruning events once aggregated.
+
+    Transactions logging events are assumed to take less than the
+    ``settle_lag``, and the clocks of the processes logging events (which
+    set ``logged_at``) and of the tracker to be off by less than it as
+    well. This is not verified: events committing later than that are
+    behind the checkpoint, and never aggregated.
+    """
+
+    date_field = "timestamp"
+    aggr_op = models.Count("pk")
+    period = Period.DAY
+    incremental = True
+    # Delete the events once aggregated.
+    prune = False
+    # Events are picked up by ID, but become visible in the order their
+    # transactions commit. Only aggregate up to the last event logged this
+    # long ago, by which time those of lower IDs are assumed to have been
+    # committed (or rolled back).
+    settle_lag = timedelta(minutes=5)
+
+    def __init__(self, **kwargs):
+        super(EventTrackerMixin, self).__init__(**kwargs)
+        assert self.period == Period.DAY
+        assert self.use_checkpoint
+
+    def filter_source(self, qs):
+        return (
+            super(EventTrackerMixin, self).filter_source(qs).filter(metric=self.metric)
+        )
+
+    def check_window_supported(self):
+        raise TrackerNotSupported(
+            "{} aggregates events once, incrementally, and cannot re-track"
+            " (or backfill) windows of dates".format(self)
+        )
+
+    def track_window(self, qs, from_date, to_date=None):
+        self.check_window_supported()
+
+    def track_run(self, qs):
+        self.run.to_date = date.today()
+        (checkpoint,) = self.checkpoints
+        new = qs.filter(pk__gt=checkpoint.last_event_id or 0)
+        with self.run.phase("start_date"):
+            bounds = new.aggregate(
+                ts_last=models.Max(
+                    "pk",
+                    filter=models.Q(logged_at__lte=timezone.now() - self.settle_lag),
+                ),
+                ts_first=models.Min(self.date_field),
+            )
+        if bounds["ts_last"] is None:
+            return
+        start_date = self.to_date(bounds["ts_first"])
+        self.run.from_date = start_date
+        events = new.filter(pk__lte=bounds["ts_last"])
+        vals = self.get_day_values(events, start_date).annotate(**self.get_aggregates())
+        with self.run.phase("aggregate"):
+            vals = list(vals)
+            self.run.rows_read += len(vals)
+        # Exactly once: the statistics and the checkpoint go together, as
+        # do the events pruned (just those aggregated).
+        with transaction.atomic(using=self.get_stats_db()):
+            with transaction.atomic(using=events.db):
+                with self.run.phase("write"):
+                    self.write(
+                        record
+                        for val in vals
+                        for record in self.get_records(val, val["ts_date"])
+                    )
+                    checkpoint.last_event_id = bounds["ts_last"]
+                    checkpoint.save(update_fields=["last_event_id"])
+                if self.prune:
+                    with self.run.phase("prune"):
+                        events.delete()
+
+
+class EventsByDateTracker(EventTrackerMixin, ObjectsByDateTracker):
+    pass
+
+
+class EventsByDateAndObjectTracker(EventTrackerMixin, ObjectsByDateAndObjectTracker):
+    """Aggregates the events of the metric per object, for objects of type
+    ``object_model``.
+    """
+
+    object_field = "object_id"
+
+    def filter_source(self, qs):
+        return super(EventsByDateAndObjectTracker, self).filter_source(
+            qs.filter(object_type=self.get_content_type(self.object_model))
+        )
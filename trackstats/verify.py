@@ -0,0 +1,265 @@
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.db import models
+from django.db.models.functions import ExtractDay, TruncMonth, TruncWeek
+
+from .models import Period, date_ranges
+from .trackers import (
+    DistributionTrackerMixin,
+    EventTrackerMixin,
+    MultiTimezoneTrackerMixin,
+    ObjectsByDateAndDimensionTracker,
+    ObjectsByDateAndObjectTracker,
+    TrackerNotSupported,
+    is_additive,
+)
+
+
+WINDOWS = {"week": TruncWeek, "month": TruncMonth}
+
+
+class Discrepancy(object):
+    def __init__(self, key, expected, actual):
+        # The field values identifying the statistic, see
+        # ``get_record_key()``.
+        self.key = key
+        self.expected = expected
+        self.actual = actual
+
+    @property
+    def date(self):
+        return self.key["date"]
+
+    @property
+    def metric_id(self):
+        return self.key["metric"]
+
+    @property
+    def object_id(self):
+        return self.key.get("object_id")
+
+    def __str__(self):
+        ret = "{}: metric {}".format(self.date.isoformat(), self.metric_id)
+        if self.object_id is not None:
+            ret += ", object {}".format(self.object_id)
+        return ret + ": expected {}, found {}".format(self.expected, self.actual)
+
+
+class VerifyResult(object):
+    def __init__(self):
+        self.windows = 0
+        # The ``(metric, first, last)`` windows of which the fingerprints
+        # did not match.
+        self.mismatches = []
+        self.discrepancies = []
+        self.retracked = []
+
+
+def check_supported(tracker):
+    if (
+        tracker.period != Period.DAY
+        or isinstance(
+            tracker,
+            (
+                DistributionTrackerMixin,
+                EventTrackerMixin,
+                MultiTimezoneTrackerMixin,
+                ObjectsByDateAndDimensionTracker,
+            ),
+        )
+        or (
+            isinstance(tracker, ObjectsByDateAndObjectTracker)
+            and not tracker.object_model
+        )
+        or not all(
+            is_additive(aggr_op) for aggr_op in tracker.get_aggregates().values()
+        )
+        # E.g. compact statistics, which cannot be summed up by window.
+        or not tracker.get_statistics().all().supports_windows
+    ):
+        raise TrackerNotSupported(
+            "Only daily statistics of additive aggregates can be verified"
+        )
+
+
+def counts_rows(aggr_op):
+    """Whether the aggregate merely counts the rows (and not the values of
+    an expression, which may be null).
+    """
+    if not isinstance(aggr_op, models.Count):
+        return False
+    expression = aggr_op.get_source_expressions()[0]
+    return isinstance(expression, models.expressions.Star) or (
+        getattr(expression, "name", None) == "pk"
+    )
+
+
+def get_weights(tracker, date_field, object_field):
+    """The expressions the values are weighted by in the fingerprints, so
+    that values moved between days (or objects) are noticed as well.
+    """
+    ret = {"day": ExtractDay(date_field)}
+    if isinstance(tracker, ObjectsByDateAndObjectTracker):
+        ret["object"] = models.F(object_field)
+    return ret
+
+
+def get_source_fingerprints(tracker, qs, from_date, to_date, window):
+    """The fingerprints of the source, per window, as a dict keyed by
+    ``(metric ID, window)``.
+    """
+    field = qs.model._meta.get_field(tracker.date_field)
+    lookup = tracker.date_field
+    if isinstance(field, models.DateTimeField):
+        lookup += "__date"
+    if from_date:
+        qs = qs.filter(**{lookup + "__gte": from_date})
+    qs = qs.filter(**{lookup + "__lte": to_date})
+    weights = get_weights(
+        tracker, tracker.date_field, getattr(tracker, "object_field", None)
+    )
+    annotations = {}
+    names = {}
+    for i, (name, aggr_op) in enumerate(tracker.get_aggregates().items()):
+        names[name] = tracker.get_metrics()[i]
+        annotations[name] = aggr_op
+        if counts_rows(aggr_op):
+            # The weighted sum of the values, per day, is that of the rows.
+            for weight_name, weight in weights.items():
+                annotations["{}_{}".format(name, weight_name)] = models.Sum(
+                    weight,
+                    filter=aggr_op.filter,
+                    output_field=models.BigIntegerField(),
+                )
+    vals = (
+        qs.annotate(
+            ts_window=WINDOWS[window](
+                tracker.date_field, output_field=models.DateField()
+            )
+        )
+        .values("ts_window")
+        .order_by()
+        .annotate(**annotations)
+    )
+    ret = {}
+    for val in vals:
+        window_start = models.DateField().to_python(val["ts_window"])
+        for name, metric in names.items():
+            ret[(metric.pk, window_start)] = tuple(
+                val.get("{}_{}".format(name, weight_name)) or 0
+                for weight_name in weights
+                if "{}_{}".format(name, weight_name) in val
+            ) + (val[name] or 0,)
+    return ret
+
+
+def get_statistic_fingerprints(tracker, metric, from_date, to_date, window, weighted):
+    weights = get_weights(tracker, "date", "object_id") if weighted else {}
+    annotations = {
+        "ts_{}".format(name): models.Sum(
+            models.F("value") * weight, output_field=models.BigIntegerField()
+        )
+        for name, weight in weights.items()
+    }
+    annotations["ts_value"] = models.Sum("value")
+    vals = (
+        tracker.get_window_statistics(metric, from_date, to_date)
+        .annotate(ts_window=WINDOWS[window]("date"))
+        .values("ts_window")
+        .order_by()
+        .annotate(**annotations)
+    )
+    return {
+        (metric.pk, models.DateField().to_python(val["ts_window"])): tuple(
+            val[name] or 0 for name in annotations
+        )
+        for val in vals
+    }
+
+
+def get_window_end(window_start, window):
+    if window == "week":
+        return window_start + timedelta(days=6)
+    next_month = (window_start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return next_month - timedelta(days=1)
+
+
+def drill_down(tracker, qs, metrics, first, last):
+    """Compares the statistics of the given metrics, from ``first`` up to
+    including ``last``, with those computed from the source, returning
+    the discrepancies.
+    """
+    statistics = tracker.get_statistics()
+    names = list(statistics.model._meta.unique_together[0])
+    attnames = [statistics.model._meta.get_field(name).attname for name in names]
+    date_field = statistics.model._meta.get_field("date")
+    expected = {}
+    vals = tracker.get_day_values(qs, first, end_date=last).annotate(
+        **tracker.get_aggregates()
+    )
+    for val in vals:
+        for record in tracker.get_records(val, val["ts_date"]):
+            record = dict(record, period=tracker.period)
+            value = record.pop("value")
+            if record["metric"] not in metrics:
+                continue
+            if not first <= date_field.to_python(record["date"]) <= last:
+                continue
+            key = statistics.get_record_key(statistics.get_record_kwargs(**record))
+            expected[key] = value
+    actual = {}
+    for metric in metrics:
+        stats = tracker.get_window_statistics(metric, first, last)
+        for row in stats.values_list(*(attnames + ["value"])):
+            key = statistics.get_record_key(dict(zip(names, row[:-1])))
+            actual[key] = row[-1]
+    return [
+        Discrepancy(dict(zip(names, key)), expected.get(key), actual.get(key))
+        for key in sorted(set(expected) | set(actual))
+        if expected.get(key) != actual.get(key)
+    ]
+
+
+def verify(tracker, qs, from_date=None, to_date=None, window="month", retrack=False):
+    """Verifies that the daily statistics of the tracker match its source
+    (``qs``), from ``from_date`` (defaulting to the beginning) up to
+    including ``to_date`` (defaulting to yesterday).
+
+    First, per ``window`` (week or month), the sum of the values (and
+    sums weighted by day, and object, if the aggregate counts rows) of
+    the statistics is compared to that of the source, using a single
+    query for each. Only the windows that do not match are compared day
+    by day (and object by object). Pass ``retrack`` to re-track the days
+    found to be off.
+    """
+    check_supported(tracker)
+    to_date = to_date or date.today() - timedelta(days=1)
+    result = VerifyResult()
+    source = qs.using(tracker.using) if tracker.using else qs
+    source = tracker.filter_source(source)
+    fingerprints = get_source_fingerprints(tracker, source, from_date, to_date, window)
+    mismatches = defaultdict(list)
+    for i, metric in enumerate(tracker.get_metrics()):
+        aggr_op = list(tracker.get_aggregates().values())[i]
+        statistics = get_statistic_fingerprints(
+            tracker, metric, from_date, to_date, window, counts_rows(aggr_op)
+        )
+        for key in set(statistics) | set(
+            key for key in fingerprints if key[0] == metric.pk
+        ):
+            result.windows += 1
+            if fingerprints.get(key) != statistics.get(key):
+                first = max(key[1], from_date) if from_date else key[1]
+                last = min(get_window_end(key[1], window), to_date)
+                mismatches[(first, last)].append(metric)
+                result.mismatches.append((metric, first, last))
+    for (first, last), metrics in sorted(mismatches.items()):
+        result.discrepancies.extend(drill_down(tracker, source, metrics, first, last))
+    if retrack:
+        for first, last in date_ranges(
+            sorted(set(discrepancy.date for discrepancy in result.discrepancies))
+        ):
+            tracker.track(qs, from_date=first, to_date=last)
+            result.retracked.append((first, last))
+    return result